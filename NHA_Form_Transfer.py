@@ -6,41 +6,61 @@ be set up to run nightly through task scheduler.
 Author: Molly Moore for Pennsylvania Natural Heritage Program
 Created: 11/1/2024
 Updates:
+10/19/2026 - existing records are keyed in dictionaries and form records are classified as new, duplicate, or update in
+one pass. Inserts, updates, and load status changes are written in batches.
+10/19/2026 - survey layer and repeat tables are pulled incrementally using watermarks saved after each successful run.
+10/19/2026 - photos are transferred through a thread pool and photo attributes are updated in one edit per layer.
+10/19/2026 - get_latest_records moved to nha_utils.py and only pulls the latest record for each NHA.
+10/19/2026 - portal login and feature layers come from the shared session manager in nha_session.py.
+10/19/2026 - script sections are traced with nha_trace and the trace is written to JSON and CSV files.
 ------------------------------------------------------------------------------------------------------------------------
 """
 
 # import packages
 import arcpy
-from arcgis.gis import GIS
-from arcgis.features import FeatureLayer
 from arcgis.features import GeoAccessor
 import os
 import sys
 import pandas as pd
 import numpy as np
 import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from nha_utils import where_in, build_key_index, classify_records, records_by_key, batch_insert, batch_update, \
+    update_by_key, batch_calculate, load_watermarks, save_watermarks, query_since, get_latest_records
+from nha_session import get_gis, feature_layer, report_requests
+import nha_trace
+import nha_schema
+
+# start tracing this run - each section below is timed with the rows and requests it reads and writes
+nha_trace.start("NHA_Form_Transfer")
 
 # environment variables
 pd.options.mode.copy_on_write = True
 arcpy.env.overwriteOutput = True
 
 # define NHA geodatabase rest endpoints
-nha = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/0"
-nha_site_account = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/5"
-tr_bullets = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/7"
-nha_references = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/4"
+nha = nha_schema.url("nha_core")
+nha_site_account = nha_schema.url("nha_site_accounts")
+tr_bullets = nha_schema.url("nha_tr_bullets")
+nha_references = nha_schema.url("nha_references")
 
 # define rest endpoint for zotero references
-zotero_ref_url = r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/5"
+zotero_ref_url = nha_schema.url("zotero_references")
+
+# define path of the file that holds the watermarks (latest edit date or objectid pulled for each form layer/table) from
+# the last successful run. If this file is deleted, the next run will pull all survey records.
+watermark_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nha_form_transfer_watermarks.json")
+# choose whether to ignore the watermarks and pull every survey record - use this if records need to be reprocessed
+full_refresh = "no"
+#full_refresh = "yes"
 
 # define ID number for the NHA form survey - this can be found @ Portal information page for survey (in address bar)
 survey_id = '3360207b68a94e03b125b14804fcf906'
 
-# load gis credentials from OS environment variables - these need to be setup in your operating system environment variables
-wpc_gis_username = os.environ.get("wpc_portal_username")
-wpc_gis_password = os.environ.get("wpc_gis_password")
-# connect to Portal account
-gis = GIS('https://gis.waterlandlife.org/portal', wpc_gis_username, wpc_gis_password)
+nha_trace.section("pull form records")
+# connect to Portal account - credentials are loaded from OS environment variables in nha_session.py
+gis = get_gis("wpc_gis")
 
 # get NHA form layer collection using survey ID number found @ Portal information page
 nha_form_collection = gis.content.get(survey_id)
@@ -51,53 +71,46 @@ site_desc_ref_tbl = nha_form_collection.tables[0]
 threats_ref_tbl = nha_form_collection.tables[1]
 tr_repeat_tbl = nha_form_collection.tables[2]
 
-# get all nha surveys in feature layer and convert to Pandas dataframe
-nha_surveys = nha_form_lyr.query()
-nha_surveys_df = nha_surveys.sdf
+# load the watermarks from the last successful run - each layer/table is only queried for records that were added or
+# edited since then. If full_refresh is "yes" or there is no watermark file yet, every record is pulled.
+if full_refresh == "yes":
+    watermarks = {}
+else:
+    watermarks = load_watermarks(watermark_path)
+new_watermarks = {}
+
+# get nha surveys edited since the last run in feature layer and convert to Pandas dataframe
+nha_surveys_df, new_watermarks[nha_form_lyr.url] = query_since(nha_form_lyr, watermarks.get(nha_form_lyr.url))
+
+# get site description references edited since the last run and convert to Pandas dataframe
+site_ref_df, new_watermarks[site_desc_ref_tbl.url] = query_since(site_desc_ref_tbl, watermarks.get(site_desc_ref_tbl.url))
 
-# get site description references and convert to Pandas dataframe
-site_ref = site_desc_ref_tbl.query()
-site_ref_df = site_ref.sdf
+# get threats/recs summary references edited since the last run and convert to Pandas dataframe
+threats_ref_df, new_watermarks[threats_ref_tbl.url] = query_since(threats_ref_tbl, watermarks.get(threats_ref_tbl.url))
 
-# get threats/recs summary references and convert to Pandas dataframe
-threats_ref = threats_ref_tbl.query()
-threats_ref_df = threats_ref.sdf
+# get threat/rec bullets edited since the last run and convert to Pandas dataframe
+tr_repeat_df, new_watermarks[tr_repeat_tbl.url] = query_since(tr_repeat_tbl, watermarks.get(tr_repeat_tbl.url))
 
-# get threat/rec bullets and convert to Pandas dataframe
-tr_repeat = tr_repeat_tbl.query()
-tr_repeat_df = tr_repeat.sdf
+print("Pulled {0} surveys, {1} site description references, {2} threat references, and {3} TR bullets edited since the "
+      "last run.".format(len(nha_surveys_df), len(site_ref_df), len(threats_ref_df), len(tr_repeat_df)))
+
+# repeat table records can be added to a survey that hasn't itself changed since the last run, so pull any parent
+# surveys that we don't already have. These are only used to join NHA attributes to the repeat records.
+parent_ids = set(site_ref_df['parentrowid']) | set(threats_ref_df['parentrowid']) | set(tr_repeat_df['parentrowid'])
+parent_ids = parent_ids - set(nha_surveys_df['uniquerowid'])
+nha_parents_df = pd.concat([nha_surveys_df] + [nha_form_lyr.query(where=where_clause).sdf for where_clause in
+                                               where_in("uniquerowid", parent_ids)], axis=0, ignore_index=True)
 
 ########################################################################################################################
 ## First, we are going to load in site account records if needed -- these will only be those that have updates to site
 ## description or threats and recommendations summary records
 ########################################################################################################################
+nha_trace.section("site accounts")
 
 # now get a dataframe of only the most recent site accounts per NHA in the nha geodatabase so that we can transfer
 # the site description or threats/recs summary if one is approved and one is updated.
-def get_latest_records(feature_layer_url, id_field, date_field):
-    """
-    Fetches data from a feature layer, keeps only the most recent record for each ID,
-    and returns a Pandas DataFrame.
-    """
-
-    # Create a FeatureLayer object
-    fl = FeatureLayer(feature_layer_url)
-
-    # Query all features from the layer and convert to pandas dataframe
-    df = fl.query(out_fields='*', return_geometry=False).sdf
-
-    if not df.empty:
-        # Sort by ID and date field in descending order
-        df.sort_values([id_field, date_field], ascending=[True, False], inplace=True)
-
-        # Drop duplicates, keeping only the first (most recent) record for each ID
-        df.drop_duplicates(subset=[id_field], keep='first', inplace=True)
-
-    return df
-
-
 # get df of most recent site accounts
-current_site_accounts = get_latest_records(nha_site_account, "nha_join_id", "created_date")
+current_site_accounts = get_latest_records(nha_site_account, "nha_join_id", "created_date", ["site_desc", "tr_summary"])
 
 # get dataframe of proposed new NHAs that have site account records filled out in the form OR site accounts that have
 # updates to the site description and/or threats/recs summary. these records will be loaded into the Site Account NHA
@@ -126,41 +139,45 @@ load_sites_df['review_date'] = load_sites_df['written_date']
 load_sites_df = load_sites_df.fillna(np.nan)
 load_sites_df = load_sites_df.replace({np.nan: None})
 
-# define list of fields to be loaded into NHA geodatabase from form and convert them into a tuple - this is what will be
-# compared to existing records and if they do not exist in the nha geodatabase yet, they will be loaded.
-insert_fields = ["site_name", "site_desc", "tr_summary", "written_user", "written_date", "written_notes", "review_user",
-                 "review_date", "review_notes", "nha_join_id", "nha_rel_guid"]
-insert_tuples = list(load_sites_df[insert_fields].itertuples(index=False, name=None))
-
-# get list of existing site accounts in the nha geodatabase, so we don't load in duplicate records below
-all_site_accounts = []
-with arcpy.da.SearchCursor(nha_site_account,
-                           ["site_name", "site_desc", "tr_summary", "written_user", "written_date", "written_notes",
-                            "review_user", "review_date", "review_notes", "nha_join_id", "nha_rel_GUID"]) as cursor:
-    for row in cursor:
-        all_site_accounts.append(row)
-
-# for each site account record to be loaded into the NHA geodatabase site accounts, check if it already exists in
-# geodatabase - if it does, skip it. if it doesn't, load it in.
-insert_fields.append("status")
-for record in insert_tuples:
-    nha_join_id = record[9]
-    if record in all_site_accounts:
-        print("An duplicate record with the site name " + record[0] + " is already in the NHA Site Account table.")
-        print(nha_form_lyr.calculate(where="nha_join_id = '{}'".format(nha_join_id), calc_expression={"field": "load_status", "value": "loaded"}))
-        pass
-    else:
-        print(record)
-        record += ("rev",)
-        with arcpy.da.InsertCursor(nha_site_account, insert_fields) as cursor:
-            cursor.insertRow(record)
-        # change load status to "loaded" for the record, so we don't keep loading it in if something changes in the .gdb.
-        print(nha_form_lyr.calculate(where="nha_join_id = '{}'".format(nha_join_id), calc_expression={"field": "load_status", "value": "loaded"}))
+# define list of fields to be loaded into NHA geodatabase from form. The key fields make up the natural key of a site
+# account record - a site account written by the same person on the same date for the same NHA is the same record even
+# if the text was edited in the form after it was loaded. The target fields line up with the form fields.
+site_key_fields = ["nha_join_id", "written_user", "written_date"]
+site_value_fields = ["site_name", "site_desc", "tr_summary", "written_notes", "review_user", "review_date",
+                     "review_notes", "nha_rel_guid"]
+site_target_key_fields = ["nha_join_id", "written_user", "written_date"]
+site_target_value_fields = ["site_name", "site_desc", "tr_summary", "written_notes", "review_user", "review_date",
+                            "review_notes", "nha_rel_GUID"]
+
+# index existing site accounts in the nha geodatabase for only the NHAs in the form records, so we don't load in
+# duplicate records below
+site_key_index, site_full_index = build_key_index(nha_site_account, site_target_key_fields, site_target_value_fields,
+                                                  where_in("nha_join_id", load_sites_df['nha_join_id']))
+
+# classify each site account record as new, duplicate, or update in one pass
+load_sites_df = classify_records(load_sites_df, site_key_fields, site_value_fields, site_key_index, site_full_index)
+new_sites_df = load_sites_df[load_sites_df['load_action'] == 'new']
+update_sites_df = load_sites_df[load_sites_df['load_action'] == 'update']
+for site_name in load_sites_df.loc[load_sites_df['load_action'] == 'duplicate', 'site_name']:
+    print("An duplicate record with the site name " + str(site_name) + " is already in the NHA Site Account table.")
+
+# insert all new site account records with one cursor and update changed records by object id
+print(str(batch_insert(nha_site_account, site_target_key_fields + site_target_value_fields + ["status"],
+                       (record + ("rev",) for record in new_sites_df[site_key_fields + site_value_fields].itertuples(index=False, name=None))))
+      + " new site account records loaded.")
+print(str(batch_update(nha_site_account, site_target_value_fields,
+                       dict(zip(update_sites_df['target_oid'], update_sites_df[site_value_fields].itertuples(index=False, name=None)))))
+      + " existing site account records updated.")
+
+# change load status to "loaded" for the records, so we don't keep loading them in if something changes in the .gdb.
+for response in batch_calculate(nha_form_lyr, "nha_join_id", load_sites_df['nha_join_id'], "load_status", "loaded"):
+    print(response)
 
 ########################################################################################################################
 ## Now we are going to edit the review fields of existing site account records if both the site description and threats/
 ## recs summary are approved in the nha form.
 ########################################################################################################################
+nha_trace.section("approve site accounts")
 
 # create dataframe with site account records that are marked as approved
 approve_sites_df = nha_surveys_df[
@@ -169,44 +186,22 @@ approve_sites_df = nha_surveys_df[
 # format the pandas NA types so that they play nicely with ArcGIS and come in as Null values appropriately
 approve_sites_df = approve_sites_df.fillna(np.nan)
 approve_sites_df = approve_sites_df.replace({np.nan: None})
-
-# create dictionary of values to update
-approve_dict = approve_sites_df.set_index('nha_join_id')[["review_user", "written_date", "review_notes"]].apply(list,
-                                                                                                                axis=1).to_dict()
-
-# create list of nha_join_ids to loop through because I think this will be faster than going through ALL the cursors
-approve_ids = approve_sites_df['nha_join_id'].tolist()
-# create where clause for the update cursor based on how many records we are updating - if updating more than 1, we need
-# to use a tuple IN clause, but if only one record, we need to use equal condition. If there are no records, pass because
-# we will check for that before starting the loop.
-if len(approve_ids) > 1:
-    where_clause = "nha_join_id IN {0}".format(tuple(approve_ids))
-elif len(approve_ids) == 1:
-    where_clause = "nha_join_id = '{0}'".format(approve_ids[0])
-else:
-    pass
-
-# first, check to see if there are any approved records, then update review fields in the site account table for the
-# approved records
-if approve_ids:
-    with arcpy.da.UpdateCursor(nha_site_account,
-                               ["nha_join_id", "review_user", "review_date", "review_notes", "status", "written_date"],
-                               where_clause) as cursor:
-        for row in cursor:
-            print("Updating review fields for nha_join_id " + row[0])
-            for k, v in approve_dict.items():
-                if row[0] == k:
-                    row[1] = v[0]
-                    row[2] = v[1]
-                    row[3] = v[2]
-                    row[4] = "app"
-                    cursor.updateRow(row)
-                    print(nha_form_lyr.calculate(where="nha_join_id = '{}'".format(k),
-                                                  calc_expression={"field": "site_review_status", "value": "loaded"}))
+approve_sites_df['status'] = "app"
+
+# create dictionary of nha_join_id: values to update, then update review fields in the site account table for the
+# approved records with one cursor per chunk of nha_join_ids
+approve_dict = records_by_key(approve_sites_df, 'nha_join_id', ["review_user", "written_date", "review_notes", "status"])
+approved_ids = update_by_key(nha_site_account, "nha_join_id", ["review_user", "review_date", "review_notes", "status"],
+                             approve_dict)
+for nha_join_id in approved_ids:
+    print("Updating review fields for nha_join_id " + nha_join_id)
+for response in batch_calculate(nha_form_lyr, "nha_join_id", approved_ids, "site_review_status", "loaded"):
+    print(response)
 
 ########################################################################################################################
 ## Now we are going to edit the review fields for the NHA layer if mapping/species are approved
 ########################################################################################################################
+nha_trace.section("approve mapping and species")
 
 # create dataframe where mapping and species are both approved
 approve_map_df = nha_surveys_df[
@@ -215,40 +210,18 @@ approve_map_df = nha_surveys_df[
 # format the pandas NA types so that they play nicely with ArcGIS and come in as Null values appropriately
 approve_map_df = approve_map_df.fillna(np.nan)
 approve_map_df = approve_map_df.replace({np.nan: None})
+approve_map_df['status'] = "app"
+approve_map_df['status_change_reason'] = "Mapping and species list approval were submitted in NHA update form."
 
-# create dictionary of values to update
-approve_dict = approve_map_df.set_index('nha_join_id')[["created_user", "written_date"]].apply(list, axis=1).to_dict()
-
-# create list of nha_join_ids to loop through because I think this will be faster than going through ALL the cursors
-approve_ids = approve_map_df['nha_join_id'].tolist()
-# create where clause for the update cursor based on how many records we are updating - if updating more than 1, we need
-# to use a tuple IN clause, but if only one record, we need to use equal condition. If there are no records, pass because
-# we will check for that before starting the loop.
-if len(approve_ids) > 1:
-    where_clause = "nha_join_id IN {0}".format(tuple(approve_ids))
-elif len(approve_ids) == 1:
-    where_clause = "nha_join_id = '{0}'".format(approve_ids[0])
-else:
-    pass
-
-# first, check to see if there are any approved records, then update review fields in the site account table for the
-# approved records
-if approve_ids:
-    with arcpy.da.UpdateCursor(nha,
-                               ["nha_join_id", "status", "status_change_date", "status_change_reason", "review_user",
-                                "review_date"], where_clause) as cursor:
-        for row in cursor:
-            print("Updating review fields for nha_join_id " + row[0])
-            for k, v in approve_dict.items():
-                if row[0] == k:
-                    row[1] = "app"
-                    row[2] = v[1]
-                    row[3] = "Mapping and species list approval were submitted in NHA update form."
-                    row[4] = v[0]
-                    row[5] = v[1]
-                    cursor.updateRow(row)
-                    print(nha_form_lyr.calculate(where="nha_join_id = '{}'".format(k),
-                                                  calc_expression={"field": "map_review_status", "value": "loaded"}))
+# create dictionary of values to update and update review fields in the NHA layer for the approved records
+approve_dict = records_by_key(approve_map_df, 'nha_join_id', ["status", "written_date", "status_change_reason",
+                                                              "created_user", "written_date"])
+approved_ids = update_by_key(nha, "nha_join_id", ["status", "status_change_date", "status_change_reason", "review_user",
+                                                  "review_date"], approve_dict)
+for nha_join_id in approved_ids:
+    print("Updating review fields for nha_join_id " + nha_join_id)
+for response in batch_calculate(nha_form_lyr, "nha_join_id", approved_ids, "map_review_status", "loaded"):
+    print(response)
 
 
 ########################################################################################################################
@@ -256,6 +229,7 @@ if approve_ids:
 ########################################################################################################################
 
 
+nha_trace.section("unapprove mapping and species")
 # create dataframe where mapping OR species are NOT approved
 unapprove_map_df = nha_surveys_df[
     ((nha_surveys_df['mapping_update'] == "yes") | (nha_surveys_df['species_update'] == "yes")) & (nha_surveys_df['map_review_status'].isna())]
@@ -265,92 +239,69 @@ unapprove_map_df = unapprove_map_df.fillna(np.nan)
 unapprove_map_df = unapprove_map_df.replace({np.nan: None})
 
 unapprove_map_df['review_notes'] = unapprove_map_df['mapping_update_notes'].fillna('').str.cat(unapprove_map_df['species_update_notes'].fillna(''), sep=' ')
+unapprove_map_df['status'] = "rev"
+unapprove_map_df['status_change_reason'] = "NHA needs to be reviewed. Mapping and/or species list need to be updated per the NHA update form."
 
-# create dictionary of values to update
-unapprove_dict = unapprove_map_df.set_index('nha_join_id')[["created_user", "written_date", "review_notes"]].apply(list, axis=1).to_dict()
-
-# create list of nha_join_ids to loop through because I think this will be faster than going through ALL the cursors
-unapprove_ids = unapprove_map_df['nha_join_id'].tolist()
-# create where clause for the update cursor based on how many records we are updating - if updating more than 1, we need
-# to use a tuple IN clause, but if only one record, we need to use equal condition. If there are no records, pass because
-# we will check for that before starting the loop.
-if len(unapprove_ids) > 1:
-    where_clause = "nha_join_id IN {0}".format(tuple(unapprove_ids))
-elif len(unapprove_ids) == 1:
-    where_clause = "nha_join_id = '{0}'".format(unapprove_ids[0])
-else:
-    pass
-
-# first, check to see if there are any approved records, then update review fields in the site account table for the
-# approved records
-if unapprove_ids:
-    with arcpy.da.UpdateCursor(nha,
-                               ["nha_join_id", "status", "status_change_date", "status_change_reason", "review_user",
-                                "review_date", "review_notes"], where_clause) as cursor:
-        for row in cursor:
-            print("Updating review fields for nha_join_id " + row[0])
-            for k, v in unapprove_dict.items():
-                if row[0] == k:
-                    row[1] = "rev"
-                    row[2] = v[1]
-                    row[3] = "NHA needs to be reviewed. Mapping and/or species list need to be updated per the NHA update form."
-                    row[4] = v[0]
-                    row[5] = v[1]
-                    row[6] = v[2]
-                    cursor.updateRow(row)
-                    print(nha_form_lyr.calculate(where="nha_join_id = '{}'".format(k),
-                                                  calc_expression={"field": "map_review_status", "value": "loaded"}))
+# create dictionary of values to update and update review fields in the NHA layer for the records that need review
+unapprove_dict = records_by_key(unapprove_map_df, 'nha_join_id', ["status", "written_date", "status_change_reason",
+                                                                  "created_user", "written_date", "review_notes"])
+unapproved_ids = update_by_key(nha, "nha_join_id", ["status", "status_change_date", "status_change_reason",
+                                                    "review_user", "review_date", "review_notes"], unapprove_dict)
+for nha_join_id in unapproved_ids:
+    print("Updating review fields for nha_join_id " + nha_join_id)
+for response in batch_calculate(nha_form_lyr, "nha_join_id", unapproved_ids, "map_review_status", "loaded"):
+    print(response)
 
 
 ########################################################################################################################
 ## Now we are going to add the threats and recommendations bullet points if any were added
 ########################################################################################################################
+nha_trace.section("TR bullets")
 # get dataframe of tr_repeats from survey123 form, but only include those that have a null load status because those are
 # the records we have not loaded yet.
 tr_repeat_df = tr_repeat_df[tr_repeat_df['load_status'].isna()]
-tr_repeat_df = pd.merge(tr_repeat_df, nha_surveys_df[['nha_join_id','written_date','site_name','uniquerowid','nha_rel_guid']], left_on='parentrowid', right_on='uniquerowid', how='left')
+tr_repeat_df = pd.merge(tr_repeat_df, nha_parents_df[['nha_join_id','written_date','site_name','uniquerowid','nha_rel_guid']], left_on='parentrowid', right_on='uniquerowid', how='left')
 
 # format the pandas NA types so that they play nicely with ArcGIS and come in as Null values appropriately
 tr_repeat_df = tr_repeat_df.fillna(np.nan)
 tr_repeat_df = tr_repeat_df.replace({np.nan: None})
 
-# define list of fields to be loaded into NHA geodatabase tr_bullets table from form and convert them into a tuple -
-# this is what will be compared to existing records and if they do not exist in the nha geodatabase yet, they will be loaded.
-insert_fields = ["site_name", "threat_category", "threat", "threat_text", "created_user", "written_date", "nha_join_id", "nha_rel_guid", "globalid"]
-insert_tuples = list(tr_repeat_df[insert_fields].itertuples(index=False, name=None))
-
-# get list of existing tr_bullets in the nha geodatabase, so we don't load in duplicate records below
-all_tr_bullets = []
-with arcpy.da.SearchCursor(tr_bullets,
-                           ["site_name", "target_category", "threat_desc", "threat_text", "added_user", "added_date",
-                            "nha_join_id", "nha_rel_GUID"]) as cursor:
-    for row in cursor:
-        all_tr_bullets.append(row)
-
-# for each tr_bullet record to be loaded into the NHA geodatabase, check if it already exists in geodatabase - if it
-# does, skip it. if it doesn't, load it in.
-for record in insert_tuples:
-    # get unique id for the form row, so that we can use it to change the load status after we load the record.
-    unique_id = record[8]
-    record = record[:-1]
-    if record in all_tr_bullets:
-        print("A duplicate record with the site name " + record[0] + " is already in the NHA TR bullets table.")
-        # update load_status field to loaded, so that we don't try to load these again.
-        print(tr_repeat_tbl.calculate(where="globalid = '{}'".format(unique_id), calc_expression={"field": "load_status", "value": "loaded"}))
-        pass
-    else:
-        print(record)
-        record += ("Added with the NHA Update Form.",)
-        with arcpy.da.InsertCursor(tr_bullets, ["site_name", "target_category", "threat_desc", "threat_text",
-                                                      "added_user", "added_date", "nha_join_id", "nha_rel_GUID", "added_notes"]) as cursor:
-            cursor.insertRow(record)
-        # update load_status field to loaded, so that we don't try to load these again.
-        print(tr_repeat_tbl.calculate(where="globalid = '{}'".format(unique_id), calc_expression={"field": "load_status", "value": "loaded"}))
+# define list of fields to be loaded into NHA geodatabase tr_bullets table from form. A bullet is keyed by the NHA, the
+# bullet text, and who added it when - the target fields line up with the form fields.
+tr_key_fields = ["nha_join_id", "threat_text", "created_user", "written_date"]
+tr_value_fields = ["site_name", "threat_category", "threat", "nha_rel_guid"]
+tr_target_key_fields = ["nha_join_id", "threat_text", "added_user", "added_date"]
+tr_target_value_fields = ["site_name", "target_category", "threat_desc", "nha_rel_GUID"]
+
+# index existing tr_bullets in the nha geodatabase for the NHAs in the form records, so we don't load in duplicate
+# records below
+tr_key_index, tr_full_index = build_key_index(tr_bullets, tr_target_key_fields, tr_target_value_fields,
+                                              where_in("nha_join_id", tr_repeat_df['nha_join_id']))
+
+# classify each tr_bullet record as new, duplicate, or update in one pass
+tr_repeat_df = classify_records(tr_repeat_df, tr_key_fields, tr_value_fields, tr_key_index, tr_full_index)
+new_tr_df = tr_repeat_df[tr_repeat_df['load_action'] == 'new']
+update_tr_df = tr_repeat_df[tr_repeat_df['load_action'] == 'update']
+for site_name in tr_repeat_df.loc[tr_repeat_df['load_action'] == 'duplicate', 'site_name']:
+    print("A duplicate record with the site name " + str(site_name) + " is already in the NHA TR bullets table.")
+
+# insert all new tr_bullets with one cursor and update changed records by object id
+print(str(batch_insert(tr_bullets, tr_target_key_fields + tr_target_value_fields + ["added_notes"],
+                       (record + ("Added with the NHA Update Form.",) for record in new_tr_df[tr_key_fields + tr_value_fields].itertuples(index=False, name=None))))
+      + " new TR bullet records loaded.")
+print(str(batch_update(tr_bullets, tr_target_value_fields,
+                       dict(zip(update_tr_df['target_oid'], update_tr_df[tr_value_fields].itertuples(index=False, name=None)))))
+      + " existing TR bullet records updated.")
+
+# update load_status field to loaded for all form rows we handled, so that we don't try to load these again.
+for response in batch_calculate(tr_repeat_tbl, "globalid", tr_repeat_df['globalid'], "load_status", "loaded"):
+    print(response)
 
 
 ########################################################################################################################
 ## Now we are going to add references to the references and citations table
 ########################################################################################################################
+nha_trace.section("references")
 # change column names of reference dfs to match
 site_ref_df = site_ref_df.rename(columns={'key_1': 'key'})
 threats_ref_df = threats_ref_df.rename(columns={'key_2': 'key'})
@@ -362,12 +313,15 @@ threats_ref_df['source_field'] = 'tr_summary'
 references_df = pd.concat([site_ref_df[['key','parentrowid','source_field']], threats_ref_df[['key','parentrowid','source_field']]], axis=0)
 
 # merge in the parent global ID for site account GUID
-references_df = pd.merge(references_df, nha_surveys_df[['uniquerowid','nha_rel_guid','nha_join_id']], how= 'left', left_on="parentrowid", right_on="uniquerowid")
+references_df = pd.merge(references_df, nha_parents_df[['uniquerowid','nha_rel_guid','nha_join_id']], how= 'left', left_on="parentrowid", right_on="uniquerowid")
 
-# load zotero references table from the NHA reference feature service
-zotero_flayer = FeatureLayer(zotero_ref_url)
-zotero_fset = zotero_flayer.query()
-zotero_df = zotero_fset.sdf
+# load zotero references from the NHA reference feature service - only for the zotero keys cited in the new reference
+# records. The zotero layer is fully reloaded every night by Zotero_Library_Download.py, so a watermark doesn't help here.
+zotero_flayer = feature_layer(zotero_ref_url)
+zotero_fields = ['key', 'title', 'authors', 'publication_year']
+zotero_df = pd.concat([pd.DataFrame(columns=zotero_fields)] +
+                      [zotero_flayer.query(where=where_clause, out_fields=','.join(zotero_fields)).sdf for where_clause in
+                       where_in("key", references_df['key'])], axis=0, ignore_index=True)
 
 # merge in zotero columns from zotero primary list
 references_df = pd.merge(references_df, zotero_df[['key', 'title', 'authors', 'publication_year']], how='left', on='key')
@@ -375,36 +329,35 @@ references_df = pd.merge(references_df, zotero_df[['key', 'title', 'authors', 'p
 references_df = references_df.fillna(np.nan)
 references_df = references_df.replace({np.nan: None})
 
-# create list of tuples to be loaded into geodatabase
-insert_fields = ["key", "nha_join_id", "title", "authors", "publication_year", "source_field"]
-insert_tuples = list(references_df[insert_fields].itertuples(index=False, name=None))
-
-# get list of existing references nha geodatabase, so we don't load in duplicate records below
-all_refs = []
-with arcpy.da.SearchCursor(nha_references,
-                           ["zotero_key", "source_id", "title", "authors", "publication_yr", "source_field"]) as cursor:
-    for row in cursor:
-        all_refs.append(row)
-
-# for each reference record to be loaded into the NHA geodatabase, check if it already exists in geodatabase - if it
-# does, skip it. if it doesn't, load it in.
-for record in insert_tuples:
-    if record in all_refs:
-        pass
-    else:
-        print(record)
-        record += ("site_account",)
-        with arcpy.da.InsertCursor(nha_references, ["zotero_key", "source_id", "title", "authors", "publication_yr",
-                                                "source_field", "source_table"]) as cursor:
-            cursor.insertRow(record)
+# define the fields to be loaded into geodatabase - a reference is keyed by zotero key, NHA, and the field it was cited
+# in, and the citation details are refreshed if they changed in Zotero
+ref_key_fields = ["key", "nha_join_id", "source_field"]
+ref_value_fields = ["title", "authors", "publication_year"]
+ref_target_key_fields = ["zotero_key", "source_id", "source_field"]
+ref_target_value_fields = ["title", "authors", "publication_yr"]
+
+# index existing references in the nha geodatabase for the NHAs in the form records, so we don't load in duplicate
+# records below
+ref_key_index, ref_full_index = build_key_index(nha_references, ref_target_key_fields, ref_target_value_fields,
+                                                where_in("source_id", references_df['nha_join_id']))
+
+# classify each reference as new, duplicate, or update and write new and changed references in batches
+references_df = classify_records(references_df, ref_key_fields, ref_value_fields, ref_key_index, ref_full_index)
+new_refs_df = references_df[references_df['load_action'] == 'new']
+update_refs_df = references_df[references_df['load_action'] == 'update']
+print(str(batch_insert(nha_references, ref_target_key_fields + ref_target_value_fields + ["source_table"],
+                       (record + ("site_account",) for record in new_refs_df[ref_key_fields + ref_value_fields].itertuples(index=False, name=None))))
+      + " new reference records loaded.")
+print(str(batch_update(nha_references, ref_target_value_fields,
+                       dict(zip(update_refs_df['target_oid'], update_refs_df[ref_value_fields].itertuples(index=False, name=None)))))
+      + " existing reference records updated.")
 
 # NOW WE NEED TO FILL site_rel_GUID field with most recent site that matches nha_join_id
 # get updated dataframe of most recent site account records per nha_join_id after we added our sites
-current_site_accounts = get_latest_records(nha_site_account, "nha_join_id", "created_date")
+current_site_accounts = get_latest_records(nha_site_account, "nha_join_id", "created_date", ["GlobalID"])
 
 # create dictionary of values to update and remove rows with a null nha_join_id
-current_site_dict = current_site_accounts.set_index('nha_join_id')[["GlobalID"]].apply(list, axis=1).to_dict()
-current_site_dict ={k: v for k, v in current_site_dict.items() if pd.Series(k).notna().all()}
+current_site_dict = records_by_key(current_site_accounts, 'nha_join_id', ["GlobalID"])
 
 
 # create update cursor for any site account record that has a null site_account_GUID and fill with most recent site account
@@ -412,13 +365,10 @@ current_site_dict ={k: v for k, v in current_site_dict.items() if pd.Series(k).n
 # site account record as long as this is run regularly and kept up to date.
 with arcpy.da.UpdateCursor(nha_references,["source_id","site_account_GUID"], "source_table = 'site_account' AND site_account_GUID IS NULL") as cursor:
     for row in cursor:
-        if row[0] is None:
-            pass
-        else:
-            for k,v in current_site_dict.items():
-                if k == row[0]:
-                    row[1] = v[0]
-                    cursor.updateRow(row)
+        site_guid = current_site_dict.get(row[0])
+        if site_guid is not None:
+            row[1] = site_guid[0]
+            cursor.updateRow(row)
 
 ########################################################################################################################
 # Add photos
@@ -426,39 +376,32 @@ with arcpy.da.UpdateCursor(nha_references,["source_id","site_account_GUID"], "so
 # records in the nha survey form and in the matching records in the nha geodatabase layer and join them based on
 # nha_join_id
 ########################################################################################################################
+nha_trace.section("photos")
 
-# define temporary path where photos will be temporarily be saved and create folders if they don't yet exist. This path
-# can be cleaned out periodically if needed
+# define temporary path where photos will be temporarily be saved and create folders if they don't yet exist. Each
+# photo is downloaded to its own subfolder, so photos with the same file name don't overwrite each other while they are
+# being transferred at the same time. Subfolders are removed once the photo is uploaded.
 temp_photo_path = r"C:\temp\survey123photos"
 if not os.path.exists(temp_photo_path):
     os.makedirs(temp_photo_path)
 
+# number of photos to transfer at the same time - keep this small so we don't overload the portal
+photo_workers = 4
+
 # query nha survey form feature layer to get records that have new photos and turn into dataframe
 new_photo_query = nha_form_lyr.query(where="photo_approve = 'new' and nha_join_id IS NOT NULL", out_fields='objectid,nha_join_id,photo_credit,photo_affil,photo_caption')
 new_photo_df = new_photo_query.sdf
 # rename the OID field, so we can distinguish it from the geodatabase OID field later
 new_photo_df = new_photo_df.rename(columns={'objectid': 'new_photo_oid'})
-# get tuple of nha_join_ids for records with photos that need to be added, so we can query the nha layer and speed things up
-nha_join_ids = tuple(new_photo_df["nha_join_id"])
 
 # create feature layer object from NHA geodatabase rest endpoint
-nha_lyr = FeatureLayer(nha)
-# depending on number of records that have photos that need to be added, construct query. If the length of the tuple is
-# 0, then we will define the variable as false, and we will not go through the steps to try to load.
-if len(nha_join_ids) == 1:
-    where_clause = "nha_join_id = '{}'".format(nha_join_ids[0])
-elif len(nha_join_ids) > 1:
-    where_clause = "nha_join_id IN {}".format(nha_join_ids)
-else:
-    where_clause = False
+nha_lyr = feature_layer(nha)
 
-# check if where_clause is False due to having 0 records to load. Move on if there are records. Stop and print message
-# if there are not.
-if where_clause:
-    # query NHA feature layer object using where clause defined above. we only need objectid and nha_join_id fields in output
-    nha_query = nha_lyr.query(where= where_clause, out_fields='objectid,nha_join_id')
-    # turn output of query into dataframe
-    nha_df = nha_query.sdf
+# check if there are records to load. Move on if there are records. Stop and print message if there are not.
+if not new_photo_df.empty:
+    # query NHA feature layer object for the nha_join_ids with new photos. we only need objectid and nha_join_id fields
+    nha_df = pd.concat([nha_lyr.query(where=where_clause, out_fields='objectid,nha_join_id').sdf for where_clause in
+                        where_in("nha_join_id", new_photo_df["nha_join_id"])], axis=0, ignore_index=True)
 
     # join the object ids from the geodatabase layer to the dataframe of survey123 form records based on matching
     # nha_join_ids. basically, we want to get the objectids from the survey123 form that correspond to the object ids in
@@ -468,52 +411,73 @@ if where_clause:
     new_photo_df = new_photo_df.fillna(np.nan)
     new_photo_df = new_photo_df.replace({np.nan: None})
 
+    # get attachment info for all form records and all matching NHAs with one request per layer instead of asking for
+    # each record's attachments separately
+    form_attachments_df = nha_form_lyr.attachments.search(object_ids=",".join(str(oid) for oid in new_photo_df["new_photo_oid"]), as_df=True)
+    nha_attachments_df = nha_lyr.attachments.search(object_ids=",".join(str(oid) for oid in new_photo_df["OBJECTID"]), as_df=True)
+    # we are only collecting a single photo in each form, so we use the first attachment for each form record
+    form_attachment_ids = {} if form_attachments_df.empty else form_attachments_df.sort_values('ID').groupby('PARENTOBJECTID')['ID'].first().to_dict()
+    nha_attachment_ids = {} if nha_attachments_df.empty else nha_attachments_df.groupby('PARENTOBJECTID')['ID'].apply(list).to_dict()
+
+    # only keep form records that have a photo. If more than one form record has a new photo for the same NHA, only
+    # the most recent one is transferred, because we only keep one photo for each NHA.
+    new_photo_df = new_photo_df[new_photo_df["new_photo_oid"].isin(form_attachment_ids.keys())]
+    new_photo_df = new_photo_df.sort_values("new_photo_oid")
+    latest_photo_df = new_photo_df.drop_duplicates(subset=["OBJECTID"], keep="last")
+
     # create list of tuples that we will use to load records and update attributes
     new_photo_fields = ["nha_join_id", "new_photo_oid", "OBJECTID", "photo_credit", "photo_affil", "photo_caption"]
-    new_photo_tuples = list(new_photo_df[new_photo_fields].itertuples(index=False, name=None))
-
-    # start loop to load each new photo record and update attributes
-    for photo_record in new_photo_tuples:
-        # define oids and other attributes for easier handling below
-        photo_oid = str(photo_record[1])
-        geodatabase_oid = str(photo_record[2])
-        photo_credit = photo_record[3]
-        photo_affil = photo_record[4]
-        photo_caption = photo_record[5]
-        # get attachment dictionary from nha_form_lyr - we can define this as first element because we are only collecting
-        # a single photo in each form. We are defining the dictionary here so that we can use the attachment id in the next
-        # line.
-        attachment = nha_form_lyr.attachments.get_list(photo_oid)
-        if attachment:
-            attachment = nha_form_lyr.attachments.get_list(photo_oid)[0]
+    new_photo_tuples = list(latest_photo_df[new_photo_fields].itertuples(index=False, name=None))
+
+    # define function to move one photo from the form layer to the NHA layer. This is run in a thread pool, so it only
+    # does attachment work - attribute edits are saved up and applied in one batch below.
+    def transfer_photo(photo_record):
+        photo_oid = photo_record[1]
+        geodatabase_oid = photo_record[2]
+        photo_folder = os.path.join(temp_photo_path, str(photo_oid))
+        os.makedirs(photo_folder, exist_ok=True)
+        try:
             # download the photo from the nha_form_lyr to the temporary output folder space
-            downloaded_photo = nha_form_lyr.attachments.download(oid=photo_oid, attachment_id=attachment['id'], save_path=temp_photo_path)[0]
-            # print statement
+            downloaded_photo = nha_form_lyr.attachments.download(oid=photo_oid, attachment_id=form_attachment_ids[photo_oid], save_path=photo_folder)[0]
             print("Successfully downloaded photo: " + downloaded_photo)
 
-            # get list of attachments from nha geodatabase layer to check if we need to delete attachment first because we
-            # only want to maintain one attached photo for each nha
-            nha_lyr_attachment = nha_lyr.attachments.get_list(geodatabase_oid)
-            # if the nha geodatabase layer has attachments already, delete them
-            if len(nha_lyr_attachment):
-                print("The NHA with OID: " + str(geodatabase_oid) + " has " + str(len(nha_lyr_attachment)) + " existing attachments that will be deleted.")
-                for attachment in nha_lyr_attachment:
-                    nha_lyr.attachments.delete(oid=geodatabase_oid, attachment_id=attachment['id'])
+            # if the nha geodatabase layer has attachments already, delete them because we only want to maintain one
+            # attached photo for each nha
+            existing_ids = nha_attachment_ids.get(geodatabase_oid, [])
+            if existing_ids:
+                print("The NHA with OID: " + str(geodatabase_oid) + " has " + str(len(existing_ids)) + " existing attachments that will be deleted.")
+                nha_lyr.attachments.delete(oid=geodatabase_oid, attachment_id=",".join(str(i) for i in existing_ids))
 
             # add attachment to geodatabase layer
             nha_lyr.attachments.add(geodatabase_oid, downloaded_photo)
-
-            # update photo credit, photo affil, and photo caption fields in the nha geodatabase layer
-            with arcpy.da.UpdateCursor(nha,["photo_credit","photo_affil","photo_caption"],where_clause="OBJECTID = {}".format(geodatabase_oid)) as cursor:
-                for row in cursor:
-                    row[0] = photo_credit
-                    row[1] = photo_affil
-                    row[2] = photo_caption
-                    cursor.updateRow(row)
-
-            # update photo_approve attribute of records in nha survey123 form to existing, so that we don't try to load the
-            # photos in again in the future
-            print(nha_form_lyr.calculate(where="objectid = '{}'".format(photo_oid), calc_expression={"field": "photo_approve", "value": "existing"}))
+        finally:
+            shutil.rmtree(photo_folder, ignore_errors=True)
+        return photo_record
+
+    # transfer photos through a bounded thread pool
+    transferred = []
+    with ThreadPoolExecutor(max_workers=photo_workers) as executor:
+        futures = {executor.submit(transfer_photo, photo_record): photo_record for photo_record in new_photo_tuples}
+        for future in as_completed(futures):
+            try:
+                transferred.append(future.result())
+            except Exception as ex:
+                print("Could not transfer photo for nha_join_id " + str(futures[future][0]) + ": " + str(ex))
+
+    if transferred:
+        # update photo credit, photo affil, and photo caption fields in the nha geodatabase layer in one edit
+        nha_oid_field = nha_lyr.properties.objectIdField
+        photo_updates = [{"attributes": {nha_oid_field: r[2], "photo_credit": r[3], "photo_affil": r[4], "photo_caption": r[5]}}
+                         for r in transferred]
+        print(nha_lyr.edit_features(updates=photo_updates))
+
+        # update photo_approve attribute of records in nha survey123 form to existing, so that we don't try to load the
+        # photos in again in the future. This includes older form records for the same NHA that were replaced by a
+        # newer photo.
+        transferred_nhas = [r[2] for r in transferred]
+        transferred_form_oids = new_photo_df.loc[new_photo_df["OBJECTID"].isin(transferred_nhas), "new_photo_oid"]
+        for response in batch_calculate(nha_form_lyr, "objectid", transferred_form_oids, "photo_approve", "existing"):
+            print(response)
 else:
     # report print statement if there are no new photos that need to be added
     print("There are no records with new photos that need to be added.")
@@ -541,3 +505,13 @@ else:
 # # update relative GlobalIDs in child tables
 # update_rel_guid(nha, "nha_join_id", tr_bullets, "nha_join_id", "nha_rel_GUID")
 
+
+########################################################################################################################
+# save watermarks - we only get here if all of the records above were written, so the next run will pick up where this
+# run left off. If anything above fails, the watermarks are not advanced and the same records are pulled again.
+########################################################################################################################
+nha_trace.section("save watermarks")
+save_watermarks(watermark_path, {**watermarks, **new_watermarks})
+print("Saved watermarks for next run: " + str(new_watermarks))
+report_requests()
+nha_trace.finish()
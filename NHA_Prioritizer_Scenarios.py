@@ -0,0 +1,96 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: NHA_Prioritizer_Scenarios.py
+Purpose: This script compares NHA prioritization results under different thresholds. The statewide inputs (source
+feature to NHA assignments, visits, the scored species list, and percent protected) are loaded and joined once
+with nha_prioritization.load_inputs, and every scenario below is then evaluated against them in parallel worker
+processes. A scenario is a name and the parameters it changes from nha_prioritization.default_parameters - the "base"
+scenario uses the defaults and is what NHA_Prioritizer.py writes. The comparison table has one row per NHA with the
+base values and each scenario's values of the compared metrics, and the number of compared metrics that differ from
+base for each scenario.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import arcpy
+from nha_prioritization import load_inputs, evaluate, init_worker, evaluate_scenario
+import nha_trace
+
+# scenarios to compare - each is a name and the parameters it changes from the defaults
+scenarios = {
+    "botany_tier1_8_species": {"botany_tier1_s1s2s3": 8},
+    "botany_tier1_score_300": {"botany_tier1_score": 300},
+    "plant_lookback_40": {"plant_lookback_years": 40},
+    "site_rank_500_200": {"global_score": 500, "regional_score": 200},
+    "no_high_grank_exclusions": {"high_grank_exclusions": []},
+}
+
+# metrics compared between scenarios
+compare_metrics = ["nha_site_score", "nha_score_percentile", "site_rank", "visits_before", "visits_after",
+                   "BOTANY_count_S1S2S3_species", "BOTANY_high_grank", "BOTANY_tier"]
+
+# number of worker processes used to evaluate scenarios
+workers = max(1, min(len(scenarios), (os.cpu_count() or 2) - 1))
+
+# define output path of the comparison table
+output_path = r'H://temp//nha_prioritization_scenarios.csv'
+
+
+# define function to build the comparison table from the prioritization table of each scenario
+def compare_scenarios(results):
+    """Returns one row per NHA with the compared metrics of each scenario and the number that differ from base."""
+    # every scenario has the same NHAs (the NHAs with species in the species list)
+    base = results["base"].set_index("nha_join_id")[compare_metrics]
+    comparison = base.add_prefix("base_")
+    for name in scenarios:
+        table = results[name].set_index("nha_join_id")[compare_metrics].reindex(base.index)
+        comparison = comparison.join(table.add_prefix(name + "_"))
+        differs = table.ne(base) & ~(table.isna() & base.isna())
+        comparison[name + "_changes"] = differs.sum(axis=1)
+    return comparison.reset_index()
+
+
+if __name__ == "__main__":
+    # start tracing this run - each section below is timed with the rows and requests it reads and writes
+    nha_trace.start("NHA_Prioritizer_Scenarios")
+    arcpy.env.overwriteOutput = True
+    arcpy.env.workspace = r'memory'
+
+    # load the inputs once - the plant lookback of each scenario is applied in evaluate
+    all_parameters = {"base": {}}
+    all_parameters.update(scenarios)
+    inputs = load_inputs()
+
+    nha_trace.section("evaluate scenarios")
+    start = time.perf_counter()
+    results = {}
+    if workers > 1:
+        # worker processes need to be started with the environment's python.exe if this is run from ArcGIS Pro
+        if os.path.basename(sys.executable).lower() == "arcgispro.exe":
+            multiprocessing.set_executable(os.path.join(sys.exec_prefix, "python.exe"))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(inputs,)) as executor:
+            futures = [executor.submit(evaluate_scenario, name, p) for name, p in all_parameters.items()]
+            for future in as_completed(futures):
+                name, table = future.result()
+                results[name] = table
+    else:
+        for name, p in all_parameters.items():
+            results[name] = evaluate(inputs, p)
+    print("Evaluated " + str(len(results)) + " scenarios in " + str(round(time.perf_counter() - start, 1)) + " seconds.")
+
+    nha_trace.section("write comparison table")
+    comparison = compare_scenarios(results)
+    comparison.to_csv(output_path, index=False)
+    for name in scenarios:
+        changed = int((comparison[name + "_changes"] > 0).sum())
+        print(name + ": " + str(changed) + " NHAs changed from base.")
+    print("Comparison table written to " + output_path)
+    nha_trace.finish()
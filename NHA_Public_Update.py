@@ -6,6 +6,15 @@ internal NHA database to the public feature service.
 Author: Molly Moore for Pennsylvania Natural Heritage Program
 Created: 03/24/2025
 Updates:
+10/19/2026 - get_latest_records moved to nha_utils.py and only pulls the latest site account for each NHA.
+10/19/2026 - portal logins and feature layers come from the shared session manager in nha_session.py.
+10/19/2026 - sensitive species are masked with the shared masking rule in nha_utils.py.
+10/19/2026 - script sections are traced with nha_trace and the trace is written to JSON and CSV files.
+10/19/2026 - NHA and SUSN polygons are simplified and quantized with nha_geometry.py before they are appended to the
+public layers. The simplification only reruns when the boundaries have changed.
+10/19/2026 - a static copy of the public data (GeoJSON, FlatGeobuf, and vector tiles) is written with nha_static_export.py.
+10/19/2026 - species and EO attributes are read with the typed loader in nha_utils.py.
+10/19/2026 - the static export runs after the public service is loaded and only warns if it fails.
 ------------------------------------------------------------------------------------------------------------------------
 """
 
@@ -13,57 +22,44 @@ Updates:
 attachments = "yes"
 #attachments = "no"
 
+# choose whether to write a static copy of the public data (GeoJSON, FlatGeobuf, and vector tiles) for partners and
+# caches - the folder it is written to is set after the imports below
+static_export = "yes"
+#static_export = "no"
+
 # import packages
 import arcpy
-from arcgis.gis import GIS
-from arcgis.features import FeatureLayer
 from arcgis.features import FeatureSet
 import os
 import pandas as pd
-import numpy as np
 import shutil
 import re
+from nha_utils import get_latest_records, mask_sensitive, load_frame
+from nha_session import get_gis, feature_layer, report_requests
+from nha_geometry import prepare_public_geometry
+from nha_static_export import export_static_public
+import nha_trace
+import nha_schema
+
+# folder the static copy of the public data is written to
+static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_static")
+
+# start tracing this run - each section below is timed with the rows and requests it reads and writes
+nha_trace.start("NHA_Public_Update")
 
 # environment variables
 pd.options.mode.copy_on_write = True
 arcpy.env.overwriteOutput = True
 
-# define function to take feature layer and keep only most recent record. Returns a Pandas DF. We will use this function
-# below to get most recent site account entries.
-def get_latest_records(feature_layer_url, id_field, date_field):
-    """
-    Fetches data from a feature layer, keeps only the most recent record for each ID,
-    and returns a Pandas DataFrame.
-    """
-
-    # Create a FeatureLayer object
-    fl = FeatureLayer(feature_layer_url)
-
-    # Query all features from the layer and convert to pandas dataframe
-    df = fl.query(out_fields='*', return_geometry=False).sdf
-
-    if not df.empty:
-        # Sort by ID and date field in descending order
-        df.sort_values([id_field, date_field], ascending=[True, False], inplace=True)
-
-        # Drop duplicates, keeping only the first (most recent) record for each ID
-        df.drop_duplicates(subset=[id_field], keep='first', inplace=True)
-
-        # Drop rows that have null id field
-        df.dropna(subset=[id_field])
-
-    return df
-
-
 # define NHA feature service rest endpoints
-nha_url = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/0"
-site_account_url = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/5"
-species_url = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/6"
-tr_bullets_url = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/7"
-nha_references_url = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/4"
+nha_url = nha_schema.url("nha_core")
+site_account_url = nha_schema.url("nha_site_accounts")
+species_url = nha_schema.url("nha_species")
+tr_bullets_url = nha_schema.url("nha_tr_bullets")
+nha_references_url = nha_schema.url("nha_references")
 
 # eo rest end point to bring in current EO data
-eo_ptreps = r"https://gis.waterlandlife.org/server/rest/services/PNHP/Biotics_READ_ONLY/FeatureServer/0"
+eo_ptreps = nha_schema.url("eo_ptreps")
 
 # define NHA PUBLIC feature service rest endpoints - these are on our WEBGIS Portal
 PUBLIC_nha_url = r"https://services2.arcgis.com/XM2fovFQqAVipH6f/arcgis/rest/services/Natural_Heritage_Area_Public_Data/FeatureServer/0"
@@ -75,11 +71,9 @@ PUBLIC_nha_references_url = r"https://services2.arcgis.com/XM2fovFQqAVipH6f/arcg
 
 ###################
 ## FIRST WE ARE GOING TO CONNECT TO THE WPC GIS PORTAL AND BRING IN ALL THE DATA AT ONCE SO WE DON'T  HAVE TO KEEP SWITCHING PORTALS
-# load wpc gis portal credentials from OS environment variables - these need to be setup in your operating system environment variables
-wpc_gis_username = os.environ.get("wpc_portal_username")
-wpc_gis_password = os.environ.get("wpc_gis_password")
-# connect to wpc gis Portal account
-gis = GIS('https://gis.waterlandlife.org/portal', wpc_gis_username, wpc_gis_password)
+nha_trace.section("pull NHA data")
+# connect to wpc gis Portal account - credentials are loaded from OS environment variables in nha_session.py
+gis = get_gis("wpc_gis")
 
 # make a layer of nha cores that are ready for review or approved - EXCLUDE draft and not approved. These will be loaded
 # into the public layer in a bit
@@ -132,6 +126,7 @@ nha_layer = arcpy.MakeFeatureLayer_management(nha_copy, "nha_layer", where_claus
 #########################
 ## PREP SUSNs
 #########################
+nha_trace.section("prep SUSNs")
 susn_copy = arcpy.FeatureClassToFeatureClass_conversion(nha_url, "memory", "susn_copy", where_clause = "site_type = 'susn' AND (status = 'rev' OR status = 'app')", field_mapping=field_mapping)
 
 with arcpy.da.UpdateCursor(susn_copy,"sig_rank") as cursor:
@@ -169,11 +164,21 @@ with arcpy.da.UpdateCursor(susn_copy, ["photo_caption", "photo_credit", "photo_a
             cursor.updateRow(row)
 susn_layer = arcpy.MakeFeatureLayer_management(susn_copy, "susn_layer", where_clause = "site_type = 'susn' AND (status = 'rev' OR status = 'app')")
 
+
+#########################
+## PREP PUBLIC GEOMETRY
+#########################
+nha_trace.section("prep public geometry")
+# simplify NHA and SUSN boundaries together so shared boundaries stay shared, and snap them to a coarser resolution for
+# the public web map - this only reruns when boundaries have changed since the last run
+prepare_public_geometry([nha_copy, susn_copy], "public_nhas")
+
 ##########################
 ## LOAD SITE ACCOUNTS
 ##########################
+nha_trace.section("site accounts")
 # load in the most current site account records for all NHAs
-site_accounts = get_latest_records(site_account_url,"nha_join_id","written_date")
+site_accounts = get_latest_records(site_account_url,"nha_join_id","written_date",['site_desc','tr_summary'])
 site_accounts = site_accounts.where(pd.notnull(site_accounts), None)
 
 # Fix date columns (NaT survives .where() and must be handled separately)
@@ -240,15 +245,17 @@ site_accounts_fs = FeatureSet.from_dataframe(site_accounts_df)
 ##########################
 ## LOAD AND FORMAT SPECIES RECORDS
 ##########################
+nha_trace.section("species")
 # Create Pandas dataframe from species table for records are not excluded
-fields = ['EO_ID', 'taxa', 'species_url', 'nha_join_id', 'exclude']
-species_sdf = pd.DataFrame((row for row in arcpy.da.SearchCursor(species_url, fields) if row[4] != "Y"), columns=fields)
+fields = ['EO_ID', 'taxa', 'species_url', 'nha_join_id']
+species_sdf = load_frame(species_url, fields, "exclude <> 'Y' OR exclude IS NULL")
 # format NA values so they play nicely with ArcGIS
 species_sdf = species_sdf.where(pd.notnull(species_sdf), None)
 
 # create pandas dataframe from eo_ptreps layer
-fields = ['EO_ID', 'SNAME', 'SCOMNAME', 'GRANK', 'SRANK', 'USESA', 'SPROT', 'PBSSTATUS', 'EORANK', 'SENSITV_SP', 'SENSITV_EO', 'LASTOBS_YR']
-et_sdf = pd.DataFrame((row for row in arcpy.da.SearchCursor(eo_ptreps, fields)), columns=fields)
+# only the sensitivity flags are categoricals - the other code fields are masked with values that aren't EO codes
+fields = ['EO_ID', 'SNAME', 'SCOMNAME', 'GRANK', 'SRANK', 'SPROT', 'PBSSTATUS', 'EORANK', 'SENSITV_SP', 'SENSITV_EO', 'LASTOBS_YR']
+et_sdf = load_frame(eo_ptreps, fields, categories=['SENSITV_SP', 'SENSITV_EO'], years=['LASTOBS_YR'])
 
 # join species table with eo_ptreps data by EO_ID
 species_sdf = pd.merge(species_sdf, et_sdf, on='EO_ID', how='left')
@@ -287,16 +294,10 @@ taxa_dict = {
 species_sdf['taxa_photo'] = species_sdf['taxa'].map(taxa_dict)
 
 # Deal with sensitive species by masking attributes if sensitive species or sensitive eo are marked Yes
-species_sdf['species_name'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), 'Sensitive Species', species_sdf['species_name'])
-species_sdf['SCOMNAME'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), 'Sensitive Species', species_sdf['SCOMNAME'])
-species_sdf['SNAME'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), '--', species_sdf['SNAME'])
-species_sdf['GRANK'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), '--', species_sdf['GRANK'])
-species_sdf['SRANK'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), '--', species_sdf['SRANK'])
-species_sdf['SPROT'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), '--', species_sdf['SPROT'])
-species_sdf['PBSSTATUS'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), '--', species_sdf['PBSSTATUS'])
-species_sdf['taxa'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), '--', species_sdf['taxa'])
-species_sdf['species_url'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), 'None', species_sdf['species_url'])
-species_sdf['taxa_photo'] = np.where((species_sdf['SENSITV_SP'] == 'Y') | (species_sdf['SENSITV_EO'] == 'Y'), 'https://wpcgis.maps.arcgis.com/sharing/rest/content/items/459e3842241042858937219419dec559/data', species_sdf['taxa_photo'])
+masked_values = {'species_name': 'Sensitive Species', 'SCOMNAME': 'Sensitive Species', 'SNAME': '--', 'GRANK': '--',
+                 'SRANK': '--', 'SPROT': '--', 'PBSSTATUS': '--', 'taxa': '--', 'species_url': 'None',
+                 'taxa_photo': 'https://wpcgis.maps.arcgis.com/sharing/rest/content/items/459e3842241042858937219419dec559/data'}
+species_sdf = mask_sensitive(species_sdf, masked_values)
 
 # Get final species dataframe that will be loaded into PUBLIC feature service
 species_sdf = species_sdf[['species_name','SCOMNAME', 'SNAME', 'GRANK','SRANK','SPROT','PBSSTATUS','LASTOBS_YR','EORANK','taxa','taxa_photo','species_url','nha_join_id']]
@@ -311,6 +312,7 @@ species_fs = FeatureSet.from_dataframe(species_sdf)
 ##########################
 ## LOAD TR BULLETS RECORDS
 ##########################
+nha_trace.section("TR bullets")
 
 # create pandas dataframe from tr_bullets table
 fields = ['threat_text', 'nha_join_id', 'threat_desc']
@@ -330,6 +332,7 @@ tr_bullets_fs = FeatureSet.from_dataframe(tr_bullets_sdf)
 ##########################
 ## LOAD REFERENCE RECORDS
 ##########################
+nha_trace.section("references")
 
 # create pandas dataframe from references table
 fields = ['source_id', 'full_cite']
@@ -343,17 +346,15 @@ references_fs = FeatureSet.from_dataframe(references_sdf)
 ######################
 ## NOW WE ARE GOING TO CONNECT TO THE PUBLIC WEBGIS PORTAL AND START DELETING AND LOADING DATA
 ######################
+nha_trace.section("connect to public portal")
 
-# load wpc WEBGIS credentials from OS environment variables - these need to be setup in your operating system environment variables
-wpc_webgis_username = os.environ.get("wpc_webgis_username")
-wpc_gis_password = os.environ.get("wpc_gis_password")
-wpc_webgis_username = "mmooreWPC"
-# connect to Portal account
-webgis = GIS('https://www.arcgis.com', wpc_webgis_username, wpc_gis_password)
+# connect to ArcGIS Online account - credentials are loaded from OS environment variables in nha_session.py
+webgis = get_gis("agol")
 
 ###### this section deletes NHA polygons and appends current polygons to the Public NHA dataset
+nha_trace.section("load public NHAs")
 # delete all features from NHA Public layer
-public_nha_flayer = FeatureLayer(PUBLIC_nha_url)
+public_nha_flayer = feature_layer(PUBLIC_nha_url)
 public_nha_flayer.delete_features(where="objectid > 0")
 
 # append nha cores to public feature service layer
@@ -362,8 +363,9 @@ arcpy.Append_management(nha_layer,PUBLIC_nha_url,"NO_TEST")
 
 
 ###### this section deletes SUSN polygons and appends current polygons to the Public SUSN dataset
+nha_trace.section("load public SUSNs")
 # delete all features from SUSN Public layer
-public_susn_flayer = FeatureLayer(PUBLIC_susns_url)
+public_susn_flayer = feature_layer(PUBLIC_susns_url)
 public_susn_flayer.delete_features(where="objectid > 0")
 
 # append nha cores to public feature service layer
@@ -373,9 +375,10 @@ arcpy.Append_management(susn_layer,PUBLIC_susns_url,"NO_TEST")
 ############
 ## DELETE AND LOAD IN SITE ACCOUNT RECORDS
 ############
+nha_trace.section("load public site accounts")
 
 # create public species feature layer
-public_site_accounts_flayer = FeatureLayer(PUBLIC_site_accounts_url)
+public_site_accounts_flayer = feature_layer(PUBLIC_site_accounts_url)
 # delete species records from public feature layer
 public_site_accounts_flayer.delete_features(where="objectid > 0")
 # load species records from species feature set
@@ -394,8 +397,9 @@ with arcpy.da.UpdateCursor(PUBLIC_site_accounts_url,["site_desc","tr_summary"])
 ############
 ## DELETE AND LOAD IN SPECIES RECORDS
 ############
+nha_trace.section("load public species")
 # create public species feature layer
-public_species_flayer = FeatureLayer(PUBLIC_species_url)
+public_species_flayer = feature_layer(PUBLIC_species_url)
 # delete species records from public feature layer
 public_species_flayer.delete_features(where="objectid > 0")
 # load species records from species feature set
@@ -404,8 +408,9 @@ public_species_flayer.edit_features(adds = species_fs)
 #######
 ## DELETE AND LOAD IN TR BULLETS
 #######
+nha_trace.section("load public TR bullets")
 # create public tr bullets layer
-tr_bullets_flayer = FeatureLayer(PUBLIC_tr_bullets_url)
+tr_bullets_flayer = feature_layer(PUBLIC_tr_bullets_url)
 # delete all records from the public tr bullets table
 tr_bullets_flayer.delete_features(where="objectid > 0")
 # load tr bullet records from tr bullets feature set
@@ -414,13 +419,28 @@ tr_bullets_flayer.edit_features(adds = tr_bullets_fs)
 #######
 ## DELETE AND LOAD IN NHA REFERENCES
 #######
+nha_trace.section("load public references")
 # create public references feature layer
-references_flayer = FeatureLayer(PUBLIC_nha_references_url)
+references_flayer = feature_layer(PUBLIC_nha_references_url)
 # delete all records from public references table
 references_flayer.delete_features(where="objectid > 0")
 # load references records from references feature set
 references_flayer.edit_features(adds = references_fs)
 
+##########################
+## STATIC EXPORT
+##########################
+# write a static copy of the public NHAs and SUSNs with their site accounts and species from the same data that was
+# loaded into the public feature service above. This runs before the photo fields are added for attachments, and the
+# static copy is optional, so a failure here is only a warning - the public service is already loaded.
+if static_export == "yes":
+    nha_trace.section("static export")
+    try:
+        export_static_public({"nha_public": nha_copy, "susn_public": susn_copy}, site_accounts_df, species_sdf,
+                             static_dir)
+    except Exception as ex:
+        print("WARNING: the static export of the public data failed and was skipped: " + str(ex))
+
 
 
 
@@ -429,6 +449,7 @@ references_flayer.edit_features(adds = references_fs)
 ## append for hosted AGOL layers DOES NOT maintain attachments. So, instead, we are going to download all the pictures
 ## from our portal layer to a local folder, and then add the attachments from there.
 #############
+nha_trace.section("attachments")
 if attachments == "yes":
     # Create directory for photos if it doesn't already exist
     photo_path = r"C:/temp/nha_photos"
@@ -504,3 +525,6 @@ if attachments == "yes":
 #         else:
 #             row[0] = None
 #             cursor.updateRow(row)
+
+report_requests()
+nha_trace.finish()
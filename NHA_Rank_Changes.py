@@ -0,0 +1,166 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: NHA_Rank_Changes.py
+Purpose: This script finds EOs whose ranks, last observed year, or sensitivity have changed in Biotics since the last
+run, refreshes those attributes in the NHA species list, and recalculates the site rank of only the NHAs that include
+the changed EOs. A compact snapshot of EO_ID, GRANK, SRANK, EORANK, LASTOBS_YR, SENSITV_SP, and SENSITV_EO is saved
+after each successful run and the current EO reps are compared to it, so nightly runs take time in proportion to what
+changed in Biotics instead of re-ranking every NHA. The changes found are written to a CSV next to the snapshot. This
+script will be set up to run nightly through task scheduler.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - layer urls come from the schema registry in nha_schema.py and the tracked fields are validated up front.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import os
+import sys
+import datetime
+import numpy as np
+import pandas as pd
+from nha_utils import where_in, natural_key, batch_update
+from nha_tools.site_rank import rank_nhas
+import nha_trace
+import nha_schema
+
+# start tracing this run - each section below is timed with the rows and requests it reads and writes
+nha_trace.start("NHA_Rank_Changes")
+
+# define rest endpoints
+eo_ptreps = nha_schema.url("eo_ptreps")
+nha_core = nha_schema.url("nha_core")
+nha_species = nha_schema.url("nha_species")
+
+# define path of the snapshot of EO attributes from the last successful run and the folder change reports are written
+# to. If the snapshot is deleted, the next run saves a new snapshot without changing anything.
+snapshot_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "biotics_snapshot")
+snapshot_path = os.path.join(snapshot_dir, "eo_ranks.npz")
+# choose whether to treat every EO as changed - use this to refresh and re-rank all NHAs
+full_refresh = "no"
+#full_refresh = "yes"
+
+# EO attributes that are tracked - these are refreshed in the NHA species list when they change. Nulls are stored as
+# the null values below so the snapshot can be a plain numpy array.
+tracked_fields = ["GRANK", "SRANK", "EORANK", "LASTOBS_YR", "SENSITV_SP", "SENSITV_EO"]
+null_values = {"GRANK": "", "SRANK": "", "EORANK": "", "LASTOBS_YR": -1, "SENSITV_SP": "", "SENSITV_EO": ""}
+
+
+# define function to read the current snapshot of tracked EO attributes from the EO reps layer
+def read_snapshot(eo_table):
+    """Returns a structured numpy array of EO_ID and the tracked fields for every EO, sorted by EO_ID."""
+    arr = arcpy.da.TableToNumPyArray(eo_table, ["EO_ID"] + tracked_fields, null_value=null_values)
+    nha_trace.add(rows=len(arr))
+    # string fields come back as wide as the service field - trim them to the longest value to keep the snapshot small
+    dtype = [(name, "U{0}".format(max(1, int(np.char.str_len(arr[name]).max())) if len(arr) else 1))
+             if arr.dtype[name].kind == "U" else (name, arr.dtype[name]) for name in arr.dtype.names]
+    return np.sort(arr.astype(dtype), order="EO_ID")
+
+
+# define function to load the snapshot saved by the last run
+def load_snapshot(path):
+    """Returns the snapshot saved at path, or None if there isn't one."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as saved:
+        return saved["eos"]
+
+
+# define function to save a snapshot. The file is written to a temporary path and then swapped in, so a failure part way
+# through writing doesn't leave a broken snapshot behind.
+def save_snapshot(path, snapshot):
+    """Writes the snapshot to path."""
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    temp_path = path + ".tmp.npz"
+    np.savez_compressed(temp_path, eos=snapshot)
+    os.replace(temp_path, path)
+
+
+# define function to compare two snapshots. Returns one row per changed attribute of EOs in both snapshots, plus a row
+# for each EO that was added or removed.
+def diff_snapshots(old, new):
+    """Returns a DataFrame of EO_ID, field, old_value, and new_value for every change between the snapshots."""
+    old_df = pd.DataFrame(old).set_index("EO_ID")
+    new_df = pd.DataFrame(new).set_index("EO_ID")
+    old_df = old_df[~old_df.index.duplicated(keep="first")]
+    new_df = new_df[~new_df.index.duplicated(keep="first")]
+    both = old_df.index.intersection(new_df.index)
+    old_both = old_df.loc[both, tracked_fields]
+    new_both = new_df.loc[both, tracked_fields]
+    changed = old_both.ne(new_both)
+    changes = changed.stack()
+    changes = changes[changes].index.to_frame(index=False, name=["EO_ID", "field"])
+    changes["old_value"] = [old_both.at[eo, field] for eo, field in zip(changes["EO_ID"], changes["field"])]
+    changes["new_value"] = [new_both.at[eo, field] for eo, field in zip(changes["EO_ID"], changes["field"])]
+    added = pd.DataFrame({"EO_ID": new_df.index.difference(old_df.index), "field": "(added)"})
+    removed = pd.DataFrame({"EO_ID": old_df.index.difference(new_df.index), "field": "(removed)"})
+    return pd.concat([changes, added, removed], ignore_index=True)
+
+
+# define function to convert a snapshot null value back to None
+def from_snapshot(field, value):
+    value = value.item() if isinstance(value, np.generic) else value
+    return None if value == null_values[field] else value
+
+
+nha_trace.section("compare snapshot")
+# check the tracked fields on the EO reps and the species list before reading anything
+nha_schema.validate({"eo_ptreps": ["EO_ID"] + tracked_fields, "nha_species": ["EO_ID", "nha_join_id"] + tracked_fields})
+current = read_snapshot(eo_ptreps)
+previous = None if full_refresh == "yes" else load_snapshot(snapshot_path)
+if previous is None and full_refresh != "yes":
+    # first run - save the snapshot to compare against next time
+    save_snapshot(snapshot_path, current)
+    print("No snapshot of EO ranks was found. Saved a snapshot of " + str(len(current)) + " EOs for the next run.")
+    nha_trace.finish()
+    sys.exit()
+
+if full_refresh == "yes":
+    changes = pd.DataFrame({"EO_ID": current["EO_ID"], "field": "(full refresh)"})
+else:
+    changes = diff_snapshots(previous, current)
+changed_eos = set(changes["EO_ID"].tolist())
+print(str(len(changed_eos)) + " EOs have changed since the last run (" + str(len(changes)) + " changes).")
+
+
+nha_trace.section("refresh species attributes")
+# get current tracked attributes of the changed EOs and the species records that include them. Removed EOs aren't in
+# the current snapshot, so their species records are left alone, but their NHAs are still re-ranked.
+current_by_eo = {row[0]: [from_snapshot(f, v) for f, v in zip(tracked_fields, row[1:])]
+                 for row in current[np.isin(current["EO_ID"], list(changed_eos))].tolist()}
+species_updates = {}
+affected_nhas = set()
+eo_nhas = {}
+for where_clause in where_in("EO_ID", changed_eos):
+    with arcpy.da.SearchCursor(nha_species, ["OID@", "EO_ID", "nha_join_id"] + tracked_fields, where_clause) as cursor:
+        for row in nha_trace.counted(cursor):
+            if row[2] is not None:
+                affected_nhas.add(row[2])
+                eo_nhas.setdefault(row[1], set()).add(row[2])
+            new_values = current_by_eo.get(row[1])
+            if new_values is not None and natural_key(row[3:]) != natural_key(new_values):
+                species_updates[row[0]] = new_values
+
+# write the new attributes to the species records that changed
+updated = batch_update(nha_species, tracked_fields, species_updates)
+print("Updated " + str(updated) + " species records in " + str(len(affected_nhas)) + " NHAs.")
+
+
+nha_trace.section("re-rank NHAs")
+# recalculate the site rank of the NHAs that include changed EOs
+ranks = rank_nhas(nha_core, sorted(affected_nhas))
+
+
+nha_trace.section("save snapshot")
+# write the changes with the NHAs they affected, then save the snapshot - we only get here if all of the updates above
+# were written, so the next run compares against the data these updates came from
+changes["nha_join_id"] = [";".join(sorted(eo_nhas.get(eo, ()))) for eo in changes["EO_ID"]]
+changes["site_rank"] = [";".join(ranks[nha] for nha in sorted(eo_nhas.get(eo, ()))) for eo in changes["EO_ID"]]
+changes_path = os.path.join(snapshot_dir, "eo_rank_changes_{0}.csv".format(datetime.datetime.now().strftime("%Y%m%d")))
+changes.to_csv(changes_path, index=False)
+save_snapshot(snapshot_path, current)
+print("Changes written to " + changes_path)
+nha_trace.finish()
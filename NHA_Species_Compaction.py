@@ -0,0 +1,127 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: NHA_Species_Compaction.py
+Purpose: This script removes duplicate and orphaned records from the NHA species list. Duplicates are species records
+with the same nha_join_id and EO_ID - the record with the most filled in fields is kept (ties go to the lowest
+objectid, which is the record that was transferred first) and the rest are deleted. Records without an EO_ID are
+counted but never treated as duplicates. Orphans are species records whose nha_join_id is empty or no longer exists in
+the NHA core layer. The whole species table is read once and indexed by nha_join_id and EO_ID, and the records to
+remove are deleted in chunks of objectids. Every removed record is written to a CSV report before it is deleted. Set
+dry_run to "yes" to only write the report. Nothing is deleted if no NHAs were read or more than max_removed_share of
+the species records would be removed. This script will be set up to run nightly through task scheduler.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - urls and species fields come from the schema registry in nha_schema.py.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import os
+import datetime
+import pandas as pd
+from nha_utils import natural_key, delete_by_key
+from nha_schema import url, validate, field_names, resolve_fields, oid_field as layer_oid_field
+import nha_trace
+
+# start tracing this run - each section below is timed with the rows and requests it reads and writes
+nha_trace.start("NHA_Species_Compaction")
+
+# define rest endpoints from the schema registry in nha_schema.py
+nha_core = url("nha_core")
+nha_species = url("nha_species")
+
+# choose whether to only report the records that would be removed without deleting them
+dry_run = "no"
+#dry_run = "yes"
+
+# safety check for the delete - if more than this share of the species table would be removed (for example, if the NHA
+# read came back partial and most species look orphaned), the run only writes the report
+max_removed_share = 0.05
+
+# define folder the reports of removed records are written to
+report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compaction_reports")
+
+
+# define function to choose the canonical record out of a group of duplicate records
+def canonical_record(records):
+    """Returns the record (objectid, number of filled fields) with the most filled fields, or the lowest objectid."""
+    return max(records, key=lambda record: (record[1], -record[0]))
+
+
+nha_trace.section("read species")
+# check the key fields before reading anything
+validate({"nha_core": ["nha_join_id"], "nha_species": ["nha_join_id", "EO_ID"]})
+
+# get nha join ids of all NHAs in the core layer
+with arcpy.da.SearchCursor(nha_core, ["nha_join_id"]) as cursor:
+    nha_ids = {row[0] for row in nha_trace.counted(cursor)}
+
+# read every species record and index it by nha_join_id and EO_ID. The species fields come from the cached schema.
+oid_field = layer_oid_field("nha_species")
+species_fields = field_names("nha_species")
+key_positions = [species_fields.index(field) for field in resolve_fields("nha_species", ["nha_join_id", "EO_ID"])]
+rows = {}
+species_index = {}
+with arcpy.da.SearchCursor(nha_species, ["OID@"] + species_fields) as cursor:
+    for row in nha_trace.counted(cursor):
+        values = row[1:]
+        rows[row[0]] = values
+        filled = sum(1 for value in values if value not in (None, ""))
+        key = natural_key([values[i] for i in key_positions])
+        species_index.setdefault(key, []).append((row[0], filled))
+print("Read " + str(len(rows)) + " species records for " + str(len(species_index)) + " NHA and EO combinations.")
+
+
+nha_trace.section("find duplicates and orphans")
+removed = {}
+without_eo = 0
+for (nha_join_id, eo_id), records in species_index.items():
+    if nha_join_id in (None, "") or nha_join_id not in nha_ids:
+        for oid, filled in records:
+            removed[oid] = ("orphan", None)
+    elif eo_id in (None, ""):
+        # records without an EO_ID aren't the same species record just because they share an NHA, so they are only
+        # reported
+        without_eo += len(records)
+    elif len(records) > 1:
+        keep = canonical_record(records)[0]
+        for oid, filled in records:
+            if oid != keep:
+                removed[oid] = ("duplicate", keep)
+orphans = sum(1 for reason, keep in removed.values() if reason == "orphan")
+print("Found " + str(len(removed) - orphans) + " duplicate and " + str(orphans) + " orphaned species records.")
+if without_eo:
+    print(str(without_eo) + " species records in existing NHAs don't have an EO_ID and were not checked for duplicates.")
+
+
+nha_trace.section("write report")
+# write the removed records before they are deleted so they can be restored if needed
+if not os.path.isdir(report_dir):
+    os.makedirs(report_dir)
+report = pd.DataFrame([[oid, reason, keep] + list(rows[oid]) for oid, (reason, keep) in sorted(removed.items())],
+                      columns=[oid_field, "removed_reason", "kept_" + oid_field] + species_fields)
+report_path = os.path.join(report_dir, "species_compaction_{0}.csv".format(datetime.datetime.now().strftime("%Y%m%d")))
+report.to_csv(report_path, index=False)
+print("Removed records written to " + report_path)
+
+
+# don't delete anything if the NHA core read came back empty or the share of records to remove is too large - both point
+# to a failed or partial read rather than real orphans
+removed_share = len(removed) / len(rows) if rows else 0
+print("Removing " + str(len(removed)) + " of " + str(len(rows)) + " species records ({0:.1%}) against {1} NHAs.".format(
+    removed_share, len(nha_ids)))
+if dry_run != "yes" and not nha_ids:
+    print("No NHAs were read from the NHA core layer - only the report was written and nothing was deleted.")
+    dry_run = "yes"
+elif dry_run != "yes" and removed_share > max_removed_share:
+    print("More than {0:.0%} of the species records would be removed - only the report was written and nothing was "
+          "deleted. Check the report and raise max_removed_share to remove them.".format(max_removed_share))
+    dry_run = "yes"
+
+if dry_run != "yes":
+    nha_trace.section("delete records")
+    deleted = delete_by_key(nha_species, oid_field, sorted(removed))
+    print("Deleted " + str(deleted) + " species records.")
+nha_trace.finish()
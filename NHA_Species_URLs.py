@@ -0,0 +1,36 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: NHA_Species_URLs.py
+Purpose: This script fills species account urls across the whole NHA species list from the species url reference
+layer. The Populate Species List tool only fills urls for the NHAs it runs on, so run this when new species accounts
+are added to the reference layer. Set refresh_all to "yes" to also replace urls that have changed in the reference
+layer - otherwise only species without a url are filled.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - layer urls come from the schema registry in nha_schema.py and the url fields are validated up front.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+from nha_tools.common import fill_species_urls
+import nha_trace
+import nha_schema
+
+# start tracing this run
+nha_trace.start("NHA_Species_URLs")
+
+# define rest endpoints for the NHA species list and the species url reference layer
+nha_species = nha_schema.url("nha_species")
+species_urls = nha_schema.url("species_urls")
+
+# choose whether to replace urls that have changed as well as filling missing urls
+refresh_all = "no"
+#refresh_all = "yes"
+
+# check the url fields on both layers before filling anything
+nha_schema.validate({"nha_species": ["ELSUBID", "species_url"], "species_urls": ["element_su", "url"]})
+
+updated = fill_species_urls(nha_species, species_urls, only_missing=refresh_all != "yes")
+print("Updated species urls for " + str(updated) + " species records.")
+nha_trace.finish()
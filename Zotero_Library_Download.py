@@ -6,23 +6,28 @@ the pick lists for the NHA Update Form. This script will run nightly to update t
 Author: Molly Moore for Pennsylvania Natural Heritage Program
 Created: 11/7/2024
 Updates:
+10/19/2026 - portal login and feature layers come from the shared session manager in nha_session.py.
+10/19/2026 - script sections are traced with nha_trace and the trace is written to JSON and CSV files.
 ------------------------------------------------------------------------------------------------------------------------
 """
 
 # import packages
-import os
 import json
 import pandas as pd
 import requests
 import arcpy
-from arcgis.gis import GIS
-from arcgis.features import FeatureLayer
 from pyzotero import zotero
 import time
+from nha_session import get_gis, feature_layer, report_requests
+import nha_trace
+import nha_schema
+
+# start tracing this run - each section below is timed with the rows and requests it reads and writes
+nha_trace.start("Zotero_Library_Download")
 
 # define rest endpoint for zotero refs feature service which is used to populate the pick list in the NHA update form
-zotero_ref_url = r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/5"
-nha_reference_url = r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/4"
+zotero_ref_url = nha_schema.url("zotero_references")
+nha_reference_url = nha_schema.url("nha_references")
 
 # define the PNHP zotero library settings - you can find the library ID in the https address bar when you click on the library
 library_id = 2166223
@@ -48,6 +53,7 @@ def paginate_api(url):
 
         data = response.json()
         results.extend(data)
+        nha_trace.add(rows=len(data), requests=1, bytes=len(response.content))
 
         # Check for 'rel=next' link in the response headers
         link_header = response.headers.get('Link')
@@ -84,11 +90,13 @@ def flatten_dict(d, parent_key='', sep='_'):
 
 
 # fetch all data from the PNHP zotero library through the API
+nha_trace.section("download zotero library")
 all_data = paginate_api(api_url)
 # flatten data into dictionary without nested dictionaries
 flattened_data = [flatten_dict(item) for item in all_data]
 
 # create dataframe from the dictionary
+nha_trace.section("format references")
 df = pd.DataFrame(flattened_data)
 
 # rename columns to match our columns
@@ -118,14 +126,12 @@ df_final = df1[final_columns]
 # drop item types that don't meet the guidelines for inclusion
 df_final = df_final.query('item_type != "annotation" and item_type != "note" and item_type != "attachment" and item_type != "computerProgram"')
 
-# load gis credentials from OS environment variables - these need to be setup in your operating system environment variables
-wpc_gis_username = os.environ.get("wpc_portal_username")
-wpc_gis_password = os.environ.get("wpc_gis_password")
-# connect to Portal account
-gis = GIS('https://gis.waterlandlife.org/portal', wpc_gis_username, wpc_gis_password)
+# connect to Portal account - credentials are loaded from OS environment variables in nha_session.py
+nha_trace.section("load zotero references")
+gis = get_gis("wpc_gis")
 
 # get zotero ref feature layer object and delete all records
-zotero_ref_flayer = FeatureLayer(zotero_ref_url)
+zotero_ref_flayer = feature_layer(zotero_ref_url)
 zotero_ref_flayer.delete_features(where="objectid > 0")
 
 # need to add full_citation column to make sure schema matches feature layer schema
@@ -141,6 +147,7 @@ zotero_ref_flayer.edit_features(adds=fs)
 ########################################################################################################################
 ## Calculate citation
 ########################################################################################################################
+nha_trace.section("calculate citations")
 
 # this function is to get the HTML citation version
 def get_citation(item_key):
@@ -168,5 +175,9 @@ with arcpy.da.UpdateCursor(nha_reference_url, ["zotero_key", "full_cite"]) as cu
             a = get_citation(zotero_key)
             row[1] = a[0]
             cursor.updateRow(row)
+            nha_trace.add(rows=1, requests=1)
         else:
             pass
+
+report_requests()
+nha_trace.finish()
@@ -0,0 +1,476 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: fixtures.py
+Purpose: Generates synthetic NHA, Biotics, reference, survey form, and Zotero data for the offline benchmarks. Every
+layer and table is keyed by the production url it stands in for, so standin_service.py can serve it at the matching
+path. Data are generated from a seed, so the same scale and seed always give the same fixtures and benchmark runs can
+be compared with each other.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import math
+import random
+import datetime
+
+# number of records at each benchmark scale. statewide is about the size of the production NHA and Biotics data.
+scales = {
+    "small": {"nhas": 100, "eos_per_nha": 6, "orphan_eos": 150, "elements": 300, "visits_per_sf": 2,
+              "surveys": 40, "zotero_items": 200, "protected_lands": 150, "municipality_grid": (12, 8),
+              "vertices": 48},
+    "medium": {"nhas": 1000, "eos_per_nha": 6, "orphan_eos": 1500, "elements": 1500, "visits_per_sf": 2,
+               "surveys": 300, "zotero_items": 1500, "protected_lands": 1500, "municipality_grid": (40, 25),
+               "vertices": 96},
+    "statewide": {"nhas": 3500, "eos_per_nha": 7, "orphan_eos": 6000, "elements": 3500, "visits_per_sf": 3,
+                  "surveys": 1000, "zotero_items": 4000, "protected_lands": 6000, "municipality_grid": (60, 43),
+                  "vertices": 160},
+}
+
+# production service roots - fixtures are keyed by the urls under these
+gis_services = "https://gis.waterlandlife.org/server/rest/services"
+public_services = "https://services2.arcgis.com/XM2fovFQqAVipH6f/arcgis/rest/services"
+webgis_services = "https://webgis.waterlandlife.org/server/rest/services"
+
+# item id of the NHA update form survey in NHA_Form_Transfer.py and the url of its hosted feature service
+survey_id = "3360207b68a94e03b125b14804fcf906"
+survey_service = gis_services + "/Hosted/survey123_" + survey_id + "/FeatureServer"
+
+# extent of Pennsylvania in web mercator, which all fixture geometries are drawn in
+pa_extent = (-8960000.0, 4830000.0, -8320000.0, 5200000.0)
+spatial_reference = {"wkid": 102100, "latestWkid": 3857}
+
+# element code prefixes and the taxa they are reported as, weighted roughly like the NHA species list
+element_groups = [("PDAST", "Vascular Plant", 40), ("PMCYP", "Vascular Plant", 15), ("IMBIV", "Invertebrate - Mussels", 6),
+                  ("IILEP", "Invertebrate - Moths", 8), ("IIODO", "Invertebrate - Dragonflies and Damselflies", 5),
+                  ("ABPBX", "Bird", 8), ("AAAAA", "Salamander", 3), ("AAABH", "Frog", 2), ("ARAAD", "Reptile", 3),
+                  ("AFCJB", "Fish", 4), ("AMACC", "Mammal", 3), ("CTEXX", "Community", 3)]
+
+# rank codes and how they round - these are the values in the rank reference tables
+grank_rounding = {"G1": "G1", "G1G2": "G1", "G2": "G2", "G2G3": "G2", "G3": "G3", "G3G4": "G3", "G4": "G4",
+                  "G4G5": "G4", "G5": "G5", "G5T1": "G1", "G5T2": "G2", "G5T3": "G3", "GNR": "GNR", "GU": "GNR",
+                  "GH": "GH", "GX": "GX"}
+srank_rounding = {"S1": "S1", "S1S2": "S1", "S2": "S2", "S2S3": "S2", "S3": "S3", "S3S4": "S3", "S4": "S4",
+                  "S5": "S5", "S1B": "S1", "S2B": "S2", "S3B": "S3", "SH": "SH", "SX": "SX", "SNR": "SNR", "SU": "SNR"}
+eorank_weights = {"A": 1.0, "AB": 0.9, "AC": 0.85, "B": 0.8, "BC": 0.7, "C": 0.6, "CD": 0.5, "D": 0.4, "E": 0.75,
+                  "H": 0.1, "F": 0.05, "X": 0.0, "U": 0.5, "NR": 0.5}
+
+# field type names used by the feature service json
+field_types = {"oid": "esriFieldTypeOID", "text": "esriFieldTypeString", "int": "esriFieldTypeInteger",
+               "double": "esriFieldTypeDouble", "date": "esriFieldTypeDate", "guid": "esriFieldTypeGUID",
+               "globalid": "esriFieldTypeGlobalID"}
+
+
+# define function to build the field list of a layer from (name, type) pairs. Every layer gets an objectid field.
+def make_fields(spec):
+    """Returns a list of feature service field definitions for objectid plus the (name, type) pairs in spec."""
+    fields = [{"name": "objectid", "type": field_types["oid"], "alias": "OBJECTID", "nullable": False,
+               "editable": False}]
+    for name, kind in spec:
+        field = {"name": name, "type": field_types[kind], "alias": name, "nullable": kind not in ("globalid",),
+                 "editable": kind not in ("globalid",)}
+        if kind == "text":
+            field["length"] = 4000 if name in ("site_desc", "tr_summary", "abstract_note", "full_cite") else 255
+        fields.append(field)
+    return fields
+
+
+# define function to make an empty layer or table
+def make_layer(name, spec, geometry_type=None, edit_tracking=False):
+    """Returns a fixture layer dictionary with no features."""
+    if edit_tracking:
+        spec = list(spec) + [("CreationDate", "date"), ("Creator", "text"), ("EditDate", "date"), ("Editor", "text")]
+    return {"name": name, "geometryType": geometry_type, "fields": make_fields(spec), "features": [],
+            "editTracking": edit_tracking}
+
+
+# define function to draw a closed polygon ring around a point - a jittered circle with the given number of vertices,
+# drawn clockwise the way the feature service expects outer rings
+def make_ring(rng, x, y, radius, vertices):
+    """Returns a list of [x, y] coordinates for a closed ring."""
+    ring = []
+    for i in range(vertices):
+        angle = -2 * math.pi * i / vertices
+        r = radius * rng.uniform(0.8, 1.2)
+        ring.append([round(x + r * math.cos(angle), 2), round(y + r * math.sin(angle), 2)])
+    ring.append(list(ring[0]))
+    return ring
+
+
+# define function to get a random point in the Pennsylvania extent
+def random_point(rng, margin=5000.0):
+    """Returns (x, y) somewhere inside pa_extent."""
+    return (rng.uniform(pa_extent[0] + margin, pa_extent[2] - margin),
+            rng.uniform(pa_extent[1] + margin, pa_extent[3] - margin))
+
+
+# define function to get an epoch millisecond date from a year
+def epoch_ms(year, day_of_year=1):
+    """Returns the epoch milliseconds of a day in a year."""
+    date = datetime.datetime(year, 1, 1) + datetime.timedelta(days=day_of_year - 1)
+    return int((date - datetime.datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+# define function to make a random GlobalID
+def make_guid(rng):
+    """Returns a GlobalID string in braces."""
+    hex_digits = "%032x" % rng.getrandbits(128)
+    return "{" + "-".join([hex_digits[:8], hex_digits[8:12], hex_digits[12:16], hex_digits[16:20],
+                           hex_digits[20:]]).upper() + "}"
+
+
+# define function to build the element (species) list that EOs are drawn from
+def make_elements(rng, n):
+    """Returns a list of element dictionaries with ELCODE, ELSUBID, names, ranks, and status fields."""
+    groups = [g for g in element_groups for _ in range(g[2])]
+    elements = []
+    for i in range(n):
+        prefix, taxa, _ = rng.choice(groups)
+        grank = rng.choice(list(grank_rounding))
+        elements.append({
+            "ELCODE": "{0}{1:05d}".format(prefix, i), "ELSUBID": 10000 + i, "taxa": taxa,
+            "SNAME": "Genus{0} species{1}".format(i // 7, i), "SCOMNAME": "Common {0} {1}".format(taxa.split()[-1], i),
+            "GRANK": grank, "SRANK": rng.choice(list(srank_rounding)),
+            "USESA": rng.choice(["LE", "LT", None, None, None, None, None, None]),
+            "SPROT": rng.choice(["PE", "PT", "PR", "TU", None, None]),
+            "PBSSTATUS": rng.choice(["PE", "PT", "PR", "N", None]),
+            "SENSITV_SP": "Y" if rng.random() < 0.05 else "N",
+        })
+    return elements
+
+
+# define function to build the rank reference tables from the rank codes above
+def make_rank_tables(layers):
+    """Fills the rounded grank, rounded srank, rank matrix, and eorank weight reference tables."""
+    grank_table = make_layer("rounded_grank", [("grank", "text"), ("grank_rounded", "text")])
+    srank_table = make_layer("rounded_srank", [("srank", "text"), ("srank_rounded", "text")])
+    matrix_table = make_layer("nha_rank_matrix", [("grank", "text"), ("srank", "text"), ("combinedrank", "text"),
+                                                  ("score", "double")])
+    weights_table = make_layer("eorank_weights", [("eorank", "text"), ("weight", "double")])
+    grank_table["features"] = [{"attributes": {"grank": g, "grank_rounded": r}} for g, r in grank_rounding.items()]
+    srank_table["features"] = [{"attributes": {"srank": s, "srank_rounded": r}} for s, r in srank_rounding.items()]
+    gscores = {"G1": 512, "G2": 256, "G3": 128, "G4": 16, "G5": 4, "GNR": 2, "GH": 1, "GX": 0}
+    sscores = {"S1": 64, "S2": 32, "S3": 16, "S4": 2, "S5": 1, "SNR": 1, "SH": 0.5, "SX": 0}
+    matrix_table["features"] = [{"attributes": {"grank": g, "srank": s, "combinedrank": g + s,
+                                                "score": float(gscores[g] + sscores[s])}}
+                                for g in gscores for s in sscores]
+    weights_table["features"] = [{"attributes": {"eorank": e, "weight": w}} for e, w in eorank_weights.items()]
+    references = gis_services + "/Hosted/NHA_Reference_Layers/FeatureServer/"
+    layers[references + "1"] = weights_table
+    layers[references + "2"] = matrix_table
+    layers[references + "3"] = grank_table
+    layers[references + "4"] = srank_table
+
+
+# define function to generate all fixtures for a scale
+def make_fixtures(scale="small", seed=0):
+    """
+    Returns {"layers": {production url: layer}, "items": {item id: service url}, "zotero": [items]} for the named
+    scale. Layers are dictionaries with name, geometryType, fields, features, and editTracking.
+    """
+    counts = scales[scale]
+    rng = random.Random(seed)
+    layers = {}
+    nha_edit = gis_services + "/PNHP/NHA_EDIT/FeatureServer/"
+    biotics = gis_services + "/PNHP/Biotics_READ_ONLY/FeatureServer/"
+    references = gis_services + "/Hosted/NHA_Reference_Layers/FeatureServer/"
+    vertices = counts["vertices"]
+
+    # elements and rank reference tables
+    elements = make_elements(rng, counts["elements"])
+    make_rank_tables(layers)
+
+    # NHA cores - jittered circles spread over the state, a tenth of them SUSNs
+    nha_layer = make_layer("Natural Heritage Areas", [
+        ("nha_join_id", "text"), ("site_name", "text"), ("site_type", "text"), ("desc_", "text"), ("status", "text"),
+        ("status_change_date", "date"), ("status_change_reason", "text"), ("drawn_user", "text"),
+        ("drawn_date", "date"), ("drawn_notes", "text"), ("review_user", "text"), ("review_date", "date"),
+        ("review_notes", "text"), ("sig_rank", "text"), ("sig_rank_comm", "text"), ("project", "text"),
+        ("source_report", "text"), ("site_pdf_link", "text"), ("wpc_blueprint", "text"), ("photo_credit", "text"),
+        ("photo_affil", "text"), ("photo_caption", "text"), ("GlobalID", "globalid"), ("created_user", "text"),
+        ("created_date", "date"), ("last_edited_user", "text"), ("last_edited_date", "date")],
+        "esriGeometryPolygon")
+    nhas = []
+    for i in range(counts["nhas"]):
+        x, y = random_point(rng)
+        radius = rng.uniform(400, 2500)
+        nha = {"nha_join_id": "NHA{0:05d}".format(i), "GlobalID": make_guid(rng), "x": x, "y": y, "radius": radius,
+               "drawn_year": rng.randint(2005, 2025)}
+        nhas.append(nha)
+        nha_layer["features"].append({"attributes": {
+            "nha_join_id": nha["nha_join_id"], "site_name": "Synthetic Site {0}".format(i),
+            "site_type": "susn" if i % 10 == 9 else ("hist" if i % 25 == 3 else "nha"),
+            "desc_": "Synthetic NHA {0}".format(i), "status": rng.choice(["app", "app", "rev", "dra", "nap"]),
+            "drawn_user": "bench", "drawn_date": epoch_ms(nha["drawn_year"], rng.randint(1, 360)),
+            "sig_rank": rng.choice(["G", "R", "S", "L", None]), "wpc_blueprint": rng.choice(["Y", "N"]),
+            "photo_caption": rng.choice([None, "Synthetic photo"]), "photo_credit": rng.choice([None, "Bench"]),
+            "photo_affil": rng.choice([None, "PNHP"]), "GlobalID": nha["GlobalID"], "created_user": "bench",
+            "created_date": epoch_ms(nha["drawn_year"])},
+            "geometry": {"rings": [make_ring(rng, x, y, radius, vertices)]}})
+    layers[nha_edit + "0"] = nha_layer
+
+    # EO reps - most EOs are placed inside an NHA, the rest are orphans somewhere else in the state
+    eo_layer = make_layer("EO Reps", [
+        ("EO_ID", "int"), ("ELCODE", "text"), ("ELSUBID", "int"), ("SNAME", "text"), ("SCOMNAME", "text"),
+        ("GRANK", "text"), ("SRANK", "text"), ("EORANK", "text"), ("LASTOBS", "text"), ("LASTOBS_YR", "int"),
+        ("SURVEY_YR", "int"), ("EO_TRACK", "text"), ("EST_RA", "text"), ("USESA", "text"), ("SPROT", "text"),
+        ("PBSSTATUS", "text"), ("SENSITV_SP", "text"), ("SENSITV_EO", "text"), ("INDEP_SF", "text")],
+        "esriGeometryPolygon")
+    eos = []
+    n_eos = counts["nhas"] * counts["eos_per_nha"] + counts["orphan_eos"]
+    for i in range(n_eos):
+        nha = nhas[i // counts["eos_per_nha"]] if i < counts["nhas"] * counts["eos_per_nha"] else None
+        if nha:
+            angle = rng.uniform(0, 2 * math.pi)
+            distance = rng.uniform(0, nha["radius"] * 0.6)
+            x, y = nha["x"] + distance * math.cos(angle), nha["y"] + distance * math.sin(angle)
+        else:
+            x, y = random_point(rng)
+        element = rng.choice(elements)
+        lastobs_yr = rng.randint(1940, 2025)
+        eo = dict(element, EO_ID=100000 + i, x=x, y=y, nha=nha, EORANK=rng.choice(list(eorank_weights)),
+                  LASTOBS_YR=lastobs_yr, SURVEY_YR=lastobs_yr - rng.randint(0, 5),
+                  SENSITV_EO="Y" if rng.random() < 0.03 else "N")
+        eos.append(eo)
+        attributes = {k: eo[k] for k in ("EO_ID", "ELCODE", "ELSUBID", "SNAME", "SCOMNAME", "GRANK", "SRANK",
+                                         "EORANK", "LASTOBS_YR", "SURVEY_YR", "USESA", "SPROT", "PBSSTATUS",
+                                         "SENSITV_SP", "SENSITV_EO")}
+        attributes.update({"LASTOBS": "{0}-06-15".format(lastobs_yr) if rng.random() > 0.02 else "NO DATE",
+                           "EO_TRACK": "Y" if rng.random() > 0.05 else "N",
+                           "EST_RA": rng.choice(["Very High", "High", "Medium", "Low"]), "INDEP_SF": "N"})
+        eo_layer["features"].append({"attributes": attributes,
+                                     "geometry": {"rings": [make_ring(rng, x, y, rng.uniform(30, 200), 12)]}})
+    layers[biotics + "0"] = eo_layer
+
+    # source features - one to three per EO split across the point, line, and polygon layers, and visits to them
+    sf_spec = [("SF_ID", "int"), ("EO_ID", "int"), ("ELCODE", "text"), ("USESA", "text"), ("EO_TRACK", "text"),
+               ("EST_RA", "text"), ("INDEP_SF", "text")]
+    sf_layers = {"point": make_layer("Source Feature Points", sf_spec, "esriGeometryPoint"),
+                 "line": make_layer("Source Feature Lines", sf_spec, "esriGeometryPolyline"),
+                 "polygon": make_layer("Source Feature Polygons", sf_spec, "esriGeometryPolygon")}
+    visits = make_layer("Visits", [("SF_ID", "int"), ("VISIT_YR", "int"), ("VISIT_DATE", "date")])
+    sf_id = 500000
+    for eo in eos:
+        for _ in range(rng.randint(1, 3)):
+            kind = rng.choice(["point", "point", "line", "polygon"])
+            x, y = eo["x"] + rng.uniform(-20, 20), eo["y"] + rng.uniform(-20, 20)
+            if kind == "point":
+                geometry = {"x": round(x, 2), "y": round(y, 2)}
+            elif kind == "line":
+                geometry = {"paths": [[[round(x - 40, 2), round(y, 2)], [round(x, 2), round(y + 10, 2)],
+                                       [round(x + 40, 2), round(y, 2)]]]}
+            else:
+                geometry = {"rings": [make_ring(rng, x, y, 25, 8)]}
+            sf_layers[kind]["features"].append({"attributes": {
+                "SF_ID": sf_id, "EO_ID": eo["EO_ID"], "ELCODE": eo["ELCODE"], "USESA": eo["USESA"],
+                "EO_TRACK": "Y", "EST_RA": "High", "INDEP_SF": "N"}, "geometry": geometry})
+            for _ in range(rng.randint(0, counts["visits_per_sf"])):
+                year = rng.randint(1980, 2025)
+                visits["features"].append({"attributes": {"SF_ID": sf_id, "VISIT_YR": year,
+                                                          "VISIT_DATE": epoch_ms(year, rng.randint(90, 280))}})
+            sf_id += 1
+    layers[biotics + "2"] = sf_layers["point"]
+    layers[biotics + "3"] = sf_layers["line"]
+    layers[biotics + "4"] = sf_layers["polygon"]
+    layers[biotics + "7"] = visits
+
+    # NHA species list - the EOs in each NHA, with a few duplicate rows like the ones the compaction job removes
+    species = make_layer("NHA Species", [
+        ("EO_ID", "int"), ("ELCODE", "text"), ("SNAME", "text"), ("SCOMNAME", "text"), ("ELSUBID", "int"),
+        ("LASTOBS_YR", "int"), ("SURVEY_YR", "int"), ("EO_TRACK", "text"), ("GRANK", "text"), ("SRANK", "text"),
+        ("SPROT", "text"), ("USESA", "text"), ("PBSSTATUS", "text"), ("SENSITV_SP", "text"), ("SENSITV_EO", "text"),
+        ("EORANK", "text"), ("exclude", "text"), ("exclude_reason", "text"), ("nha_join_id", "text"),
+        ("nha_rel_GUID", "guid"), ("taxa", "text"), ("species_url", "text")])
+    for eo in eos:
+        if eo["nha"] is None:
+            continue
+        row = {k: eo[k] for k in ("EO_ID", "ELCODE", "SNAME", "SCOMNAME", "ELSUBID", "LASTOBS_YR", "SURVEY_YR",
+                                  "GRANK", "SRANK", "SPROT", "USESA", "PBSSTATUS", "SENSITV_SP", "SENSITV_EO",
+                                  "EORANK", "taxa")}
+        row.update({"EO_TRACK": "Y", "exclude": "Y" if rng.random() < 0.1 else "N",
+                    "nha_join_id": eo["nha"]["nha_join_id"], "nha_rel_GUID": eo["nha"]["GlobalID"],
+                    "species_url": None if rng.random() < 0.3 else "https://example.org/species/{0}".format(eo["ELSUBID"])})
+        species["features"].append({"attributes": row})
+        if rng.random() < 0.02:
+            species["features"].append({"attributes": dict(row)})
+    layers[nha_edit + "6"] = species
+
+    # species account urls by ELSUBID
+    urls = make_layer("Species URLs", [("element_su", "int"), ("url", "text")])
+    urls["features"] = [{"attributes": {"element_su": e["ELSUBID"],
+                                        "url": "https://example.org/species/{0}".format(e["ELSUBID"])}}
+                        for e in elements if rng.random() < 0.8]
+    layers[references + "6"] = urls
+
+    # site accounts, TR bullets, and references for each NHA
+    site_accounts = make_layer("Site Accounts", [
+        ("nha_join_id", "text"), ("site_name", "text"), ("site_desc", "text"), ("tr_summary", "text"),
+        ("written_user", "text"), ("written_date", "date"), ("written_notes", "text"), ("review_user", "text"),
+        ("review_date", "date"), ("review_notes", "text"), ("status", "text"), ("nha_rel_GUID", "guid"),
+        ("GlobalID", "globalid"), ("created_date", "date")])
+    tr_bullets = make_layer("TR Bullets", [
+        ("nha_join_id", "text"), ("threat_text", "text"), ("added_user", "text"), ("added_date", "date"),
+        ("site_name", "text"), ("target_category", "text"), ("threat_desc", "text"), ("nha_rel_GUID", "guid"),
+        ("added_notes", "text")])
+    nha_references = make_layer("References", [
+        ("zotero_key", "text"), ("source_id", "text"), ("source_field", "text"), ("source_table", "text"),
+        ("title", "text"), ("authors", "text"), ("publication_yr", "text"), ("site_account_GUID", "guid"),
+        ("full_cite", "text")])
+    zotero_keys = ["Z{0:07d}".format(i) for i in range(counts["zotero_items"])]
+    for i, nha in enumerate(nhas):
+        site_name = "Synthetic Site {0}".format(i)
+        for j in range(rng.randint(1, 3)):
+            year = nha["drawn_year"] + j
+            site_accounts["features"].append({"attributes": {
+                "nha_join_id": nha["nha_join_id"], "site_name": site_name,
+                "site_desc": "Description of Genus{0} species{1} habitat. ".format(i % 50, i) * 8,
+                "tr_summary": "Threats and recommendations summary. " * 6, "written_user": "bench",
+                "written_date": epoch_ms(year, 100), "status": "app", "nha_rel_GUID": nha["GlobalID"],
+                "GlobalID": make_guid(rng), "created_date": epoch_ms(year, 101)}})
+        for j in range(rng.randint(2, 5)):
+            tr_bullets["features"].append({"attributes": {
+                "nha_join_id": nha["nha_join_id"], "threat_text": "Threat {0} to Genus{1}.".format(j, i % 50),
+                "added_user": "bench", "added_date": epoch_ms(nha["drawn_year"], 120), "site_name": site_name,
+                "target_category": "General", "threat_desc": "Synthetic threat", "nha_rel_GUID": nha["GlobalID"]}})
+        for j in range(rng.randint(1, 3)):
+            nha_references["features"].append({"attributes": {
+                "zotero_key": rng.choice(zotero_keys), "source_id": nha["nha_join_id"], "source_field": "site_desc",
+                "source_table": "site_account", "title": "Synthetic reference", "authors": "Bench, A.",
+                "publication_yr": "2020", "full_cite": "Bench, A. (2020). Synthetic reference."}})
+    layers[nha_edit + "5"] = site_accounts
+    layers[nha_edit + "7"] = tr_bullets
+    layers[nha_edit + "4"] = nha_references
+
+    # related boundaries and protected lands tables that Fill Related Attribute Tables replaces
+    boundaries = make_layer("Boundaries", [("county", "text"), ("municipality", "text"), ("nha_join_id", "text"),
+                                           ("nha_rel_GUID", "guid")])
+    protected = make_layer("Protected Lands", [("protected_land", "text"), ("owner", "text"), ("type", "text"),
+                                               ("nha_join_id", "text"), ("nha_rel_GUID", "guid")])
+    for nha in nhas:
+        boundaries["features"].append({"attributes": {"county": "County", "municipality": "Township",
+                                                      "nha_join_id": nha["nha_join_id"],
+                                                      "nha_rel_GUID": nha["GlobalID"]}})
+    layers[nha_edit + "2"] = boundaries
+    layers[nha_edit + "3"] = protected
+
+    # overlay sources - protected lands scattered over the state and a grid of municipalities in counties
+    protected_lands = make_layer("Protected Lands", [("sitename", "text"), ("loc_own", "text")], "esriGeometryPolygon")
+    for i in range(counts["protected_lands"]):
+        x, y = random_point(rng)
+        protected_lands["features"].append({"attributes": {"sitename": "Protected Land {0}".format(i),
+                                                           "loc_own": rng.choice(["State", "Federal", "Private"])},
+                                            "geometry": {"rings": [make_ring(rng, x, y, rng.uniform(300, 4000),
+                                                                             vertices)]}})
+    layers[gis_services + "/BaseLayers/We_Conserve_PA_Protected_Lands/FeatureServer/0"] = protected_lands
+    municipalities = make_layer("Municipalities", [("COUNTY_NAM", "text"), ("MUNICIPA_1", "text")],
+                                "esriGeometryPolygon")
+    columns, rows = counts["municipality_grid"]
+    width = (pa_extent[2] - pa_extent[0]) / columns
+    height = (pa_extent[3] - pa_extent[1]) / rows
+    for c in range(columns):
+        for r in range(rows):
+            x0, y0 = pa_extent[0] + c * width, pa_extent[1] + r * height
+            municipalities["features"].append({"attributes": {
+                "COUNTY_NAM": "COUNTY {0}".format((c // 6) * 10 + r // 6), "MUNICIPA_1": "TOWNSHIP {0}-{1}".format(c, r)},
+                "geometry": {"rings": [[[x0, y0], [x0, y0 + height], [x0 + width, y0 + height], [x0 + width, y0],
+                                        [x0, y0]]]}})
+    layers[gis_services + "/Boundaries/FeatureServer/2"] = municipalities
+
+    # survey form layer and its repeat tables - a mix of new NHAs, updates, and approvals that haven't been loaded
+    form = make_layer("NHA Update Form", [
+        ("globalid", "globalid"), ("uniquerowid", "text"), ("nha_join_id", "text"), ("site_name", "text"),
+        ("proposed_name", "text"), ("objective", "text"), ("update_nha", "text"), ("site_desc_approve", "text"),
+        ("threat_approve", "text"), ("site_desc", "text"), ("tr_summary", "text"), ("written_user", "text"),
+        ("written_date", "date"), ("written_notes", "text"), ("review_user", "text"), ("review_notes", "text"),
+        ("nha_rel_guid", "text"), ("load_status", "text"), ("site_review_status", "text"),
+        ("map_review_status", "text"), ("mapping_update", "text"), ("species_update", "text"),
+        ("mapping_update_notes", "text"), ("species_update_notes", "text"), ("photo_approve", "text"),
+        ("photo_credit", "text"), ("photo_affil", "text"), ("photo_caption", "text"), ("created_user", "text")],
+        "esriGeometryPoint", edit_tracking=True)
+    site_refs = make_layer("site_desc_refs", [("globalid", "globalid"), ("parentrowid", "text"), ("key_1", "text")],
+                           edit_tracking=True)
+    threat_refs = make_layer("threat_refs", [("globalid", "globalid"), ("parentrowid", "text"), ("key_2", "text")],
+                             edit_tracking=True)
+    tr_repeat = make_layer("tr_repeat", [
+        ("globalid", "globalid"), ("parentrowid", "text"), ("threat_text", "text"), ("threat_category", "text"),
+        ("threat", "text"), ("load_status", "text"), ("created_user", "text")], edit_tracking=True)
+    now = epoch_ms(2026, 280)
+    for i in range(counts["surveys"]):
+        nha = rng.choice(nhas)
+        uniquerowid = make_guid(rng)
+        objective = rng.choice(["update", "update", "update", "new"])
+        form["features"].append({"attributes": {
+            "globalid": make_guid(rng), "uniquerowid": uniquerowid, "nha_join_id": nha["nha_join_id"],
+            "site_name": None if objective == "new" else "Synthetic Site", "proposed_name": "Proposed Site {0}".format(i),
+            "objective": objective, "update_nha": rng.choice(["y", "n"]),
+            "site_desc_approve": rng.choice(["approve", "update"]), "threat_approve": rng.choice(["approve", "update"]),
+            "site_desc": rng.choice([None, "Updated description. " * 10]), "tr_summary": rng.choice([None, "Updated TR."]),
+            "written_user": "surveyor{0}".format(i % 7), "written_date": now - i * 86400000, "review_user": "reviewer",
+            "nha_rel_guid": nha["GlobalID"], "mapping_update": rng.choice(["yes", "no"]),
+            "species_update": rng.choice(["yes", "no"]), "photo_approve": "existing", "created_user": "surveyor",
+            "CreationDate": now - i * 86400000, "EditDate": now - i * 86400000},
+            "geometry": {"x": round(nha["x"], 2), "y": round(nha["y"], 2)}})
+        site_refs["features"].append({"attributes": {"globalid": make_guid(rng), "parentrowid": uniquerowid,
+                                                     "key_1": rng.choice(zotero_keys), "EditDate": now}})
+        threat_refs["features"].append({"attributes": {"globalid": make_guid(rng), "parentrowid": uniquerowid,
+                                                       "key_2": rng.choice(zotero_keys), "EditDate": now}})
+        for j in range(rng.randint(0, 3)):
+            tr_repeat["features"].append({"attributes": {
+                "globalid": make_guid(rng), "parentrowid": uniquerowid, "threat_text": "New threat {0}.".format(j),
+                "threat_category": "General", "threat": "Synthetic", "created_user": "surveyor", "EditDate": now}})
+    layers[survey_service + "/0"] = form
+    layers[survey_service + "/1"] = site_refs
+    layers[survey_service + "/2"] = threat_refs
+    layers[survey_service + "/3"] = tr_repeat
+
+    # zotero library items as the zotero api returns them, and the reference layer they are loaded into
+    zotero_items = []
+    for i, key in enumerate(zotero_keys):
+        year = rng.randint(1950, 2025)
+        zotero_items.append({"key": key, "meta": {"creatorSummary": "Author{0} et al.".format(i % 300),
+                                                  "parsedDate": "{0}-01-01".format(year)},
+                             "data": {"itemType": rng.choice(["journalArticle", "report", "book", "note"]),
+                                      "title": "Synthetic reference {0}".format(i),
+                                      "abstractNote": "Abstract text. " * 10, "publicationTitle": "Journal",
+                                      "volume": str(rng.randint(1, 90)), "issue": str(rng.randint(1, 12)),
+                                      "pages": "1-10", "url": "",
+                                      "creators": [{"lastName": "Author{0}".format(i % 300), "firstName": "A."},
+                                                   {"lastName": "Coauthor{0}".format(i % 97), "firstName": "B."}]}})
+    zotero_fields = [("key", "text"), ("item_type", "text"), ("title", "text"), ("creator_summary", "text"),
+                     ("authors", "text"), ("publication_year", "text"), ("publication_title", "text"),
+                     ("volume", "text"), ("issue", "text"), ("pages", "text"), ("data_url", "text"),
+                     ("abstract_note", "text"), ("full_citation", "text")]
+    zotero_layer = make_layer("Zotero References", zotero_fields)
+    zotero_layer["features"] = [{"attributes": {"key": item["key"], "title": item["data"]["title"],
+                                                "authors": item["meta"]["creatorSummary"],
+                                                "publication_year": item["meta"]["parsedDate"][:4]}}
+                                for item in zotero_items]
+    layers[references + "5"] = zotero_layer
+
+    # empty public layers that the public update deletes from and loads into
+    public = public_services + "/Natural_Heritage_Area_Public_Data/FeatureServer/"
+    public_nha_spec = [(f["name"], "date" if f["type"] == field_types["date"] else "text")
+                       for f in nha_layer["fields"][1:] if f["type"] != field_types["globalid"]]
+    layers[public + "0"] = make_layer("Natural Heritage Areas", public_nha_spec, "esriGeometryPolygon")
+    layers[public + "1"] = make_layer("SUSNs", public_nha_spec, "esriGeometryPolygon")
+    layers[public + "2"] = make_layer("Species", [
+        ("species_name", "text"), ("scomname", "text"), ("sname", "text"), ("grank", "text"), ("srank", "text"),
+        ("sprot", "text"), ("pbsstatus", "text"), ("lastobs_yr", "int"), ("eorank", "text"), ("taxa", "text"),
+        ("taxa_photo", "text"), ("species_url", "text"), ("nha_join_id", "text")])
+    layers[public + "3"] = make_layer("Site Accounts", [("site_desc", "text"), ("tr_summary", "text"),
+                                                         ("nha_join_id", "text"), ("written_date", "date")])
+    layers[public + "4"] = make_layer("TR Bullets", [("threat_text", "text"), ("nha_join_id", "text"),
+                                                      ("threat_desc", "text")])
+    layers[public + "5"] = make_layer("References", [("zotero_key", "text"), ("source_id", "text"),
+                                                      ("full_cite", "text")])
+
+    return {"layers": layers, "items": {survey_id: survey_service}, "zotero": zotero_items,
+            "italics": sorted({e["SNAME"] for e in elements})}
+
+
+# define function to count the records in a set of fixtures
+def fixture_counts(fixtures):
+    """Returns {layer name (url): number of features} for all fixture layers."""
+    return {url: len(layer["features"]) for url, layer in fixtures["layers"].items()}
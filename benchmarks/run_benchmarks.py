@@ -0,0 +1,302 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: run_benchmarks.py
+Purpose: Offline benchmarks for the NHA toolbox tools and nightly scripts. Each scenario runs in a fresh python process
+against standin_service.py serving synthetic fixtures (fixtures.py) at the chosen scale, so no portal, network, or
+production data is touched and runs at the same scale and seed can be compared. The repo's modules and scripts are
+loaded with their production urls swapped for the stand-in, and file paths (photos, watermarks, trace files, the
+overlay and rank stores, and outputs) are pointed at a temporary folder. Wall time, peak memory, rows (from the
+nha_trace trace of the run), requests, and bytes returned by the stand-in are reported for each scenario, and a previous
+results file can be given as a baseline to flag scenarios that got slower or bigger. Run it with the ArcGIS Pro python environment:
+    python benchmarks\run_benchmarks.py [--scale small|medium|statewide] [--repeats 3] [--scenarios a,b]
+                                        [--baseline results.json] [--tolerance 0.15] [--output results.json]
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - the compiled rank table store from nha_ranks.py is also pointed at the temporary folder.
+10/19/2026 - the public geometry store from nha_geometry.py is also pointed at the temporary folder.
+10/19/2026 - the SF to NHA assignment store from nha_sf_assignments.py is also pointed at the temporary folder.
+10/19/2026 - the schema store from nha_schema.py is also pointed at the temporary folder.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import importlib.abc
+import importlib.util
+import importlib.machinery
+
+benchmark_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(benchmark_dir)
+
+# number of NHAs selected when a toolbox tool is benchmarked - about what gets selected for a county update
+selected_nhas = {"small": 10, "medium": 50, "statewide": 200}
+
+# scenarios - toolbox tools run their execute function on a selection of stand-in NHAs and scripts run from the top.
+# Script paths that point at network drives or C:\temp are swapped for the temporary folder.
+scenarios = {
+    "site_rank": {"tool": "site_rank", "params": ["nha"]},
+    "species_transfer": {"tool": "species_transfer", "params": ["nha", "eo"]},
+    "fill_attributes": {"tool": "fill_attributes", "params": ["nha"]},
+    "public_update": {"script": "NHA_Public_Update.py",
+                      "replace": {'attributes = "yes"': 'attributes = "no"',
+                                  r"H:\Scripts\NHA_Tools\SiteReports\_data\SNAMEitalics.csv": "{temp}/SNAMEitalics.csv",
+                                  "C:/temp/": "{temp}/"}},
+    "form_transfer": {"script": "NHA_Form_Transfer.py", "replace": {r"C:\temp": "{temp}"}},
+    "prioritizer": {"script": "NHA_Prioritizer.py", "replace": {"H://temp//": "{temp}/"}},
+    "zotero": {"script": "Zotero_Library_Download.py", "replace": {"time.sleep(": "(lambda s: None)("}},
+}
+
+# fixture urls passed to tools as layer parameters
+tool_inputs = {"nha": "https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/0",
+               "eo": "https://gis.waterlandlife.org/server/rest/services/PNHP/Biotics_READ_ONLY/FeatureServer/0"}
+
+
+# define class for a tool parameter - the tools only read valueAsText and value from their parameters
+class BenchParameter(object):
+    def __init__(self, value):
+        self.value = value
+        self.valueAsText = None if value is None else str(value)
+
+
+# define class that finds the repo's modules (nha_*.py and the nha_tools package) and loads them with the production
+# urls in their source swapped for the stand-in
+class StandinFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, root):
+        self.root = root
+
+    def find_spec(self, fullname, path=None, target=None):
+        if not (fullname.startswith("nha_") or fullname == "nha_tools" or fullname.startswith("nha_tools.")):
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path or [repo_dir])
+        if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+            return None
+        return importlib.util.spec_from_file_location(fullname, spec.origin,
+                                                      loader=StandinLoader(fullname, spec.origin, self.root),
+                                                      submodule_search_locations=spec.submodule_search_locations)
+
+
+# define class that compiles a module from its source with the stand-in urls. Cached bytecode is never used because it
+# was compiled with the production urls.
+class StandinLoader(importlib.machinery.SourceFileLoader):
+    def __init__(self, fullname, path, root):
+        super(StandinLoader, self).__init__(fullname, path)
+        self.root = root
+
+    def get_code(self, fullname):
+        import standin_service
+        with open(self.path, encoding="utf-8") as f:
+            source = standin_service.to_local(f.read(), self.root)
+        return compile(source, self.path, "exec", dont_inherit=True)
+
+
+# define function to get the peak memory of this process in MB - the peak working set on Windows (where ArcGIS Pro
+# runs) and the peak resident set elsewhere. arcpy allocates mostly outside of python, so this is reported alongside
+# the python heap peak from tracemalloc.
+def peak_process_mb():
+    """Returns the peak memory of the current process in MB, or None if it can't be read."""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1048576.0
+    except ImportError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    except ImportError:
+        return None
+
+
+# define function to select NHAs on a layer of the stand-in NHA service - the tools only run on selected NHAs
+def select_nhas(url, count):
+    """Returns the name of a feature layer of url with the first count NHAs selected."""
+    import arcpy
+    layer = arcpy.MakeFeatureLayer_management(url, "bench_nha")[0]
+    arcpy.SelectLayerByAttribute_management(layer, "NEW_SELECTION", "objectid <= {0}".format(count))
+    return layer
+
+
+# define function to run one scenario in this process. Fixtures are made and served before the clock starts.
+def run_scenario(name, scale, seed):
+    """Runs a scenario against a fresh stand-in and returns its measurements."""
+    sys.path.insert(0, benchmark_dir)
+    sys.path.insert(0, repo_dir)
+    import fixtures
+    import standin_service
+
+    scenario = scenarios[name]
+    temp_dir = tempfile.mkdtemp(prefix="nha_bench_")
+    trace_dir = os.path.join(temp_dir, "traces")
+    fixtures_data = fixtures.make_fixtures(scale, seed)
+    with open(os.path.join(temp_dir, "SNAMEitalics.csv"), "w") as f:
+        f.write("ETitalics\n" + "\n".join(fixtures_data["italics"]) + "\n")
+    server, root = standin_service.start_server(fixtures_data)
+
+    # dummy credentials for the stand-in portals and trace files written to the temporary folder
+    for variable in ("wpc_portal_username", "wpc_webgis_username", "wpc_agol_username"):
+        os.environ[variable] = "bench"
+    os.environ["wpc_gis_password"] = "bench"
+    os.environ["nha_trace"] = "on"
+    os.environ["nha_trace_dir"] = trace_dir
+    sys.meta_path.insert(0, StandinFinder(root))
+
+    import nha_schema
+    nha_schema.store_dir = os.path.join(temp_dir, "schema_store")
+    nha_schema.store_path = os.path.join(nha_schema.store_dir, "nha_schema.json")
+    import nha_overlays
+    nha_overlays.store_dir = os.path.join(temp_dir, "overlay_store")
+    nha_overlays.store_gdb = os.path.join(nha_overlays.store_dir, "nha_overlays.gdb")
+    nha_overlays.store_info_path = os.path.join(nha_overlays.store_dir, "nha_overlays.json")
+    import nha_ranks
+    nha_ranks.store_dir = os.path.join(temp_dir, "rank_store")
+    nha_ranks.store_path = os.path.join(nha_ranks.store_dir, "rank_table.npz")
+    nha_ranks.store_info_path = os.path.join(nha_ranks.store_dir, "rank_table.json")
+    import nha_geometry
+    nha_geometry.store_dir = os.path.join(temp_dir, "public_geometry_store")
+    nha_geometry.store_gdb = os.path.join(nha_geometry.store_dir, "public_geometry.gdb")
+    nha_geometry.store_info_path = os.path.join(nha_geometry.store_dir, "public_geometry.json")
+    import nha_sf_assignments
+    nha_sf_assignments.store_dir = os.path.join(temp_dir, "sf_assignment_store")
+    nha_sf_assignments.store_path = os.path.join(nha_sf_assignments.store_dir, "sf_nha.npz")
+    nha_sf_assignments.store_info_path = os.path.join(nha_sf_assignments.store_dir, "sf_nha.json")
+    import nha_trace
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if "tool" in scenario:
+        module = importlib.import_module("nha_tools." + scenario["tool"])
+        inputs = {"nha": select_nhas(standin_service.to_local(tool_inputs["nha"], root), selected_nhas[scale]),
+                  "eo": standin_service.to_local(tool_inputs["eo"], root)}
+        params = [BenchParameter(inputs[p]) for p in scenario["params"]]
+        nha_trace.start(name)
+        try:
+            module.execute.__wrapped__(params, None)
+        finally:
+            nha_trace.finish(log=lambda message: None)
+    else:
+        path = os.path.join(repo_dir, scenario["script"])
+        with open(path, encoding="utf-8") as f:
+            source = standin_service.to_local(f.read(), root)
+        for old, new in scenario.get("replace", {}).items():
+            source = source.replace(old, new.format(temp=temp_dir.replace("\\", "/")))
+        namespace = {"__name__": "__main__", "__file__": os.path.join(temp_dir, scenario["script"])}
+        exec(compile(source, path, "exec"), namespace)
+    seconds = time.perf_counter() - start
+    python_peak = tracemalloc.get_traced_memory()[1] / 1048576.0
+    tracemalloc.stop()
+    server.shutdown()
+
+    # rows come from the trace the run wrote - scripts finish their own trace
+    rows = 0
+    for trace_path in glob.glob(os.path.join(trace_dir, "*.json")):
+        with open(trace_path) as f:
+            rows += sum(step["rows"] for step in json.load(f)["steps"])
+    return {"scenario": name, "scale": scale, "seconds": seconds, "rows": rows,
+            "rows_per_second": rows / seconds if seconds else None,
+            "requests": sum(s["count"] for s in server.data.stats.values()),
+            "bytes": sum(s["bytes"] for s in server.data.stats.values()),
+            "python_peak_mb": python_peak, "process_peak_mb": peak_process_mb()}
+
+
+# define function to run one scenario in a fresh python process
+def run_child(name, scale, seed):
+    """Returns the measurements of a scenario run in a new process, or an error message if the run failed."""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, "--scale", scale,
+                             "--seed", str(seed)], capture_output=True, text=True, cwd=repo_dir)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines or not lines[-1].startswith("{"):
+        return {"scenario": name, "scale": scale, "error": (result.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(lines[-1])
+
+
+# define function to get the median of each measure over repeated runs of a scenario
+def median_result(runs):
+    """Returns one result with the median of every numeric measure over runs."""
+    result = dict(runs[0])
+    for measure in ("seconds", "rows", "rows_per_second", "requests", "bytes", "python_peak_mb", "process_peak_mb"):
+        values = [r[measure] for r in runs if r.get(measure) is not None]
+        result[measure] = statistics.median(values) if values else None
+    result["runs"] = len(runs)
+    return result
+
+
+# define function to compare results with a baseline. A scenario regresses if it takes longer or uses more memory than
+# the baseline by more than the tolerance.
+def compare(results, baseline, tolerance):
+    """Returns a list of regression messages for results that are worse than the baseline."""
+    regressions = []
+    previous = {(r["scenario"], r["scale"]): r for r in baseline.get("results", [])}
+    for result in results:
+        old = previous.get((result["scenario"], result["scale"]))
+        if old is None or "error" in result or "error" in old:
+            continue
+        for measure in ("seconds", "python_peak_mb", "process_peak_mb", "requests"):
+            if old.get(measure) and result.get(measure) and result[measure] > old[measure] * (1 + tolerance):
+                regressions.append("{0} ({1}): {2} went from {3:.2f} to {4:.2f}".format(
+                    result["scenario"], result["scale"], measure, old[measure], result[measure]))
+    return regressions
+
+
+# define function to print the results table
+def report(results):
+    """Prints one line per scenario with its time, throughput, requests, and peak memory."""
+    print("{0:<18}{1:>10}{2:>10}{3:>12}{4:>10}{5:>12}{6:>12}{7:>12}".format(
+        "scenario", "seconds", "rows", "rows/s", "requests", "MB sent", "py peak MB", "peak MB"))
+    for r in results:
+        if "error" in r:
+            print("{0:<18}failed: {1}".format(r["scenario"], r["error"]))
+            continue
+        print("{0:<18}{1:>10.2f}{2:>10.0f}{3:>12.0f}{4:>10.0f}{5:>12.1f}{6:>12.1f}{7:>12}".format(
+            r["scenario"], r["seconds"], r["rows"], r["rows_per_second"] or 0, r["requests"], r["bytes"] / 1048576.0,
+            r["python_peak_mb"], "" if r["process_peak_mb"] is None else "{0:.1f}".format(r["process_peak_mb"])))
+
+
+# define function to run the benchmarks from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the NHA tools and scripts.")
+    parser.add_argument("--scale", default="small", choices=["small", "medium", "statewide"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--scenarios", default=",".join(scenarios))
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--output", default=os.path.join(benchmark_dir, "results.json"))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.scale, args.seed)))
+        return 0
+
+    results = []
+    for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        runs = [run_child(name, args.scale, args.seed) for _ in range(args.repeats)]
+        failed = [r for r in runs if "error" in r]
+        results.append(failed[0] if failed else median_result(runs))
+    report(results)
+    with open(args.output, "w") as f:
+        json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "scale": args.scale, "seed": args.seed,
+                   "repeats": args.repeats, "results": results}, f, indent=2)
+    print("Results written to " + args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print("REGRESSION: " + message)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,677 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: standin_service.py
+Purpose: Local stand-in for the portals, feature services, and Zotero api used by the NHA scripts and toolbox, served
+from the synthetic data in fixtures.py. Each production host is served under its own path on the local server (see
+hosts below), so a production url becomes a stand-in url by swapping its host with to_local(). Only the part of the
+REST api the NHA code uses is implemented - portal sign in and item lookup, FeatureServer and layer json, query (where,
+outFields, paging, object ids, counts, ordering, and statistics), applyEdits, addFeatures, updateFeatures,
+deleteFeatures, calculate, and queryAttachments - and where clauses are limited to the SQL our scripts write. Every
+request is counted by endpoint with the bytes it returned.
+Run it on its own to browse the fixtures:
+    python benchmarks\standin_service.py [scale] [port]
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import re
+import sys
+import json
+import time
+import uuid
+import datetime
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import fixtures
+
+# production hosts and the path each one is served under on the stand-in
+hosts = {
+    "https://gis.waterlandlife.org": "/gis",
+    "https://webgis.waterlandlife.org": "/webgis",
+    "https://services2.arcgis.com/XM2fovFQqAVipH6f/arcgis": "/agol",
+    "https://wpcgis.maps.arcgis.com": "/arcgis",
+    "https://www.arcgis.com": "/arcgis",
+    "https://api.zotero.org": "/zotero",
+}
+
+# largest number of features returned by one query, the same as our hosted services
+max_record_count = 2000
+
+
+# define function to swap the production host of a url (or of every url in a block of source code) for the stand-in
+def to_local(text, root):
+    """Returns text with every production host in hosts replaced by root plus the host's path."""
+    for host, path in hosts.items():
+        text = text.replace(host, root + path)
+    return text
+
+
+# define function to swap the stand-in host of a path back to the production url it stands in for
+def to_production(path):
+    """Returns the production url for a stand-in path, or None if the path isn't under one of the hosts."""
+    for host, prefix in sorted(hosts.items(), key=lambda kv: kv[0] != "https://www.arcgis.com"):
+        if path == prefix or path.startswith(prefix + "/"):
+            return host + path[len(prefix):]
+    return None
+
+
+########################################################################################################################
+## WHERE CLAUSES
+########################################################################################################################
+
+_token_pattern = re.compile(r"""\s*(?:
+    (?P<string>'(?:[^']|'')*')|
+    (?P<number>-?\d+(?:\.\d+)?)|
+    (?P<op><=|>=|<>|!=|=|<|>)|
+    (?P<punct>[(),])|
+    (?P<name>[A-Za-z_][A-Za-z0-9_.]*))""", re.X)
+
+
+# define function to split a where clause into tokens
+def tokenize(where):
+    """Returns a list of (kind, value) tokens for a where clause."""
+    tokens = []
+    position = 0
+    where = where.strip()
+    while position < len(where):
+        match = _token_pattern.match(where, position)
+        if not match or match.end() == position:
+            raise ValueError("Unable to parse where clause near: " + where[position:position + 30])
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            value = value[1:-1].replace("''", "'")
+        elif kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "name" and value.upper() in ("AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE", "BETWEEN",
+                                                  "TIMESTAMP", "DATE", "UPPER", "LOWER"):
+            kind, value = "keyword", value.upper()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+# define function to get epoch milliseconds from a TIMESTAMP or DATE literal
+def _timestamp_ms(text):
+    text = text.strip()
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d"):
+        try:
+            date = datetime.datetime.strptime(text, fmt)
+            return int((date - datetime.datetime(1970, 1, 1)).total_seconds() * 1000)
+        except ValueError:
+            pass
+    raise ValueError("Unable to parse timestamp: " + text)
+
+
+# define class that parses a where clause into a function of a record's attributes. Field names are matched without
+# regard to case, the same as the feature services do.
+class WhereParser(object):
+    def __init__(self, where):
+        self.tokens = tokenize(where or "1=1")
+        self.position = 0
+
+    def parse(self):
+        predicate = self.expression()
+        if self.position != len(self.tokens):
+            raise ValueError("Unexpected token in where clause: {0}".format(self.tokens[self.position][1]))
+        return predicate
+
+    def peek(self, value=None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if value is not None and not (token[0] in ("keyword", "op", "punct") and token[1] == value):
+            return None
+        return token
+
+    def take(self, value=None):
+        token = self.peek(value)
+        if token is None:
+            raise ValueError("Expected {0} in where clause".format(value or "a value"))
+        self.position += 1
+        return token
+
+    def expression(self):
+        left = self.conjunction()
+        while self.peek("OR"):
+            self.take()
+            right = self.conjunction()
+            left = (lambda a, b: lambda r: a(r) or b(r))(left, right)
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.peek("AND"):
+            self.take()
+            right = self.negation()
+            left = (lambda a, b: lambda r: a(r) and b(r))(left, right)
+        return left
+
+    def negation(self):
+        if self.peek("NOT"):
+            self.take()
+            inner = self.negation()
+            return lambda r: not inner(r)
+        if self.peek("("):
+            # a parenthesis is either a grouped expression or the start of a value list, which only follows IN
+            self.take("(")
+            inner = self.expression()
+            self.take(")")
+            return inner
+        return self.comparison()
+
+    def value(self):
+        kind, value = self.take()
+        if kind in ("string", "number"):
+            return lambda r, v=value: v
+        if kind == "keyword" and value in ("TIMESTAMP", "DATE"):
+            literal = _timestamp_ms(self.take()[1])
+            return lambda r: literal
+        if kind == "keyword" and value in ("UPPER", "LOWER"):
+            self.take("(")
+            inner = self.value()
+            self.take(")")
+            case = str.upper if value == "UPPER" else str.lower
+            return lambda r: None if inner(r) is None else case(str(inner(r)))
+        if kind == "keyword" and value == "NULL":
+            return lambda r: None
+        if kind == "name":
+            field = value.lower()
+            return lambda r: r.get(field)
+        raise ValueError("Unexpected token in where clause: {0}".format(value))
+
+    def comparison(self):
+        left = self.value()
+        negate = False
+        if self.peek("IS"):
+            self.take()
+            if self.peek("NOT"):
+                self.take()
+                return lambda r: left(r) is not None
+            self.take("NULL")
+            return lambda r: left(r) is None
+        if self.peek("NOT"):
+            self.take()
+            negate = True
+        if self.peek("IN"):
+            self.take()
+            self.take("(")
+            values = set()
+            while True:
+                values.add(self.take()[1])
+                if self.peek(","):
+                    self.take()
+                    continue
+                self.take(")")
+                break
+            if negate:
+                return lambda r: left(r) is not None and left(r) not in values
+            return lambda r: left(r) in values
+        if self.peek("LIKE"):
+            self.take()
+            pattern = re.compile("^" + re.escape(self.take()[1]).replace("%", ".*").replace("_", ".") + "$", re.S)
+            if negate:
+                return lambda r: left(r) is not None and not pattern.match(str(left(r)))
+            return lambda r: left(r) is not None and bool(pattern.match(str(left(r))))
+        if self.peek("BETWEEN"):
+            self.take()
+            low = self.value()
+            self.take("AND")
+            high = self.value()
+            between = lambda r: left(r) is not None and low(r) <= left(r) <= high(r)
+            return (lambda r: not between(r)) if negate else between
+        op = self.take()[1]
+        right = self.value()
+        compare = {"=": lambda a, b: a == b, "<>": lambda a, b: a != b, "!=": lambda a, b: a != b,
+                   "<": lambda a, b: a < b, ">": lambda a, b: a > b, "<=": lambda a, b: a <= b,
+                   ">=": lambda a, b: a >= b}[op]
+
+        def predicate(r):
+            a, b = left(r), right(r)
+            if a is None or b is None:
+                return False
+            try:
+                return compare(a, b)
+            except TypeError:
+                return compare(str(a), str(b))
+        return predicate
+
+
+# define function to parse a where clause
+def parse_where(where):
+    """Returns a function of a lowercase attribute dictionary that is True for records matching the where clause."""
+    return WhereParser(where).parse()
+
+
+########################################################################################################################
+## FEATURE SERVICE
+########################################################################################################################
+
+# define class holding the fixture layers and the request statistics for one stand-in server
+class StandinData(object):
+    def __init__(self, fixtures_data):
+        self.layers = fixtures_data["layers"]
+        self.items = fixtures_data["items"]
+        self.zotero = fixtures_data["zotero"]
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.next_oid = {}
+        self.edit_dates = {}
+        now = int(time.time() * 1000)
+        for url, layer in self.layers.items():
+            for oid, feature in enumerate(layer["features"], 1):
+                feature["attributes"]["objectid"] = oid
+            self.next_oid[url] = len(layer["features"]) + 1
+            self.edit_dates[url] = now
+
+    def record(self, endpoint, size):
+        with self.lock:
+            stats = self.stats.setdefault(endpoint, {"count": 0, "bytes": 0})
+            stats["count"] += 1
+            stats["bytes"] += size
+
+    def services(self):
+        """Returns {service url: {layer id: layer}} for the fixture layers."""
+        services = {}
+        for url, layer in self.layers.items():
+            service, layer_id = url.rsplit("/", 1)
+            services.setdefault(service, {})[int(layer_id)] = layer
+        return services
+
+
+# define function to get the field definition json of a layer
+def _field_names(layer):
+    return {f["name"].lower(): f["name"] for f in layer["fields"]}
+
+
+# define function to build the json description of a layer
+def layer_json(layer, layer_id, edit_date):
+    """Returns the layer resource json for a fixture layer."""
+    is_table = layer["geometryType"] is None
+    info = {"currentVersion": 11.1, "id": layer_id, "name": layer["name"],
+            "type": "Table" if is_table else "Feature Layer", "geometryType": layer["geometryType"],
+            "objectIdField": "objectid", "fields": layer["fields"], "maxRecordCount": max_record_count,
+            "standardMaxRecordCount": max_record_count, "supportedQueryFormats": "JSON",
+            "capabilities": "Create,Delete,Query,Update,Editing", "hasAttachments": False,
+            "supportsApplyEditsWithGlobalIds": True, "supportsRollbackOnFailureParameter": True,
+            "supportsStatistics": True, "supportsAdvancedQueries": True,
+            "advancedQueryCapabilities": {"supportsPagination": True, "supportsStatistics": True,
+                                          "supportsOrderBy": True, "supportsDistinct": True,
+                                          "supportsQueryWithResultType": False},
+            "editingInfo": {"lastEditDate": edit_date, "dataLastEditDate": edit_date,
+                            "schemaLastEditDate": edit_date}, "relationships": [], "types": [], "templates": []}
+    globalid = [f["name"] for f in layer["fields"] if f["type"] == fixtures.field_types["globalid"]]
+    if globalid:
+        info["globalIdField"] = globalid[0]
+    if layer.get("editTracking"):
+        info["editFieldsInfo"] = {"creationDateField": "CreationDate", "creatorField": "Creator",
+                                  "editDateField": "EditDate", "editorField": "Editor"}
+    if not is_table:
+        extent = fixtures.pa_extent
+        info["extent"] = {"xmin": extent[0], "ymin": extent[1], "xmax": extent[2], "ymax": extent[3],
+                          "spatialReference": fixtures.spatial_reference}
+        info["geometryField"] = {"name": "Shape", "type": "esriFieldTypeGeometry"}
+    return info
+
+
+# define function to pick the attributes listed in outFields from a feature
+def _select(feature, out_fields, return_geometry, names):
+    attributes = feature["attributes"]
+    if out_fields is not None:
+        attributes = {names.get(f, f): attributes.get(names.get(f, f)) for f in out_fields}
+    result = {"attributes": attributes}
+    if return_geometry and "geometry" in feature:
+        result["geometry"] = feature["geometry"]
+    return result
+
+
+# define function to get a lowercase attribute dictionary for matching where clauses
+def _lower(feature):
+    return {k.lower(): v for k, v in feature["attributes"].items()}
+
+
+# define function to run a query on a layer
+def query_layer(layer, params):
+    """Returns the query response json for a fixture layer and the request parameters."""
+    names = _field_names(layer)
+    predicate = parse_where(params.get("where"))
+    features = [f for f in layer["features"] if predicate(_lower(f))]
+    if params.get("objectIds"):
+        oids = {int(o) for o in str(params["objectIds"]).split(",") if o.strip()}
+        features = [f for f in features if f["attributes"]["objectid"] in oids]
+    if str(params.get("returnCountOnly", "")).lower() == "true":
+        return {"count": len(features)}
+    if str(params.get("returnIdsOnly", "")).lower() == "true":
+        return {"objectIdFieldName": "objectid", "objectIds": [f["attributes"]["objectid"] for f in features]}
+    if params.get("outStatistics"):
+        return _statistics(features, json.loads(params["outStatistics"]),
+                           [g.strip().lower() for g in (params.get("groupByFieldsForStatistics") or "").split(",")
+                            if g.strip()], names)
+    if params.get("orderByFields"):
+        for order in reversed([o.strip() for o in params["orderByFields"].split(",") if o.strip()]):
+            parts = order.split()
+            field = parts[0].lower()
+            features = sorted(features, key=lambda f: (_lower(f).get(field) is None, _lower(f).get(field) or 0),
+                              reverse=len(parts) > 1 and parts[1].upper() == "DESC")
+
+    out_fields = params.get("outFields") or "*"
+    out_fields = None if out_fields.strip() == "*" else [f.strip().lower() for f in out_fields.split(",") if f.strip()]
+    if out_fields is not None and "objectid" not in out_fields:
+        out_fields.append("objectid")
+    return_geometry = str(params.get("returnGeometry", "true")).lower() != "false" and layer["geometryType"]
+    offset = int(params.get("resultOffset") or 0)
+    count = min(int(params.get("resultRecordCount") or max_record_count), max_record_count)
+    page = features[offset:offset + count]
+    response = {"objectIdFieldName": "objectid", "globalIdFieldName": "", "geometryType": layer["geometryType"],
+                "spatialReference": fixtures.spatial_reference,
+                "fields": [f for f in layer["fields"] if out_fields is None or f["name"].lower() in out_fields],
+                "features": [_select(f, out_fields, return_geometry, names) for f in page],
+                "exceededTransferLimit": offset + count < len(features)}
+    if not layer["geometryType"]:
+        del response["geometryType"]
+    return response
+
+
+# define function to calculate outStatistics for a query
+def _statistics(features, statistics, group_by, names):
+    groups = {}
+    for feature in features:
+        attributes = _lower(feature)
+        groups.setdefault(tuple(attributes.get(g) for g in group_by), []).append(attributes)
+    results = []
+    for key, rows in groups.items():
+        attributes = {names.get(g, g): v for g, v in zip(group_by, key)}
+        for statistic in statistics:
+            field = statistic["onStatisticField"].lower()
+            values = [r.get(field) for r in rows if r.get(field) is not None]
+            kind = statistic["statisticType"].lower()
+            value = {"count": lambda: len(values), "sum": lambda: sum(values),
+                     "min": lambda: min(values) if values else None, "max": lambda: max(values) if values else None,
+                     "avg": lambda: sum(values) / len(values) if values else None}[kind]()
+            attributes[statistic.get("outStatisticFieldName") or kind + "_" + field] = value
+        results.append({"attributes": attributes})
+    return {"fields": [], "features": results}
+
+
+# define function to apply adds, updates, and deletes to a layer
+def apply_edits(data, url, layer, adds=None, updates=None, deletes=None, use_global_ids=False):
+    """Applies edits to a fixture layer and returns the add, update, and delete results."""
+    now = int(time.time() * 1000)
+    names = _field_names(layer)
+    globalid = [f["name"] for f in layer["fields"] if f["type"] == fixtures.field_types["globalid"]]
+    key = globalid[0] if use_global_ids and globalid else "objectid"
+    results = {"addResults": [], "updateResults": [], "deleteResults": []}
+    with data.lock:
+        by_key = {f["attributes"].get(key): f for f in layer["features"]}
+        for feature in adds or []:
+            oid = data.next_oid[url]
+            data.next_oid[url] += 1
+            attributes = {names.get(k.lower(), k): v for k, v in feature.get("attributes", {}).items()}
+            attributes["objectid"] = oid
+            if globalid and not attributes.get(globalid[0]):
+                attributes[globalid[0]] = "{" + str(uuid.uuid4()).upper() + "}"
+            if layer.get("editTracking"):
+                attributes.update({"CreationDate": now, "EditDate": now})
+            new = {"attributes": attributes}
+            if feature.get("geometry"):
+                new["geometry"] = feature["geometry"]
+            layer["features"].append(new)
+            results["addResults"].append({"objectId": oid, "globalId": attributes.get(globalid[0]) if globalid
+                                          else None, "success": True})
+        for feature in updates or []:
+            attributes = {names.get(k.lower(), k): v for k, v in feature.get("attributes", {}).items()}
+            target = by_key.get(attributes.get(key))
+            if target is None:
+                results["updateResults"].append({"objectId": attributes.get("objectid"), "success": False,
+                                                 "error": {"code": 1019, "description": "Feature not found."}})
+                continue
+            target["attributes"].update(attributes)
+            if layer.get("editTracking"):
+                target["attributes"]["EditDate"] = now
+            if feature.get("geometry"):
+                target["geometry"] = feature["geometry"]
+            results["updateResults"].append({"objectId": target["attributes"]["objectid"], "success": True})
+        delete_keys = set(deletes or [])
+        if delete_keys:
+            if key == "objectid":
+                delete_keys = {int(k) for k in delete_keys}
+            layer["features"] = [f for f in layer["features"] if f["attributes"].get(key) not in delete_keys]
+            results["deleteResults"] = [{"objectId": k, "success": True} for k in delete_keys]
+        data.edit_dates[url] = now
+    return results
+
+
+# define function to read a list parameter that may be json or comma separated
+def _list_param(value):
+    if value is None or value == "":
+        return []
+    if isinstance(value, list):
+        return value
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+# define function to handle a request to a layer operation
+def layer_operation(data, url, layer, operation, params):
+    """Returns the response json for a query or edit operation on a fixture layer."""
+    layer_id = int(url.rsplit("/", 1)[1])
+    if operation == "":
+        return layer_json(layer, layer_id, data.edit_dates[url])
+    if operation == "query":
+        with data.lock:
+            return query_layer(layer, params)
+    if operation == "queryAttachments":
+        return {"attachmentGroups": []}
+    if operation == "applyEdits":
+        return apply_edits(data, url, layer, _list_param(params.get("adds")), _list_param(params.get("updates")),
+                           _list_param(params.get("deletes")),
+                           str(params.get("useGlobalIds", "")).lower() == "true")
+    if operation == "addFeatures":
+        return {"addResults": apply_edits(data, url, layer, adds=_list_param(params.get("features")))["addResults"]}
+    if operation == "updateFeatures":
+        return {"updateResults": apply_edits(data, url, layer,
+                                             updates=_list_param(params.get("features")))["updateResults"]}
+    if operation == "deleteFeatures":
+        with data.lock:
+            predicate = parse_where(params.get("where")) if params.get("where") else (lambda r: False)
+            oids = [f["attributes"]["objectid"] for f in layer["features"] if predicate(_lower(f))]
+        oids += [int(o) for o in _list_param(params.get("objectIds"))]
+        return {"deleteResults": apply_edits(data, url, layer, deletes=oids)["deleteResults"]}
+    if operation == "calculate":
+        names = _field_names(layer)
+        expressions = _list_param(params.get("calcExpression"))
+        with data.lock:
+            predicate = parse_where(params.get("where"))
+            matches = [f for f in layer["features"] if predicate(_lower(f))]
+            for feature in matches:
+                for expression in expressions:
+                    field = names.get(expression["field"].lower(), expression["field"])
+                    if "value" in expression:
+                        feature["attributes"][field] = expression["value"]
+                    else:
+                        feature["attributes"][field] = WhereParser(expression["sqlExpression"]).value()(
+                            _lower(feature))
+            data.edit_dates[url] = int(time.time() * 1000)
+        return {"success": True, "updatedFeatureCount": len(matches)}
+    if operation.isdigit():
+        # single feature resource and its attachments
+        oid = int(operation)
+        for feature in layer["features"]:
+            if feature["attributes"]["objectid"] == oid:
+                return {"feature": feature}
+        return {"error": {"code": 404, "message": "Feature not found."}}
+    if operation.endswith("attachments"):
+        return {"attachmentInfos": []}
+    return {"error": {"code": 400, "message": "Unsupported layer operation: " + operation}}
+
+
+# define function to handle a request to a FeatureServer (service level) resource
+def service_operation(data, service_url, layers, operation, params):
+    """Returns the response json for the service root, its layer list, or service level applyEdits."""
+    feature_layers = [{"id": i, "name": l["name"], "geometryType": l["geometryType"], "type": "Feature Layer"}
+                      for i, l in sorted(layers.items()) if l["geometryType"]]
+    tables = [{"id": i, "name": l["name"], "type": "Table"} for i, l in sorted(layers.items()) if not l["geometryType"]]
+    if operation == "":
+        return {"currentVersion": 11.1, "serviceDescription": "", "maxRecordCount": max_record_count,
+                "supportedQueryFormats": "JSON", "capabilities": "Create,Delete,Query,Update,Editing",
+                "spatialReference": fixtures.spatial_reference, "layers": feature_layers, "tables": tables,
+                "supportsApplyEditsWithGlobalIds": True, "syncEnabled": False}
+    if operation == "layers":
+        return {"layers": [layer_json(l, i, data.edit_dates[service_url + "/" + str(i)])
+                           for i, l in sorted(layers.items()) if l["geometryType"]],
+                "tables": [layer_json(l, i, data.edit_dates[service_url + "/" + str(i)])
+                           for i, l in sorted(layers.items()) if not l["geometryType"]]}
+    if operation == "applyEdits":
+        results = []
+        for edits in _list_param(params.get("edits")):
+            url = service_url + "/" + str(edits["id"])
+            result = apply_edits(data, url, layers[edits["id"]], edits.get("adds"), edits.get("updates"),
+                                 edits.get("deletes"), str(params.get("useGlobalIds", "")).lower() == "true")
+            result["id"] = edits["id"]
+            results.append(result)
+        return results
+    return {"error": {"code": 400, "message": "Unsupported service operation: " + operation}}
+
+
+# define function to handle portal requests - sign in, portal and user info, and item lookup
+def portal_operation(data, root, path, params):
+    """Returns the response json for a portal sharing/rest request."""
+    now = int(time.time() * 1000)
+    if path.endswith("/generateToken") or path.endswith("/oauth2/token"):
+        return {"token": "standin-token", "access_token": "standin-token", "expires": now + 3600000,
+                "expires_in": 3600, "ssl": False}
+    if path.endswith("/sharing/rest/info") or path.endswith("/sharing/rest"):
+        return {"owningSystemUrl": root, "authInfo": {"tokenServicesUrl": root + "/sharing/rest/generateToken",
+                                                      "isTokenBasedSecurity": True}, "currentVersion": "11.1"}
+    if path.endswith("/portals/self"):
+        return {"id": "standin", "name": "NHA stand-in portal", "isPortal": True, "currentVersion": "11.1",
+                "portalHostname": urlsplit(root).netloc, "supportsOAuth": False,
+                "user": {"username": "bench", "role": "org_admin", "privileges": []},
+                "helperServices": {}, "subscriptionInfo": {}}
+    if path.endswith("/community/self") or "/community/users/" in path:
+        return {"username": "bench", "fullName": "Benchmark User", "role": "org_admin", "privileges": [],
+                "groups": [], "orgId": "standin"}
+    match = re.search(r"/content/items/(\w+)$", path)
+    if match:
+        item_id = match.group(1)
+        service = data.items.get(item_id)
+        if service is None:
+            return {"error": {"code": 400, "message": "Item does not exist or is inaccessible."}}
+        return {"id": item_id, "title": "NHA Update Form", "type": "Feature Service", "owner": "bench",
+                "url": to_local(service, root), "typeKeywords": ["Feature Service", "Survey123"],
+                "access": "private", "created": now, "modified": now}
+    if path.endswith("/search"):
+        return {"total": 0, "start": 1, "num": 0, "nextStart": -1, "results": []}
+    return {}
+
+
+# define function to serve the zotero library a page at a time with rel=next links, like the zotero api
+def zotero_page(data, root, path, params):
+    """Returns (items, link header) for a page of the zotero library."""
+    limit = int(params.get("limit") or 25)
+    start = int(params.get("start") or 0)
+    items = data.zotero[start:start + limit]
+    link = None
+    if start + limit < len(data.zotero):
+        link = '<{0}/zotero{1}?limit={2}&start={3}>; rel="next"'.format(root, path, limit, start + limit)
+    return items, link
+
+
+# define class that handles the requests to the stand-in server
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        self.respond(parts.path, {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()})
+
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        params = {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+        if self.headers.get("Content-Type", "").startswith("application/json") and body:
+            params.update(json.loads(body))
+        else:
+            params.update({k: v[-1] for k, v in parse_qs(body, keep_blank_values=True).items()})
+        self.respond(parts.path, params)
+
+    def respond(self, path, params):
+        data = self.server.data
+        root = "http://{0}:{1}".format(*self.server.server_address[:2])
+        headers = {}
+        try:
+            if path.startswith("/zotero/"):
+                payload, link = zotero_page(data, root, path[len("/zotero"):], params)
+                if link:
+                    headers["Link"] = link
+                endpoint = path
+            else:
+                payload, endpoint = self.dispatch(data, root, path, params)
+            status = 200
+        except Exception as ex:
+            payload, endpoint, status = {"error": {"code": 500, "message": str(ex)}}, path, 200
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        data.record(endpoint, len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def dispatch(self, data, root, path, params):
+        production = to_production(path.rstrip("/"))
+        if production is None:
+            return {"error": {"code": 404, "message": "Not found: " + path}}, path
+        if "/sharing/rest" in production or production.rstrip("/").endswith("/portal"):
+            return portal_operation(data, root, production, params), production
+        match = re.match(r"(.*/FeatureServer)(?:/(\d+))?(?:/(.*))?$", production)
+        if not match:
+            if production.endswith("/rest/info"):
+                return {"currentVersion": 11.1, "authInfo": {"isTokenBasedSecurity": False}}, production
+            return {"error": {"code": 404, "message": "Not found: " + production}}, production
+        service_url, layer_id, operation = match.group(1), match.group(2), match.group(3) or ""
+        services = data.services()
+        if service_url not in services:
+            return {"error": {"code": 404, "message": "Service not found: " + service_url}}, production
+        if layer_id is None:
+            return service_operation(data, service_url, services[service_url], operation, params), production
+        url = service_url + "/" + layer_id
+        if url not in data.layers:
+            return {"error": {"code": 404, "message": "Layer not found: " + url}}, production
+        endpoint = url + ("/" + operation if operation and not operation.isdigit() else "")
+        return layer_operation(data, url, data.layers[url], operation, params), endpoint
+
+
+# define function to start a stand-in server on a background thread
+def start_server(fixtures_data, port=0):
+    """Starts a stand-in server for the fixtures and returns (server, root url). Port 0 picks a free port."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandinHandler)
+    server.daemon_threads = True
+    server.data = StandinData(fixtures_data)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, "http://127.0.0.1:{0}".format(server.server_address[1])
+
+
+if __name__ == "__main__":
+    scale = sys.argv[1] if len(sys.argv) > 1 else "small"
+    server, root = start_server(fixtures.make_fixtures(scale), int(sys.argv[2]) if len(sys.argv) > 2 else 8765)
+    print("Serving {0} fixtures at {1} - press ctrl+c to stop".format(scale, root))
+    for url, count in sorted(fixtures.fixture_counts({"layers": server.data.layers}).items()):
+        print("{0}: {1}".format(to_local(url, root), count))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,88 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: toolbox_startup.py
+Purpose: Startup benchmark for NHA_ArcGIS_Tools_v4.pyt. Each measurement runs in a fresh python process so nothing is
+already imported - this reports how long it takes to load the toolbox and build every tool's parameters (what ArcGIS
+Pro does when it refreshes the catalog or opens a tool dialog) and how long each tool's module in the nha_tools package
+takes to import when the tool runs. Run it with the ArcGIS Pro python environment:
+    python benchmarks\toolbox_startup.py [number of repeats]
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import re
+import sys
+import json
+import statistics
+import subprocess
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+toolbox_path = os.path.join(repo_dir, "NHA_ArcGIS_Tools_v4.pyt")
+
+# code run in each fresh process. It loads the toolbox the way Pro does (the .pyt is a python file with a different
+# extension), builds the parameters for every tool, and then optionally imports one tool module. Times are printed as
+# json in seconds.
+probe = r'''
+import sys, time, json, importlib, importlib.util, importlib.machinery
+sys.path.insert(0, {repo_dir!r})
+start = time.perf_counter()
+import arcpy
+arcpy_seconds = time.perf_counter() - start
+start = time.perf_counter()
+loader = importlib.machinery.SourceFileLoader("nha_toolbox", {toolbox_path!r})
+spec = importlib.util.spec_from_loader("nha_toolbox", loader)
+toolbox = importlib.util.module_from_spec(spec)
+loader.exec_module(toolbox)
+for tool in toolbox.Toolbox().tools:
+    tool().getParameterInfo()
+toolbox_seconds = time.perf_counter() - start
+module_seconds = None
+if {module!r}:
+    start = time.perf_counter()
+    importlib.import_module("nha_tools." + {module!r})
+    module_seconds = time.perf_counter() - start
+print(json.dumps({{"arcpy": arcpy_seconds, "toolbox": toolbox_seconds, "module": module_seconds}}))
+'''
+
+
+# define function to get the nha_tools module imported by each tool in the toolbox
+def tool_modules():
+    """Returns a dictionary of tool class name: nha_tools module name read from the toolbox source."""
+    with open(toolbox_path) as f:
+        source = f.read()
+    modules = {}
+    for match in re.finditer(r"^class (\w+)\(object\):(.*?)(?=^class |\Z)", source, re.S | re.M):
+        module = re.search(r"from nha_tools import (\w+)", match.group(2))
+        if module:
+            modules[match.group(1)] = module.group(1)
+    return modules
+
+
+# define function to run the probe in a fresh python process
+def run_probe(module=None):
+    """Returns the timings printed by the probe for one fresh process."""
+    code = probe.format(repo_dir=repo_dir, toolbox_path=toolbox_path, module=module)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# define function to run the benchmark and print a report
+def main(repeats=3):
+    """Prints the median toolbox load time and the median import time of each tool module over repeats runs."""
+    toolbox_runs = [run_probe() for _ in range(repeats)]
+    print("arcpy import (not counted against the toolbox): {0:.2f} s".format(
+        statistics.median(r["arcpy"] for r in toolbox_runs)))
+    print("toolbox load + all tool parameters: {0:.3f} s".format(statistics.median(r["toolbox"] for r in toolbox_runs)))
+    print("")
+    print("{0:<30}{1:<25}{2}".format("tool", "module", "import when run (s)"))
+    for tool, module in tool_modules().items():
+        seconds = statistics.median(run_probe(module)["module"] for _ in range(repeats))
+        print("{0:<30}{1:<25}{2:.3f}".format(tool, module, seconds))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
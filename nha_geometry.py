@@ -0,0 +1,140 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_geometry.py
+Purpose: Geometry preparation stage for the public NHA and SUSN layers, used by NHA_Public_Update.py and the Update
+Public Feature Service tool. NHA boundaries are drawn from dissolved CPP cores and carry far more vertices than the
+public web map needs. Before the polygons are appended to the public layer, they are simplified together with
+Simplify Shared Edges so that boundaries shared by neighboring NHAs stay shared, and their coordinates are snapped to
+a coarser XY resolution. The prepared geometries are kept in a file geodatabase store and only rebuilt when the source
+geometry has changed - attribute edits don't trigger a rebuild. A report of the vertex and byte reduction of each
+feature is written to the store each time the geometries are rebuilt.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import time
+import hashlib
+import arcpy
+import pandas as pd
+from nha_utils import load_watermarks, save_watermarks
+import nha_trace
+
+# simplification tolerance - vertices that are closer than this to the simplified boundary are removed
+simplify_tolerance = "1 Meters"
+# XY resolution and tolerance of the prepared geometries - coordinates are snapped to a grid of this size
+xy_resolution = "0.1 Meters"
+xy_tolerance = "0.2 Meters"
+
+# paths of the prepared geometry store - the info file records the source geometry fingerprint each set of prepared
+# geometries was built from
+store_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_geometry_store")
+store_gdb = os.path.join(store_dir, "public_geometry.gdb")
+store_info_path = os.path.join(store_dir, "public_geometry.json")
+
+
+# define function to get the paths of the prepared geometries and the reduction report for a set of features
+def prepared_paths(name):
+    """Returns the paths of the prepared feature class and the reduction report CSV for name."""
+    return os.path.join(store_gdb, name + "_prepared"), os.path.join(store_dir, name + "_report.csv")
+
+
+# define function to summarize the geometry of a list of feature classes by key. The fingerprint changes if any
+# feature's geometry changes, or if features are added or removed.
+def geometry_summary(features, key_field):
+    """Returns a dataframe of key, vertices, and wkb_bytes for every feature, and a fingerprint of all geometries."""
+    rows = []
+    for fc in features:
+        with arcpy.da.SearchCursor(fc, [key_field, "SHAPE@WKB", "SHAPE@"]) as cursor:
+            for key, wkb, shape in nha_trace.counted(cursor):
+                wkb = bytes(wkb) if wkb else b""
+                rows.append([key, shape.pointCount if shape else 0, len(wkb), hashlib.md5(wkb).hexdigest()])
+    summary = pd.DataFrame(rows, columns=[key_field, "vertices", "wkb_bytes", "geometry_hash"])
+    fingerprint = hashlib.md5()
+    for key, geometry_hash in sorted(zip(summary[key_field].astype(str), summary["geometry_hash"])):
+        fingerprint.update((key + ":" + geometry_hash + ";").encode("utf-8"))
+    return summary.drop(columns="geometry_hash"), fingerprint.hexdigest()
+
+
+# define function to simplify and quantize a list of feature classes together and save them to the store. The features
+# are merged first so that boundaries shared between layers (such as an NHA next to a SUSN) are simplified the same way.
+def build_public_geometry(features, name, key_field):
+    """Writes the simplified and quantized geometries of features to the store and returns the prepared feature class."""
+    if not os.path.isdir(store_dir):
+        os.makedirs(store_dir)
+    if not arcpy.Exists(store_gdb):
+        arcpy.CreateFileGDB_management(store_dir, os.path.basename(store_gdb))
+    prepared = prepared_paths(name)[0]
+
+    with arcpy.EnvManager(overwriteOutput=True):
+        merged = nha_trace.call("Merge", arcpy.Merge_management, features, os.path.join("memory", name + "_merge"))
+        nha_trace.call("SimplifySharedEdges", arcpy.SimplifySharedEdges_cartography, merged, "POINT_REMOVE",
+                       simplify_tolerance)
+    # copying into the store with a coarser resolution snaps every vertex to the same grid, so vertices shared by
+    # neighboring features stay identical
+    with arcpy.EnvManager(XYResolution=xy_resolution, XYTolerance=xy_tolerance, overwriteOutput=True):
+        nha_trace.call("CopyFeatures", arcpy.CopyFeatures_management, merged, prepared)
+    arcpy.Delete_management(merged)
+    return prepared
+
+
+# define function to compare the source and prepared geometries of each feature
+def geometry_report(source_summary, prepared, key_field):
+    """Returns a dataframe of the source and public vertices and bytes of each feature and the percent reduction."""
+    public_summary = geometry_summary([prepared], key_field)[0]
+    report = source_summary.merge(public_summary, on=key_field, how="left", suffixes=("_source", "_public"))
+    for measure in ("vertices", "wkb_bytes"):
+        reduction = 1 - report[measure + "_public"] / report[measure + "_source"].where(report[measure + "_source"] > 0)
+        report[measure + "_reduction_pct"] = (reduction * 100).round(1)
+    return report.sort_values(key_field).reset_index(drop=True)
+
+
+# define function to replace the geometries of a feature class with the prepared geometries. Features without a usable
+# prepared geometry (missing or collapsed to nothing) keep their source geometry.
+def apply_prepared(fc, prepared, key_field):
+    """Writes prepared geometries into fc by key and returns the number of features that were replaced."""
+    with arcpy.da.SearchCursor(prepared, [key_field, "SHAPE@"]) as cursor:
+        shapes = {key: shape for key, shape in cursor if shape is not None and shape.area > 0}
+    replaced = 0
+    with arcpy.da.UpdateCursor(fc, [key_field, "SHAPE@"]) as cursor:
+        for row in cursor:
+            shape = shapes.get(row[0])
+            if shape is not None:
+                cursor.updateRow([row[0], shape])
+                replaced += 1
+    nha_trace.add(rows=replaced)
+    return replaced
+
+
+# define function to prepare the public geometries of a list of feature classes in place. The prepared geometries are
+# rebuilt only if the source geometries or the simplification settings have changed since they were last built.
+def prepare_public_geometry(features, name, key_field="nha_join_id", log=print):
+    """Replaces the geometries of features with simplified, quantized geometries and returns the number replaced."""
+    if not isinstance(features, (list, tuple)):
+        features = [features]
+    prepared, report_path = prepared_paths(name)
+    source_summary, fingerprint = geometry_summary(features, key_field)
+    settings = {"simplify_tolerance": simplify_tolerance, "xy_resolution": xy_resolution, "xy_tolerance": xy_tolerance}
+
+    info = load_watermarks(store_info_path)
+    current = info.get(name, {})
+    if (current.get("fingerprint") != fingerprint or current.get("settings") != settings
+            or not arcpy.Exists(prepared)):
+        log("Simplifying " + str(len(source_summary)) + " " + name + " geometries for the public layer")
+        build_public_geometry(features, name, key_field)
+        report = geometry_report(source_summary, prepared, key_field)
+        report.to_csv(report_path, index=False)
+        totals = report[["vertices_source", "vertices_public", "wkb_bytes_source", "wkb_bytes_public"]].sum()
+        log("Reduced vertices from {0:,.0f} to {1:,.0f} and geometry size from {2:,.0f} to {3:,.0f} bytes. The "
+            "reduction of each feature is written to {4}".format(totals["vertices_source"], totals["vertices_public"],
+                                                                  totals["wkb_bytes_source"],
+                                                                  totals["wkb_bytes_public"], report_path))
+        info[name] = {"fingerprint": fingerprint, "settings": settings, "built": time.time()}
+        save_watermarks(store_info_path, info)
+    else:
+        log("Source geometries for " + name + " haven't changed - using the prepared geometries in " + prepared)
+
+    return sum(apply_prepared(fc, prepared, key_field) for fc in features)
@@ -0,0 +1,166 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_overlays.py
+Purpose: Keeps a local overlay store of the reference layers that NHAs are attributed against - the WeConservePA
+protected lands and the municipal boundaries - for the NHA prioritization script and the Fill Related Attribute Tables
+tool. The store is a file geodatabase holding an Albers projected copy of each layer (plus a dissolved copy of the
+protected lands used for percent protected), all with spatial indexes. Each layer is only rebuilt when its source
+layer's last edit date changes, so statewide copies and dissolves don't run every time NHAs are attributed.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - renamed from nha_protected_lands.py and added municipal boundaries for bulk NHA attribution.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import time
+import arcpy
+import pandas as pd
+from nha_utils import load_watermarks, save_watermarks
+
+# reference layers kept in the store - fields are the attributes kept for overlays and dissolve is whether we also keep
+# a dissolved copy
+overlay_layers = {
+    "protected_lands": {"url": r"https://gis.waterlandlife.org/server/rest/services/BaseLayers/We_Conserve_PA_Protected_Lands/FeatureServer/0",
+                        "fields": ["sitename", "loc_own"],
+                        "dissolve": True},
+    "municipalities": {"url": r"https://gis.waterlandlife.org/server/rest/services/Boundaries/FeatureServer/2",
+                       "fields": ["COUNTY_NAM", "MUNICIPA_1"],
+                       "dissolve": False},
+}
+
+# paths of the overlay store - the store info file records the source edit date each layer was built from
+store_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "overlay_store")
+store_gdb = os.path.join(store_dir, "nha_overlays.gdb")
+store_info_path = os.path.join(store_dir, "nha_overlays.json")
+
+# if a source layer doesn't report an edit date, its copy is rebuilt once it is older than this many days
+max_age_days = 7
+
+# define albers projection that we will use for all calculations
+albers_str = r'PROJCS["alber",GEOGCS["GCS_North_American_1983",DATUM["D_North_American_1983",SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],PROJECTION["Albers"],PARAMETER["false_easting",0.0],PARAMETER["false_northing",0.0],PARAMETER["central_meridian",-78.0],PARAMETER["standard_parallel_1",40.0],PARAMETER["standard_parallel_2",42.0],PARAMETER["latitude_of_origin",39.0],UNIT["Meter",1.0]];-16085300 -8515400 279982320.962027;-100000 10000;-100000 10000;0.001;0.001;0.001;IsHighPrecision'
+
+
+# define function to get the paths of the copies of a layer in the store
+def layer_paths(name):
+    """Returns the paths of the albers copy and the dissolved copy (None if the layer isn't dissolved) of a layer."""
+    dissolved = os.path.join(store_gdb, name + "_dissolve") if overlay_layers[name]["dissolve"] else None
+    return os.path.join(store_gdb, name + "_albers"), dissolved
+
+
+# define function to get the albers projection and the transformation (if any) from a dataset to albers
+def albers_environment(dataset):
+    """Returns the albers SpatialReference and the first transformation from the dataset's spatial reference, or ""."""
+    albers_prj = arcpy.SpatialReference()
+    albers_prj.loadFromString(albers_str)
+    transformations = arcpy.ListTransformations(arcpy.Describe(dataset).spatialReference, albers_prj)
+    transformation = transformations[0] if transformations else ""
+    return albers_prj, transformation
+
+
+# define function to get the last edit date of a source layer. This needs a portal login from nha_session.py - if the
+# layer or login isn't available we fall back to the age of the copy.
+def source_edit_date(url):
+    """Returns the last data edit date (epoch ms) reported by the source layer, or None if it isn't available."""
+    try:
+        from nha_session import feature_layer
+        editing_info = feature_layer(url).properties.get("editingInfo") or {}
+    except Exception:
+        return None
+    return editing_info.get("dataLastEditDate") or editing_info.get("lastEditDate")
+
+
+# define function to check whether the copies of a layer were built from the current version of its source layer
+def layer_is_current(name, info, edit_date):
+    """Returns True if the layer's copies exist and match the source edit date (or are recent enough without one)."""
+    if info.get("source") != overlay_layers[name]["url"]:
+        return False
+    if not all(arcpy.Exists(path) for path in layer_paths(name) if path):
+        return False
+    if edit_date is not None:
+        return info.get("last_edit_date") == edit_date
+    return time.time() - info.get("built", 0) < max_age_days * 86400
+
+
+# define function to rebuild the copies of a layer from its source layer
+def build_layer(name):
+    """Copies the source layer into the store in albers, dissolves it if needed, and adds spatial indexes."""
+    if not os.path.isdir(store_dir):
+        os.makedirs(store_dir)
+    if not arcpy.Exists(store_gdb):
+        arcpy.CreateFileGDB_management(store_dir, os.path.basename(store_gdb))
+
+    layer = overlay_layers[name]
+    features, dissolved = layer_paths(name)
+    albers_prj, transformation = albers_environment(layer["url"])
+    with arcpy.EnvManager(outputCoordinateSystem=albers_prj, geographicTransformations=transformation,
+                          overwriteOutput=True):
+        arcpy.CopyFeatures_management(layer["url"], features)
+        arcpy.AddSpatialIndex_management(features)
+        if dissolved:
+            # dissolve so that overlapping features don't give us funky numbers over 100%
+            arcpy.Dissolve_management(features, dissolved)
+            arcpy.AddSpatialIndex_management(dissolved)
+
+
+# define function to make sure the copies of a layer are current, rebuilding them if the source layer has been edited
+def get_layer(name, log=print):
+    """Returns the paths of the albers copy and dissolved copy of a layer, rebuilding them first if needed."""
+    info = load_watermarks(store_info_path)
+    url = overlay_layers[name]["url"]
+    edit_date = source_edit_date(url)
+    if not layer_is_current(name, info.get(name, {}), edit_date):
+        log("Rebuilding " + name + " in the overlay store from " + url)
+        build_layer(name)
+        info[name] = {"source": url, "last_edit_date": edit_date, "built": time.time()}
+        save_watermarks(store_info_path, info)
+    return layer_paths(name)
+
+
+# define function to run tabulate intersection of zones against a layer in the store, with areas in albers
+def tabulate_zones(zone_features, zone_field, class_features, out_name, class_fields=None):
+    """Runs TabulateIntersection in the albers projection and returns the output table."""
+    albers_prj, transformation = albers_environment(zone_features)
+    with arcpy.EnvManager(outputCoordinateSystem=albers_prj, geographicTransformations=transformation,
+                          overwriteOutput=True):
+        return arcpy.TabulateIntersection_analysis(zone_features, zone_field, class_features,
+                                                   os.path.join("memory", out_name), class_fields)
+
+
+# define function to calculate the percent of each zone (e.g. NHA) covered by protected lands
+def percent_protected(zone_features, zone_field="nha_join_id", log=print):
+    """Returns a DataFrame of zone_field and percent_protected for zones that overlap protected lands."""
+    features, dissolved = get_layer("protected_lands", log)
+    tab_area = tabulate_zones(zone_features, zone_field, dissolved, "protected_land_intersect")
+    with arcpy.da.SearchCursor(tab_area, [zone_field, "PERCENTAGE"]) as cursor:
+        return pd.DataFrame([row for row in cursor], columns=[zone_field, "percent_protected"])
+
+
+# define function to get the protected lands that overlap each zone (e.g. NHA) and the percent of the zone they cover
+def parcel_overlaps(zone_features, zone_field="nha_join_id", log=print):
+    """Returns a dictionary of zone value to a list of (sitename, loc_own, percentage) for overlapping protected lands."""
+    fields = overlay_layers["protected_lands"]["fields"]
+    features, dissolved = get_layer("protected_lands", log)
+    tab_area = tabulate_zones(zone_features, zone_field, features, "tab_area", fields)
+    overlaps = {}
+    with arcpy.da.SearchCursor(tab_area, [zone_field] + fields + ["PERCENTAGE"]) as cursor:
+        for row in cursor:
+            overlaps.setdefault(row[0], []).append(tuple(row[1:]))
+    return overlaps
+
+
+# define function to get the municipalities that intersect each zone (e.g. NHA) with one spatial join
+def municipality_overlaps(zone_features, zone_field="nha_join_id", log=print):
+    """Returns a dictionary of zone value to a list of (county, municipality) for intersecting municipalities."""
+    fields = overlay_layers["municipalities"]["fields"]
+    features, dissolved = get_layer("municipalities", log)
+    with arcpy.EnvManager(overwriteOutput=True):
+        joined = arcpy.SpatialJoin_analysis(zone_features, features, os.path.join("memory", "muni_join"),
+                                            "JOIN_ONE_TO_MANY", "KEEP_COMMON", match_option="INTERSECT")
+    overlaps = {}
+    with arcpy.da.SearchCursor(joined, [zone_field] + fields) as cursor:
+        for row in cursor:
+            overlaps.setdefault(row[0], []).append(tuple(row[1:]))
+    return overlaps
@@ -0,0 +1,296 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_prioritization.py
+Purpose: NHA prioritization metrics for NHA_Prioritizer.py and the prioritization scenario runner. The work is split
+into two steps - load_inputs does all of the spatial work and data pulls (the SF to NHA assignments, visits, EO reps,
+the scored species list, and percent protected) once, and evaluate calculates the prioritization table from those
+inputs with a set of parameters (botany tier thresholds, site rank cutoffs, high grank exclusions, and the plant
+lookback). Any number of parameter sets can be evaluated against the same inputs without pulling the data again.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - SF to NHA assignments come from the incremental store in nha_sf_assignments.py instead of centroids and a
+tabulate intersect on every run, and qualifying SFs are flagged in pandas
+10/19/2026 - layer urls come from the schema registry in nha_schema.py and every field read is checked before any data
+is pulled
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import datetime
+import arcpy
+import pandas as pd
+import numpy as np
+from nha_sf_assignments import source_layers, update_assignments
+from nha_overlays import percent_protected
+from nha_ranks import load_rank_table, score_species
+from nha_utils import load_frame
+from nha_schema import url, validate
+from nha_tools.site_rank import site_ranks
+import nha_trace
+
+# set input parameters - paths to biotics and nha data from the schema registry in nha_schema.py. The source feature
+# layers are in nha_sf_assignments.py.
+eo_ptreps = url("eo_ptreps")
+nha_core = url("nha_core")
+visits = url("visits")
+nha_species = url("nha_species")
+# the rank reference tables are read by the compiled rank table in nha_ranks.py
+
+# fields read from each layer - these are checked before any data is pulled
+sf_fields = ["SF_ID", "EO_ID", "ELCODE", "USESA", "EO_TRACK", "EST_RA", "INDEP_SF"]
+required_fields = {
+    "eo_sourcept": sf_fields, "eo_sourceln": sf_fields, "eo_sourcepy": sf_fields,
+    "eo_ptreps": ["EO_ID", "ELCODE", "SURVEY_YR", "LASTOBS", "LASTOBS_YR", "EORANK"],
+    "visits": ["SF_ID", "VISIT_YR"],
+    "nha_core": ["nha_join_id", "drawn_date"],
+    "nha_species": ["EO_ID", "SNAME", "ELSUBID", "GRANK", "SRANK", "EORANK", "exclude", "nha_join_id"],
+}
+
+# prioritization parameters used by NHA_Prioritizer.py. Scenarios override any of these.
+default_parameters = {
+    # plants and communities (ELCODEs starting with P, N, C, H, or G) count as qualifying SFs for visit stats only if
+    # they were observed within this many years
+    "plant_lookback_years": 50,
+    # botany tiers - Tier 1 has more than tier1_s1s2s3 S1-S3 plant species or a botany score over tier1_score, Tier 2
+    # has more than tier2_s1s2s3 (up to tier1_s1s2s3), and Tier 2.5 has exactly tier25_s1s2s3
+    "botany_tier1_s1s2s3": 6,
+    "botany_tier1_score": 350,
+    "botany_tier2_s1s2s3": 2,
+    "botany_tier25_s1s2s3": 1,
+    # site rank cutoffs - sites scoring over global_score are Global and over regional_score are Regional
+    "global_score": 457,
+    "regional_score": 152,
+    # species that aren't counted as high grank (G1/G2/G3) species
+    "high_grank_exclusions": ["Panax quinquefolius", "Hydrastis canadensis", "Crataegus pennsylvanica"],
+}
+
+# columns of the prioritization table
+metric_columns = ['nha_site_score', 'nha_score_percentile', 'site_rank', 'count_species', 'count_EOs',
+                  'visits_before', 'visits_after', 'min_visit_yr', 'mean_visit_yr', 'max_visit_yr',
+                  'percent_protected', 'BOTANY_count_species', 'BOTANY_count_EOs', 'VERTEBRATE_count_species',
+                  'VERTEBRATE_count_eos', 'MUSSEL_count_species', 'MUSSEL_count_eos', 'INVERT_count_species',
+                  'INVERT_count_eos', 'BOTANY_weighted_score', 'BOTANY_score_percentile',
+                  'BOTANY_count_S1S2S3_species', 'BOTANY_count_S1S2S3_EOs', 'BOTANY_min_lastobs_yr',
+                  'BOTANY_mean_lastobs_yr', 'BOTANY_max_lastobs_yr', 'BOTANY_high_grank']
+
+# columns that are filled with 0 for NHAs without values
+cols_to_fill = ['nha_site_score', 'nha_score_percentile', 'count_species', 'count_EOs', 'percent_protected',
+                'BOTANY_weighted_score', 'BOTANY_count_species', 'BOTANY_count_EOs', 'BOTANY_count_S1S2S3_species',
+                'BOTANY_count_S1S2S3_EOs', 'BOTANY_high_grank', 'VERTEBRATE_count_species', 'VERTEBRATE_count_eos',
+                'MUSSEL_count_eos', 'MUSSEL_count_species', 'INVERT_count_species', 'INVERT_count_eos']
+
+# ELCODE prefixes of the plants and communities the plant lookback applies to
+plant_prefixes = ('P', 'N', 'C', 'H', 'G')
+
+# inputs loaded in a scenario worker process
+_worker_inputs = None
+
+
+# define function to load the inputs for the prioritization. The SF to NHA assignments come from the store in
+# nha_sf_assignments.py, which only redoes the spatial work for SFs and NHAs that changed since the last run.
+def load_inputs():
+    """Returns a dictionary of the dataframes that evaluate calculates the prioritization table from."""
+    arcpy.env.overwriteOutput = True
+    validate(required_fields)
+
+    nha_trace.section("SF assignments")
+    # which SFs are in which NHAs and when the NHA was drawn
+    assignments, nha_dates = update_assignments()
+
+    nha_trace.section("load visits and EOs")
+    # load only the fields used below with the typed loader in nha_utils.py - code fields are categoricals and years
+    # are nullable integers, so nulls don't need to be replaced after the joins
+    # source features - the EO of each SF and the SF fields the qualifying SF rules are checked against
+    sf_df = pd.concat([load_frame(layer, sf_fields) for layer in source_layers.values()], ignore_index=True)
+    sf_df = sf_df.drop_duplicates(subset=["SF_ID"])
+
+    # visits - the visit year of each SF
+    visits_df = load_frame(visits, required_fields["visits"], years=["VISIT_YR"])
+
+    # eo reps - survey year for visits, last observed date and EO rank for qualifying SFs, and ELCODE and last observed
+    # year for species
+    eo_df = load_frame(eo_ptreps, required_fields["eo_ptreps"], categories=["ELCODE"],
+                       years=["SURVEY_YR", "LASTOBS_YR"])
+
+    # join EO fields to the SFs so that we can use EORANK and last observed date for filtering purposes
+    sf_df = pd.merge(sf_df, eo_df[["EO_ID", "LASTOBS", "EORANK"]], how='left', on='EO_ID')
+    sf_nha_df = pd.merge(assignments, nha_dates, on='nha_join_id', how='left')
+
+    nha_trace.section("species scores")
+    # create Pandas dataframe from NHA species list
+    species_df = load_frame(nha_species, required_fields["nha_species"],
+                            categories=["GRANK", "SRANK", "EORANK", "exclude"])
+
+    # only keep records that meet NHA criteria
+    species_df = species_df[species_df['exclude'] == 'N']
+
+    # join eo attributes to the species list
+    species_df = pd.merge(species_df, eo_df[["EO_ID","ELCODE","LASTOBS_YR"]], how='left', on='EO_ID')
+    species_df = species_df.drop_duplicates(subset=['nha_join_id', 'EO_ID'])
+
+    # get rounded granks/sranks, combined rank scores, and eo weights from the compiled rank table in nha_ranks.py -
+    # the weighted rank score is the combined rank score multiplied by the eo weight
+    species_df = score_species(species_df, load_rank_table())
+    species_df.weighted_score = species_df["weighted_score"].fillna(0) # fill Null values with 0
+
+    nha_trace.section("percent protected")
+    # getting % protected lands
+    # this comes from the protected lands in the overlay store in nha_overlays.py, which keeps a dissolved, albers
+    # projected copy of the WeConservePA layer and only rebuilds it when the source layer has been edited
+    protected_lands_df = percent_protected(nha_core, "nha_join_id")
+
+    return {"sf_nha": pd.merge(sf_nha_df, sf_df, on='SF_ID', how='inner'), "visits": visits_df,
+            "survey_years": eo_df[["EO_ID", "SURVEY_YR"]], "species": species_df,
+            "percent_protected": protected_lands_df.set_index('nha_join_id')[["percent_protected"]]}
+
+
+# define function to flag SFs that qualify for inclusion in an NHA. It is similar to the CPP where clause, but we exclude
+# watch list species here. The rules are the same as the where clause that used to select SF centroids - like the where
+# clause, a rule with a null field is not met.
+def qualifying_sfs(sf_df, plant_lookback_years):
+    """Returns a boolean series that is True for SFs in sf_df that qualify with plant_lookback_years."""
+    year = str(datetime.datetime.now().year - plant_lookback_years)
+    elcode = sf_df["ELCODE"].astype("string")
+    lastobs = sf_df["LASTOBS"].astype("string")
+
+    def starts(*prefixes):
+        return elcode.str.startswith(prefixes).fillna(False)
+
+    def is_elcode(code):
+        return (elcode == code).fillna(False)
+
+    def since(obs_year):
+        return (lastobs >= obs_year).fillna(False)
+
+    inverts = ('IC', 'IIEPH', 'IITRI', 'IMBIV', 'IMGAS', 'IP', 'IZ')
+    birds = (starts('AB') & since('1990')) | (is_elcode('ABNKC12060') & since('1980'))
+    plants = ((starts(*plant_prefixes) & since(year)) |
+              (starts('P', 'N') & sf_df["USESA"].isin(['LE', 'LT']) & since('1950')))
+    herps_fish = (starts('AF', 'AA', 'AR') & since('1950')) | is_elcode('ARADE03011')
+    mammals = ((starts('AM', 'OBAT') & ~is_elcode('AMACC01150') & since('1970')) |
+               (is_elcode('AMACC01100') & since('1950')) | (is_elcode('AMACC01150') & since('1985')))
+    invertebrates = (starts(*inverts) & since('1950')) | (starts('I') & ~starts(*inverts) & since('1980'))
+    no_lastobs = lastobs.isin(['', ' ']).fillna(False)
+
+    tracked = (sf_df["EO_TRACK"] == 'Y').fillna(False)
+    dated = (lastobs != 'NO DATE').fillna(False)
+    ranked = sf_df["EORANK"].notna() & ~sf_df["EORANK"].isin(['X', 'X?'])
+    reliable = sf_df["EST_RA"].notna() & ~sf_df["EST_RA"].isin(['Very Low', 'Low'])
+    independent = sf_df["INDEP_SF"].notna() & (sf_df["INDEP_SF"] != 'Y')
+    return ((birds | plants | herps_fish | mammals | invertebrates | no_lastobs) & tracked & dated & ranked &
+            reliable & independent)
+
+
+# define function to calculate the prioritization table from the loaded inputs with a set of parameters
+def evaluate(inputs, parameters=None):
+    """Returns the prioritization table for inputs from load_inputs, with default_parameters updated by parameters."""
+    parameters = dict(default_parameters, **(parameters or {}))
+
+    # VISIT METRICS
+    # SFs in NHAs that qualify with the plant lookback and their visits - SFs without a visit are kept
+    sf_nha = inputs["sf_nha"][qualifying_sfs(inputs["sf_nha"], parameters["plant_lookback_years"])]
+    nha_visits = pd.merge(sf_nha[["SF_ID", "nha_join_id", "drawn_date", "EO_ID"]], inputs["visits"], on='SF_ID',
+                          how='left')
+    nha_visits = pd.merge(nha_visits, inputs["survey_years"], on='EO_ID', how='left')
+
+    # if SF does not have visit (aka visit year is null), fill with survey year to get last approximate visit
+    nha_visits['VISIT_YR'] = nha_visits['VISIT_YR'].fillna(nha_visits['SURVEY_YR'])
+    # remove rows with NO DATE / that do not have a valid survey/visit date/year
+    nha_visits = nha_visits[nha_visits['VISIT_YR'].ne(0).fillna(True)]
+
+    # convert visit year to date field
+    nha_visits['VISIT_YR_date'] = pd.to_datetime(nha_visits['VISIT_YR'], format='%Y')
+
+    # create column designating if visit is after drawn update
+    nha_visits['visits_after'] = np.where(nha_visits['VISIT_YR_date'] > nha_visits['drawn_date'], 1, 0)
+    # create column designating if visit is before drawn update
+    nha_visits['visits_before'] = np.where(nha_visits['VISIT_YR_date'] > nha_visits['drawn_date'], 0, 1)
+
+    # calculate visit statistics in one grouped aggregation - the number of visits before and after the NHA drawn date
+    # and the min, mean, and max visit year
+    visit_metrics = nha_visits.groupby('nha_join_id').agg(visits_before=('visits_before', 'sum'),
+                                                          visits_after=('visits_after', 'sum'),
+                                                          min_visit_yr=('VISIT_YR', 'min'),
+                                                          mean_visit_yr=('VISIT_YR', 'mean'),
+                                                          max_visit_yr=('VISIT_YR', 'max'))
+
+    # SPECIES METRICS
+    species_df = inputs["species"].copy()
+
+    # assign each species record to a taxa group based on ELCODE so that taxa group stats can be calculated in one
+    # grouped aggregation instead of on filtered copies of the species list. mussels need to be checked before other
+    # inverts.
+    taxa_groups = ["BOTANY", "MUSSEL", "INVERT", "VERTEBRATE"]
+    taxa_conditions = [species_df["ELCODE"].str.startswith(('P', 'N'), na=False),
+                       species_df["ELCODE"].str.startswith('IMBIV', na=False),
+                       species_df["ELCODE"].str.startswith('I', na=False),
+                       species_df["ELCODE"].str.startswith('A', na=False)]
+    species_df["taxa_group"] = pd.Categorical(np.select(taxa_conditions, taxa_groups, default=None),
+                                              categories=taxa_groups)
+
+    # flag S1/S2/S3 species and EOs - the ids are null for other sranks so they aren't included in unique counts
+    s1s2s3 = species_df['srank_rounded'].isin(['S1', 'S2', 'S3'])
+    species_df['s1s2s3_ELSUBID'] = species_df['ELSUBID'].where(s1s2s3)
+    species_df['s1s2s3_EO_ID'] = species_df['EO_ID'].where(s1s2s3)
+
+    # flag species with high granks (G1/G2/G3), leaving out the excluded species (ginseng, goldenseal, and
+    # Pennsylvania hawthorn by default)
+    species_df['high_grank'] = np.where(species_df['grank_rounded'].isin(['G1', 'G2', 'G3']) &
+                                        ~species_df['SNAME'].isin(parameters["high_grank_exclusions"]), 1, 0)
+
+    # get nha site score by summing the weighted scores of EOs within the NHA and the number of species and EOs per NHA
+    nha_metrics = species_df.groupby('nha_join_id').agg(nha_site_score=('weighted_score', 'sum'),
+                                                        count_species=('ELSUBID', 'nunique'),
+                                                        count_EOs=('EO_ID', 'nunique'))
+    site_rank = site_ranks(species_df, parameters["global_score"], parameters["regional_score"])
+    nha_metrics['site_rank'] = nha_metrics.index.map(site_rank)
+
+    ## CALCULATING TAXA GROUP STATS
+    # get stats for each NHA and taxa group in one grouped aggregation. Columns are named with the taxa group and
+    # metric (e.g. BOTANY_count_species) - only the columns listed in metric_columns end up in the prioritization table.
+    taxa_metrics = species_df.groupby(['nha_join_id', 'taxa_group'], observed=True).agg(
+        count_species=('ELSUBID', 'nunique'),
+        count_eos=('EO_ID', 'nunique'),
+        weighted_score=('weighted_score', 'sum'),
+        count_S1S2S3_species=('s1s2s3_ELSUBID', 'nunique'),
+        count_S1S2S3_EOs=('s1s2s3_EO_ID', 'nunique'),
+        min_lastobs_yr=('LASTOBS_YR', 'min'),
+        mean_lastobs_yr=('LASTOBS_YR', 'mean'),
+        max_lastobs_yr=('LASTOBS_YR', 'max'),
+        high_grank=('high_grank', 'sum')).unstack('taxa_group')
+    taxa_metrics.columns = ["{0}_{1}".format(group, metric) for metric, group in taxa_metrics.columns]
+    taxa_metrics.rename(columns={'BOTANY_count_eos': 'BOTANY_count_EOs'}, inplace=True)
+
+    # JOIN ALL THE METRICS INTO ONE DATAFRAME - all metrics are indexed by nha_join_id so this is one join on the index.
+    # NHAs are limited to those with species in the species list.
+    final_metrics = nha_metrics.join([visit_metrics, inputs["percent_protected"], taxa_metrics], how='left')
+    final_metrics["nha_score_percentile"] = final_metrics["nha_site_score"].rank(pct=True, method='min')
+    final_metrics["BOTANY_score_percentile"] = final_metrics["BOTANY_weighted_score"].rank(pct=True, method='min')
+    final_metrics = final_metrics.reindex(columns=metric_columns).reset_index()
+
+    # fill botany tiers - NHAs without plants (null botany score) don't get a tier
+    botany_s1s2s3 = final_metrics['BOTANY_count_S1S2S3_species']
+    botany_score = final_metrics['BOTANY_weighted_score']
+    tier1, tier2 = parameters["botany_tier1_s1s2s3"], parameters["botany_tier2_s1s2s3"]
+    tier_conditions = [(botany_s1s2s3 > tier1) | (botany_score > parameters["botany_tier1_score"]),
+                       (botany_s1s2s3 > tier2) & (botany_s1s2s3 <= tier1),
+                       botany_s1s2s3 == parameters["botany_tier25_s1s2s3"],
+                       botany_score.isnull()]
+    final_metrics['BOTANY_tier'] = np.select(tier_conditions, ['Tier 1', 'Tier 2', 'Tier 2.5', None], default='Tier 3')
+
+    # fill null values with 0 in certain columns
+    final_metrics[cols_to_fill] = final_metrics[cols_to_fill].fillna(0)
+    return final_metrics
+
+
+# define function to keep the loaded inputs in a scenario worker process so they are only sent to each worker once
+def init_worker(inputs):
+    global _worker_inputs
+    _worker_inputs = inputs
+
+
+# define function to evaluate a named scenario in a worker process
+def evaluate_scenario(name, parameters):
+    """Returns the scenario name and its prioritization table."""
+    return name, evaluate(_worker_inputs, parameters)
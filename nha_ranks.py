@@ -0,0 +1,169 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_ranks.py
+Purpose: Compiled rank scoring table for the Calculate Site Rank tool and the NHA prioritization script. The rank
+reference tables (rounded granks, rounded sranks, the combined rank score matrix, and the EO rank weights) are compiled
+into dense NumPy arrays - rank codes become small integer indexes, the score matrix is indexed by rounded grank and
+rounded srank, and the weights are indexed by EO rank - so species are scored by array indexing over the whole species
+list instead of a chain of merges on string keys. The compiled table is kept in memory for the python session and in
+a file on disk, and is only recompiled when one of the reference tables has been edited.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import time
+import arcpy
+import numpy as np
+import pandas as pd
+from nha_utils import load_watermarks, save_watermarks
+from nha_overlays import source_edit_date
+import nha_schema
+
+# rank reference tables and the fields read from each
+reference_tables = {
+    "rounded_grank": {"url": nha_schema.url("rounded_grank"),
+                      "fields": ["grank", "grank_rounded"]},
+    "rounded_srank": {"url": nha_schema.url("rounded_srank"),
+                      "fields": ["srank", "srank_rounded"]},
+    "rank_matrix": {"url": nha_schema.url("rank_matrix"),
+                    "fields": ["combinedrank", "score"]},
+    "eorank_weights": {"url": nha_schema.url("eorank_weights"),
+                       "fields": ["eorank", "weight"]},
+}
+
+# paths of the compiled table - the info file records the reference table edit dates it was compiled from
+store_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rank_store")
+store_path = os.path.join(store_dir, "rank_table.npz")
+store_info_path = os.path.join(store_dir, "rank_table.json")
+
+# if a reference table doesn't report an edit date, the compiled table is rebuilt once it is older than this many days
+max_age_days = 1
+
+# compiled table kept for the python session (the whole ArcGIS Pro session for the toolbox) and the edit dates it was
+# compiled from
+_table = None
+_table_edit_dates = None
+
+
+# define function to get the unique values of a column in the order they first appear, leaving out nulls
+def _unique(values):
+    return list(dict.fromkeys(v for v in values if v is not None and v == v))
+
+
+# define function to compile the rank scoring table from the reference tables. The last entry of every lookup array is
+# the value used for codes that aren't in the reference tables, so code -1 (not found) indexes it directly.
+def compile_rank_table():
+    """
+    Reads the rank reference tables and returns a dictionary of NumPy arrays:
+    grank_codes, srank_codes, eorank_codes - the rank codes found in the reference tables
+    grank_rounded, srank_rounded - the rounded rank names
+    grank_index, srank_index - the rounded rank index of each rank code (last entry is for codes not found)
+    score - combined rank score by rounded grank and rounded srank index (last row and column are 0 for not found)
+    weight - weight of each EO rank code (last entry is NaN for codes not found)
+    """
+    tables = {name: arcpy.da.TableToNumPyArray(table["url"], table["fields"], skip_nulls=True)
+              for name, table in reference_tables.items()}
+
+    # rank codes and rounded ranks - if a code is listed twice, the first row is used like the first match of a lookup
+    rounded = {}
+    for rank in ("grank", "srank"):
+        rows = tables["rounded_" + rank]
+        lookup = {}
+        for code, rounded_code in zip(rows[rank], rows[rank + "_rounded"]):
+            lookup.setdefault(code, rounded_code)
+        names = _unique(lookup.values())
+        index = np.array([names.index(lookup[code]) for code in lookup] + [len(names)], dtype=np.int16)
+        rounded[rank] = {"codes": np.array(list(lookup), dtype=str), "names": np.array(names, dtype=str),
+                         "index": index}
+
+    # combined rank scores by rounded grank and rounded srank - combined ranks are the two rounded ranks concatenated
+    matrix_scores = {}
+    for combinedrank, score in zip(tables["rank_matrix"]["combinedrank"], tables["rank_matrix"]["score"]):
+        matrix_scores.setdefault(combinedrank, float(score))
+    gnames, snames = rounded["grank"]["names"], rounded["srank"]["names"]
+    score = np.zeros((len(gnames) + 1, len(snames) + 1), dtype=np.float64)
+    for gi, g in enumerate(gnames):
+        for si, s in enumerate(snames):
+            score[gi, si] = matrix_scores.get(g + s, 0.0)
+
+    weights = {}
+    for eorank, weight in zip(tables["eorank_weights"]["eorank"], tables["eorank_weights"]["weight"]):
+        weights.setdefault(eorank, float(weight))
+
+    return {"grank_codes": rounded["grank"]["codes"], "grank_rounded": gnames, "grank_index": rounded["grank"]["index"],
+            "srank_codes": rounded["srank"]["codes"], "srank_rounded": snames, "srank_index": rounded["srank"]["index"],
+            "score": score, "eorank_codes": np.array(list(weights), dtype=str),
+            "weight": np.array(list(weights.values()) + [np.nan], dtype=np.float64)}
+
+
+# define function to save a compiled table. The file is written to a temporary path and then swapped in, so a failure
+# part way through doesn't leave a broken table.
+def save_rank_table(table, path=None):
+    """Saves a compiled table to path (the rank store by default)."""
+    path = path or store_path
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    temp_path = path + ".tmp.npz"
+    np.savez(temp_path, **table)
+    os.replace(temp_path, path)
+
+
+# define function to load a compiled table saved with save_rank_table
+def load_saved_table(path=None):
+    """Returns the compiled table saved at path (the rank store by default), or None if there isn't one."""
+    path = path or store_path
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as saved:
+        return {name: saved[name] for name in saved.files}
+
+
+# define function to get the compiled rank table. The table in memory is used if the reference tables haven't been
+# edited since it was compiled, then the table on disk, and otherwise the table is compiled and saved.
+def load_rank_table(log=print):
+    """Returns the current compiled rank scoring table."""
+    global _table, _table_edit_dates
+    edit_dates = {name: source_edit_date(table["url"]) for name, table in reference_tables.items()}
+    known_dates = None not in edit_dates.values()
+    if _table is not None and known_dates and edit_dates == _table_edit_dates:
+        return _table
+
+    info = load_watermarks(store_info_path)
+    if known_dates:
+        current = info.get("edit_dates") == edit_dates
+    else:
+        current = time.time() - info.get("built", 0) < max_age_days * 86400
+    table = load_saved_table() if current else None
+    if table is None:
+        log("Compiling the rank scoring table from the rank reference tables")
+        table = compile_rank_table()
+        save_rank_table(table)
+        save_watermarks(store_info_path, {"edit_dates": edit_dates, "built": time.time()})
+
+    _table = table
+    _table_edit_dates = edit_dates if known_dates else None
+    return table
+
+
+# define function to score a species list with the compiled rank table. Adds the grank_rounded and srank_rounded
+# (categorical), score (0 if the combined rank isn't scored), weight (NaN if the EO rank isn't weighted), and
+# weighted_score (score * weight) columns.
+def score_species(df, table=None, grank_field="GRANK", srank_field="SRANK", eorank_field="EORANK"):
+    """Returns the species dataframe with rounded ranks, rank score, EO weight, and weighted score columns."""
+    if table is None:
+        table = load_rank_table()
+    grank = table["grank_index"][pd.Index(table["grank_codes"]).get_indexer(df[grank_field])]
+    srank = table["srank_index"][pd.Index(table["srank_codes"]).get_indexer(df[srank_field])]
+    weight = table["weight"][pd.Index(table["eorank_codes"]).get_indexer(df[eorank_field])]
+    score = table["score"][grank, srank]
+
+    # rounded rank indexes past the end of the names are codes that weren't found
+    gnames, snames = table["grank_rounded"], table["srank_rounded"]
+    df = df.assign(grank_rounded=pd.Categorical.from_codes(np.where(grank < len(gnames), grank, -1), gnames),
+                   srank_rounded=pd.Categorical.from_codes(np.where(srank < len(snames), srank, -1), snames),
+                   score=score, weight=weight, weighted_score=score * weight)
+    return df
@@ -0,0 +1,195 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_schema.py
+Purpose: Registry of the NHA and Biotics service layers and tables and their fields. Every layer is defined once here
+by name, and the field metadata of each layer (field names, types, aliases, and lengths, and the objectid field) is
+cached in a local schema store along with the edit date the service reported when it was read. A layer's fields are
+read from the service again only when its schema (or data, if the service doesn't report schema edits) edit date
+changes, and only once per run. Scripts and tools check the fields they need for every layer in one call to validate
+before doing any work, so a renamed or missing field is reported up front instead of partway through a long run, and
+get field lists for cursors and field mappings from the cache instead of listing fields on the services again.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import time
+import arcpy
+from nha_utils import load_watermarks, save_watermarks
+
+# service layers and tables by name
+layers = {
+    # NHA editing service
+    "nha_core": r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/0",
+    "nha_boundaries": r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/2",
+    "nha_protected_lands": r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/3",
+    "nha_references": r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/4",
+    "nha_site_accounts": r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/5",
+    "nha_species": r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/6",
+    "nha_tr_bullets": r"https://gis.waterlandlife.org/server/rest/services/PNHP/NHA_EDIT/FeatureServer/7",
+    # Biotics
+    "eo_ptreps": r"https://gis.waterlandlife.org/server/rest/services/PNHP/Biotics_READ_ONLY/FeatureServer/0",
+    "eo_sourcept": r"https://gis.waterlandlife.org/server/rest/services/PNHP/Biotics_READ_ONLY/FeatureServer/2",
+    "eo_sourceln": r"https://gis.waterlandlife.org/server/rest/services/PNHP/Biotics_READ_ONLY/FeatureServer/3",
+    "eo_sourcepy": r"https://gis.waterlandlife.org/server/rest/services/PNHP/Biotics_READ_ONLY/FeatureServer/4",
+    "visits": r"https://gis.waterlandlife.org/server/rest/services/PNHP/Biotics_READ_ONLY/FeatureServer/7",
+    # NHA reference layers
+    "nha_archive": r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/0",
+    "eorank_weights": r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/1",
+    "rank_matrix": r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/2",
+    "rounded_grank": r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/3",
+    "rounded_srank": r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/4",
+    "zotero_references": r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/5",
+    "species_urls": r"https://gis.waterlandlife.org/server/rest/services/Hosted/NHA_Reference_Layers/FeatureServer/6",
+}
+
+# paths of the schema store
+store_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema_store")
+store_path = os.path.join(store_dir, "nha_schema.json")
+
+# if a service doesn't report an edit date, its cached fields are read again once they are older than this many days
+max_age_days = 1
+
+# field types that aren't attributes - they are left out of attribute field lists
+non_attribute_types = ("OID", "Geometry", "GlobalID", "Blob", "Raster")
+
+# schemas checked against their service during this run
+_checked = {}
+
+
+# define function to get the url of a layer by name. Urls and paths that aren't in the registry are returned as is, so
+# the functions below also work on local copies and tool inputs.
+def url(name):
+    """Returns the url of the named layer, or name if it isn't a registered layer."""
+    return layers.get(name, name)
+
+
+# define function to turn a REST field type (esriFieldTypeString) into the arcpy field type name (String)
+def _field_type(rest_type):
+    field_type = rest_type.replace("esriFieldType", "")
+    return "Guid" if field_type == "GUID" else field_type
+
+
+# define function to read a layer's edit date and field metadata from the service in one request. Layers that aren't
+# services (or if the arcgis package isn't available) are read with arcpy and don't have an edit date.
+def read_schema(layer):
+    """Returns a dictionary with the edit date, objectid field, and fields of layer."""
+    if layer.lower().startswith("http"):
+        try:
+            from nha_session import feature_layer
+            properties = feature_layer(layer).properties
+            editing_info = properties.get("editingInfo") or {}
+            return {"last_edit_date": editing_info.get("schemaLastEditDate") or editing_info.get("lastEditDate"),
+                    "oid_field": properties.get("objectIdField"),
+                    "fields": [{"name": f["name"], "type": _field_type(f["type"]), "alias": f.get("alias"),
+                                "length": f.get("length")} for f in properties.get("fields") or []],
+                    "read": time.time()}
+        except Exception:
+            pass
+    return {"last_edit_date": None,
+            "oid_field": arcpy.Describe(layer).OIDFieldName,
+            "fields": [{"name": f.name, "type": f.type, "alias": f.aliasName, "length": f.length}
+                       for f in arcpy.ListFields(layer)],
+            "read": time.time()}
+
+
+# define function to check a cached schema against the service's current edit date without reading the fields
+def _edit_date(layer):
+    try:
+        from nha_session import feature_layer
+        editing_info = feature_layer(layer).properties.get("editingInfo") or {}
+    except Exception:
+        return None
+    return editing_info.get("schemaLastEditDate") or editing_info.get("lastEditDate")
+
+
+# define function to get the schema of a layer from the schema store, reading it from the service if the cached copy is
+# missing or out of date. Each layer is checked against its service once per run. Only services are kept in the store -
+# local datasets and map layers are read with arcpy each time.
+def layer_schema(name):
+    """Returns a dictionary with the edit date, objectid field, and fields of the named layer (or a url or path)."""
+    layer = url(name)
+    if layer in _checked:
+        return _checked[layer]
+    if not layer.lower().startswith("http"):
+        return read_schema(layer)
+    store = load_watermarks(store_path)
+    schema = store.get(layer)
+    if schema is not None:
+        edit_date = _edit_date(layer)
+        if edit_date is not None:
+            current = schema.get("last_edit_date") == edit_date
+        else:
+            current = time.time() - schema.get("read", 0) < max_age_days * 86400
+        if not current:
+            schema = None
+    if schema is None:
+        schema = read_schema(layer)
+        store[layer] = schema
+        if not os.path.isdir(store_dir):
+            os.makedirs(store_dir)
+        save_watermarks(store_path, store)
+    _checked[layer] = schema
+    return schema
+
+
+# define function to check the fields needed from every layer at once. Raises one error listing every missing field so
+# nothing is read or written until the services have all of them.
+def validate(requirements):
+    """Checks that each layer in requirements (a dictionary of layer name: list of fields) has all of its fields."""
+    missing = []
+    for name, fields in requirements.items():
+        try:
+            available = {f["name"].lower() for f in layer_schema(name)["fields"]}
+        except Exception as ex:
+            missing.append("{0}: could not be read ({1})".format(name, ex))
+            continue
+        absent = [field for field in fields if field.lower() not in available]
+        if absent:
+            missing.append("{0}: {1}".format(name, ", ".join(absent)))
+    if missing:
+        raise ValueError("Missing fields on the NHA services - " + "; ".join(missing))
+
+
+# define function to get field names as they are spelled on the layer
+def resolve_fields(name, fields):
+    """Returns fields with the case used by the named layer. Raises ValueError if any are missing."""
+    available = {f["name"].lower(): f["name"] for f in layer_schema(name)["fields"]}
+    absent = [field for field in fields if field.lower() not in available]
+    if absent:
+        raise ValueError("Missing fields on {0}: {1}".format(name, ", ".join(absent)))
+    return [available[field.lower()] for field in fields]
+
+
+# define function to get the attribute fields of a layer for cursors
+def field_names(name, exclude_types=non_attribute_types):
+    """Returns the names of the fields of the named layer, leaving out fields of exclude_types."""
+    return [f["name"] for f in layer_schema(name)["fields"] if f["type"] not in exclude_types]
+
+
+# define function to get the field types of a layer
+def field_types(name):
+    """Returns a dictionary of lowercase field name: arcpy field type for the named layer."""
+    return {f["name"].lower(): f["type"] for f in layer_schema(name)["fields"]}
+
+
+# define function to get the objectid field of a layer
+def oid_field(name):
+    """Returns the name of the objectid field of the named layer."""
+    return layer_schema(name)["oid_field"]
+
+
+# define function to build field mappings that only keep the listed fields of a layer. The field maps are built from the
+# resolved field names instead of adding every field of the layer and removing the ones we don't need.
+def field_mappings(name, keep_fields):
+    """Returns arcpy FieldMappings with one field map for each of keep_fields on the named layer."""
+    layer = url(name)
+    fieldmappings = arcpy.FieldMappings()
+    for field in resolve_fields(name, keep_fields):
+        fieldmap = arcpy.FieldMap()
+        fieldmap.addInputField(layer, field)
+        fieldmappings.addFieldMap(fieldmap)
+    return fieldmappings
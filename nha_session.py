@@ -0,0 +1,132 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_session.py
+Purpose: Keeps one logged in GIS connection per portal for the NHA scripts and toolbox. Logins are cached until the
+token is close to expiring, so repeated tool runs in the same ArcGIS Pro session and scripts that switch between portals
+don't log in again. FeatureLayer objects are created on the cached connection so they share its HTTP connection pool,
+and every request made through a cached connection is counted and timed by endpoint.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - requests are also added to the running nha_trace step.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import time
+from urllib.parse import urlsplit
+import nha_trace
+
+# define the portals we log in to. Credentials are loaded from OS environment variables - these need to be setup in
+# your operating system environment variables. default_username is used if the username variable isn't set.
+portals = {
+    "wpc_gis": {"url": "https://gis.waterlandlife.org/portal",
+                "username_env": "wpc_portal_username",
+                "password_env": "wpc_gis_password",
+                "hosts": ["gis.waterlandlife.org"]},
+    "wpc_webgis": {"url": "https://webgis.waterlandlife.org/portal",
+                   "username_env": "wpc_webgis_username",
+                   "password_env": "wpc_gis_password",
+                   "hosts": ["webgis.waterlandlife.org"]},
+    "agol": {"url": "https://www.arcgis.com",
+             "username_env": "wpc_agol_username",
+             "default_username": "mmooreWPC",
+             "password_env": "wpc_gis_password",
+             "hosts": ["www.arcgis.com", "wpcgis.maps.arcgis.com", "services2.arcgis.com"]},
+}
+
+# portal tokens are good for 60 minutes by default - we log in again a little before that so a long step doesn't start
+# with a token that is about to expire
+token_minutes = 55
+
+# cached connections, feature layers, and request statistics. These live as long as the python session, which in
+# ArcGIS Pro is the whole Pro session.
+_sessions = {}
+_layers = {}
+_request_stats = {}
+
+
+# define function to record the time of a request to an endpoint. The request and its response size are also added to
+# the running nha_trace step.
+def record_request(url, seconds, size=0):
+    """Adds one request of the given duration to the statistics for the endpoint of url."""
+    parts = urlsplit(url)
+    endpoint = "{0}://{1}{2}".format(parts.scheme, parts.netloc, parts.path.rstrip("/"))
+    stats = _request_stats.setdefault(endpoint, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+    stats["count"] += 1
+    stats["seconds"] += seconds
+    stats["max_seconds"] = max(stats["max_seconds"], seconds)
+    nha_trace.add(requests=1, bytes=size)
+
+
+# define function to add a response hook to the requests session used by a GIS connection so that every request made
+# through it is recorded. The response size is taken from the Content-Length header so streamed downloads aren't read.
+def _add_request_hook(gis):
+    session = getattr(getattr(gis, "_con", None), "_session", None)
+    hooks = getattr(session, "hooks", None)
+    if isinstance(hooks, dict):
+        hooks.setdefault("response", []).append(
+            lambda response, *args, **kwargs: record_request(response.url, response.elapsed.total_seconds(),
+                                                             int(response.headers.get("Content-Length") or 0)))
+
+
+# define function to get the name of the portal that serves a url
+def portal_for_url(url):
+    """Returns the name of the portal in portals whose hosts include the host of url, or None."""
+    host = urlsplit(url).netloc.lower()
+    for name, portal in portals.items():
+        if host in portal["hosts"]:
+            return name
+    return None
+
+
+# define function to get a logged in GIS connection for a portal. The connection is reused until the token is close to
+# expiring. The returned connection is also made the active GIS, the same as logging in with GIS() would.
+def get_gis(name="wpc_gis"):
+    """Returns a cached, logged in arcgis GIS object for the named portal, logging in if needed."""
+    import arcgis
+    from arcgis.gis import GIS
+
+    session = _sessions.get(name)
+    if session is None or time.time() >= session["expires"]:
+        portal = portals[name]
+        username = os.environ.get(portal["username_env"]) or portal.get("default_username")
+        password = os.environ.get(portal["password_env"])
+        start = time.perf_counter()
+        gis = GIS(portal["url"], username, password)
+        record_request(portal["url"] + "/sharing/rest/generateToken", time.perf_counter() - start)
+        _add_request_hook(gis)
+        session = {"gis": gis, "expires": time.time() + token_minutes * 60}
+        _sessions[name] = session
+        # feature layers made on the old connection need to be remade on the new one
+        for url in [u for u, (n, _) in _layers.items() if n == name]:
+            del _layers[url]
+
+    arcgis.env.active_gis = session["gis"]
+    return session["gis"]
+
+
+# define function to get a FeatureLayer object on the cached connection for the portal that serves the url. If the url
+# isn't on one of our portals, the layer uses the active GIS.
+def feature_layer(url):
+    """Returns a cached arcgis FeatureLayer for url that shares its portal's connection."""
+    from arcgis.features import FeatureLayer
+
+    name = portal_for_url(url)
+    gis = get_gis(name) if name else None
+    cached = _layers.get(url)
+    if cached is None:
+        cached = (name, FeatureLayer(url, gis=gis))
+        _layers[url] = cached
+    return cached[1]
+
+
+# define function to report the request statistics collected so far
+def report_requests(log=print):
+    """Sends a summary of request counts and times per endpoint to log (print or arcpy.AddMessage)."""
+    if not _request_stats:
+        return
+    log("Requests by endpoint (count, total seconds, max seconds):")
+    for endpoint, stats in sorted(_request_stats.items(), key=lambda kv: kv[1]["seconds"], reverse=True):
+        log("{0}: {1}, {2:.2f}, {3:.2f}".format(endpoint, stats["count"], stats["seconds"], stats["max_seconds"]))
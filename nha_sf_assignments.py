@@ -0,0 +1,178 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_sf_assignments.py
+Purpose: Keeps a persisted table of which Biotics source features (SFs) fall within which NHAs for the visit statistics
+in the NHA prioritization. Each SF is represented by the label point of its geometry (a point inside polygons and on
+lines, like Feature To Point with INSIDE), and the table of SF points, SF to NHA assignments, and NHA drawn dates is
+kept in a store on disk. On each run only the SFs that were added or moved and the NHAs that were added, removed, or
+redrawn (a new drawn_date) are assigned again, and the SF geometries are only read when one of the source feature
+layers reports a new edit date. Routine prioritization runs read the NHA drawn dates and go straight to the table.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - layer urls come from the schema registry in nha_schema.py.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import time
+import arcpy
+import numpy as np
+import pandas as pd
+from nha_utils import where_in, load_watermarks, save_watermarks
+from nha_overlays import source_edit_date
+from nha_schema import url
+import nha_trace
+
+# Biotics source feature layers and the NHA core layer from the schema registry in nha_schema.py
+source_layers = {"point": url("eo_sourcept"), "line": url("eo_sourceln"), "polygon": url("eo_sourcepy")}
+nha_core = url("nha_core")
+
+# paths of the assignment store - the info file records the source layer edit dates and spatial reference the store
+# was built with
+store_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sf_assignment_store")
+store_path = os.path.join(store_dir, "sf_nha.npz")
+store_info_path = os.path.join(store_dir, "sf_nha.json")
+
+
+# define function to get the fixed numpy dtype SF_IDs are written with - integers if every SF_ID is a whole number
+# (including ids read from a cursor into an object column) and strings otherwise. Object arrays can't be written to the
+# store or to a feature class.
+def sf_id_dtype(sf_ids):
+    """Returns "i8" if sf_ids are all integers, otherwise "U64"."""
+    if pd.api.types.is_integer_dtype(sf_ids) or pd.api.types.infer_dtype(sf_ids, skipna=False) in ("integer", "empty"):
+        return "i8"
+    return "U64"
+
+
+# define function to read the label point of every SF in the source feature layers
+def read_sf_points(spatial_reference):
+    """Returns a dataframe of SF_ID, x, and y of the label point of every SF in spatial_reference."""
+    frames = []
+    for layer in source_layers.values():
+        with arcpy.da.SearchCursor(layer, ["SF_ID", "SHAPE@"], spatial_reference=spatial_reference) as cursor:
+            rows = [(sf_id, shape.labelPoint.X, shape.labelPoint.Y) for sf_id, shape in nha_trace.counted(cursor)
+                    if sf_id is not None and shape is not None]
+        frames.append(pd.DataFrame(rows, columns=["SF_ID", "x", "y"]))
+    return pd.concat(frames, ignore_index=True).drop_duplicates("SF_ID")
+
+
+# define function to read the drawn date of every NHA
+def read_nha_dates():
+    """Returns a dataframe of nha_join_id and drawn_date for every NHA."""
+    with arcpy.da.SearchCursor(nha_core, ["nha_join_id", "drawn_date"]) as cursor:
+        nhas = pd.DataFrame([row for row in nha_trace.counted(cursor)], columns=["nha_join_id", "drawn_date"])
+    nhas["drawn_date"] = pd.to_datetime(nhas["drawn_date"])
+    return nhas.dropna(subset=["nha_join_id"]).drop_duplicates("nha_join_id")
+
+
+# define function to find the NHAs that each SF point falls in with one spatial join. nha_join_ids limits the join to
+# a list of NHAs - all NHAs are used if it is None.
+def assign_points(points, spatial_reference, nha_join_ids=None):
+    """Returns a dataframe of SF_ID and nha_join_id for every SF point in points that is within an NHA."""
+    empty = pd.DataFrame({"SF_ID": pd.Series(dtype=points["SF_ID"].dtype), "nha_join_id": pd.Series(dtype=object)})
+    if points.empty or (nha_join_ids is not None and not nha_join_ids):
+        return empty
+    arr = np.array(list(zip(points["SF_ID"], points["x"], points["y"])),
+                   dtype=[("SF_ID", sf_id_dtype(points["SF_ID"])), ("x", "f8"), ("y", "f8")])
+    sf_points = os.path.join("memory", "sf_points")
+    if arcpy.Exists(sf_points):
+        arcpy.Delete_management(sf_points)
+    arcpy.da.NumPyArrayToFeatureClass(arr, sf_points, ("x", "y"), spatial_reference)
+
+    frames = []
+    for where_clause in ([None] if nha_join_ids is None else where_in("nha_join_id", nha_join_ids)):
+        nha_lyr = arcpy.MakeFeatureLayer_management(nha_core, "sf_assignment_nhas", where_clause)
+        with arcpy.EnvManager(overwriteOutput=True):
+            joined = nha_trace.call("SpatialJoin", arcpy.SpatialJoin_analysis, sf_points, nha_lyr,
+                                    os.path.join("memory", "sf_nha_join"), "JOIN_ONE_TO_MANY", "KEEP_COMMON",
+                                    match_option="INTERSECT")
+        with arcpy.da.SearchCursor(joined, ["SF_ID", "nha_join_id"]) as cursor:
+            frames.append(pd.DataFrame([row for row in cursor], columns=["SF_ID", "nha_join_id"]))
+        arcpy.Delete_management(nha_lyr)
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else empty
+
+
+# define function to load the store saved by the last run
+def load_store(path=None):
+    """Returns the SF points, assignments, and NHA drawn dates saved at path, or None if there isn't a store."""
+    path = path or store_path
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as saved:
+        points = pd.DataFrame({"SF_ID": saved["sf_id"], "x": saved["x"], "y": saved["y"]})
+        assignments = pd.DataFrame({"SF_ID": saved["assigned_sf_id"], "nha_join_id": saved["assigned_nha"].astype(object)})
+        nhas = pd.DataFrame({"nha_join_id": saved["nha_join_id"].astype(object),
+                             "drawn_date": pd.to_datetime(pd.Series(saved["drawn_date"]).replace("", None))})
+    return points, assignments, nhas
+
+
+# define function to save the store. The file is written to a temporary path and then swapped in, so a failure part way
+# through writing doesn't leave a broken store behind.
+def save_store(points, assignments, nhas, path=None):
+    """Writes the SF points, assignments, and NHA drawn dates to path."""
+    path = path or store_path
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    temp_path = path + ".tmp.npz"
+    drawn_dates = nhas["drawn_date"].dt.strftime("%Y-%m-%dT%H:%M:%S.%f").fillna("")
+    # SF_IDs are written with one fixed dtype so the store can be read back without pickling
+    sf_dtype = sf_id_dtype(pd.concat([points["SF_ID"], assignments["SF_ID"]], ignore_index=True))
+    np.savez_compressed(temp_path, sf_id=points["SF_ID"].to_numpy(dtype=sf_dtype), x=points["x"].to_numpy(),
+                        y=points["y"].to_numpy(), assigned_sf_id=assignments["SF_ID"].to_numpy(dtype=sf_dtype),
+                        assigned_nha=assignments["nha_join_id"].to_numpy(dtype=str),
+                        nha_join_id=nhas["nha_join_id"].to_numpy(dtype=str), drawn_date=drawn_dates.to_numpy(dtype=str))
+    os.replace(temp_path, path)
+
+
+# define function to bring the SF to NHA assignments up to date and return them. Set full_refresh to rebuild the whole
+# table.
+def update_assignments(full_refresh=False, log=print):
+    """Returns a dataframe of SF_ID and nha_join_id for every SF within an NHA, and the NHA drawn dates."""
+    spatial_reference = arcpy.Describe(nha_core).spatialReference
+    info = load_watermarks(store_info_path)
+    edit_dates = {name: source_edit_date(layer) for name, layer in source_layers.items()}
+    nhas = read_nha_dates()
+    stored = None if full_refresh or info.get("spatial_reference") != spatial_reference.factoryCode else load_store()
+
+    if stored is None:
+        log("Building the SF to NHA assignment table")
+        points = read_sf_points(spatial_reference)
+        assignments = assign_points(points, spatial_reference)
+    else:
+        points, assignments, stored_nhas = stored
+
+        # SFs that were added, moved, or removed - the SF geometries are only read if a source layer has been edited
+        changed_sfs, removed_sfs = set(), set()
+        if None in edit_dates.values() or edit_dates != info.get("edit_dates"):
+            current = read_sf_points(spatial_reference)
+            compare = current.merge(points, on="SF_ID", how="left", suffixes=("", "_stored"))
+            moved = compare["x_stored"].isna() | (compare["x"] != compare["x_stored"]) | (compare["y"] != compare["y_stored"])
+            changed_sfs = set(compare.loc[moved, "SF_ID"])
+            removed_sfs = set(points["SF_ID"]) - set(current["SF_ID"])
+            points = current
+
+        # NHAs that were added, removed, or redrawn since the last run
+        compare = nhas.merge(stored_nhas, on="nha_join_id", how="outer", suffixes=("", "_stored"), indicator=True)
+        redrawn = (compare["_merge"] != "both") | ~((compare["drawn_date"] == compare["drawn_date_stored"]) |
+                                                   (compare["drawn_date"].isna() & compare["drawn_date_stored"].isna()))
+        changed_nhas = set(compare.loc[redrawn & (compare["_merge"] != "right_only"), "nha_join_id"])
+        removed_nhas = set(compare.loc[compare["_merge"] == "right_only", "nha_join_id"])
+        log("Updating SF to NHA assignments for {0} changed SFs and {1} changed NHAs".format(
+            len(changed_sfs) + len(removed_sfs), len(changed_nhas) + len(removed_nhas)))
+
+        # drop the assignments of changed SFs and NHAs and assign them again
+        keep = ~(assignments["SF_ID"].isin(changed_sfs | removed_sfs) |
+                 assignments["nha_join_id"].isin(changed_nhas | removed_nhas))
+        assignments = pd.concat([assignments[keep],
+                                 assign_points(points[points["SF_ID"].isin(changed_sfs)], spatial_reference),
+                                 assign_points(points, spatial_reference, sorted(changed_nhas))], ignore_index=True)
+    assignments = assignments.drop_duplicates().reset_index(drop=True)
+
+    save_store(points, assignments, nhas)
+    save_watermarks(store_info_path, {"edit_dates": edit_dates, "spatial_reference": spatial_reference.factoryCode,
+                                      "built": time.time()})
+    nha_trace.add(rows=len(assignments))
+    return assignments, nhas
@@ -0,0 +1,177 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_static_export.py
+Purpose: Writes a static copy of the public NHA dataset for partners and caches to serve without querying the public
+feature service. It is run by NHA_Public_Update.py from the same prepared NHA and SUSN polygons, site accounts, and
+(masked) species records that are loaded into the public feature service. For each layer the export writes:
+ - GeoJSON (WGS84) with the latest site account and the list of public species of each NHA as properties
+ - FlatGeobuf with a packed spatial index (if GDAL is available in the python environment)
+ - a vector tile package of the NHA and SUSN polygons (if a tile project is set below)
+Features are written in Peano curve order so features that are near each other are near each other in the files.
+Everything is written to a staging folder first and then swapped into the output folder one file at a time with a
+manifest written last, so readers never see a half written file.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import json
+import time
+import shutil
+import datetime
+import arcpy
+import numpy as np
+import pandas as pd
+import nha_trace
+
+# site account fields joined to the NHA and SUSN polygons
+site_account_fields = ["site_desc", "tr_summary", "written_date"]
+
+# ArcGIS Pro project and map used to build the vector tile package. The map needs a layer named for each exported
+# layer (such as "nha_public") with the symbology for the tiles - the layers are pointed at the staged polygons before
+# the package is built. Leave tile_project as None to skip the vector tiles.
+tile_project = None
+tile_map = "NHA Public Tiles"
+
+
+# define function to convert a dataframe to a list of dictionaries of plain python values that can be written to JSON
+def _records(df):
+    """Returns the rows of df as dictionaries with nulls as None and numpy values as python values."""
+    df = df.astype(object).where(pd.notna(df), None)
+    return [{k: v.item() if isinstance(v, np.generic) else v for k, v in row.items()}
+            for row in df.to_dict("records")]
+
+
+# define function to write text to a file in one step - the file is written to a temporary path and then swapped in
+def _write_text(path, text):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+# define function to stage a layer in the staging geodatabase in Peano curve order with its site account attributes
+# and number of public species joined
+def stage_layer(features, stage_gdb, name, site_accounts, species_counts):
+    """Writes features to stage_gdb in spatial order with site account fields and species_count added."""
+    staged = os.path.join(stage_gdb, name)
+    nha_trace.call("Sort", arcpy.Sort_management, features, staged, [["Shape", "ASCENDING"]], "PEANO")
+    accounts = {row["nha_join_id"]: row for row in _records(site_accounts)}
+    for field in site_account_fields:
+        if field == "written_date":
+            arcpy.AddField_management(staged, field, "DOUBLE")
+        else:
+            lengths = site_accounts[field].dropna().astype(str).str.len()
+            length = max(255, int(lengths.max()) if len(lengths) else 0)
+            arcpy.AddField_management(staged, field, "TEXT", field_length=length)
+    arcpy.AddField_management(staged, "species_count", "LONG")
+    with arcpy.da.UpdateCursor(staged, ["nha_join_id", "species_count"] + site_account_fields) as cursor:
+        for row in cursor:
+            account = accounts.get(row[0], {})
+            cursor.updateRow([row[0], species_counts.get(row[0], 0)] + [account.get(f) for f in site_account_fields])
+    return staged
+
+
+# define function to write a staged layer to GeoJSON in WGS84 with the species of each NHA as a list of records
+def write_geojson(staged, path, species_by_nha):
+    """Writes staged to a GeoJSON file at path and returns the number of features written."""
+    fields = [f.name for f in arcpy.ListFields(staged)
+              if f.type not in ("OID", "Geometry", "GlobalID", "Blob", "Raster")
+              and f.name.lower() not in ("shape_length", "shape_area")]
+    features = []
+    with arcpy.da.SearchCursor(staged, fields + ["SHAPE@"], spatial_reference=arcpy.SpatialReference(4326)) as cursor:
+        for row in nha_trace.counted(cursor):
+            properties = dict(zip(fields, row[:-1]))
+            properties["species"] = species_by_nha.get(properties.get("nha_join_id"), [])
+            geometry = row[-1].__geo_interface__ if row[-1] is not None else None
+            features.append({"type": "Feature", "properties": properties, "geometry": geometry})
+    _write_text(path, json.dumps({"type": "FeatureCollection", "name": os.path.splitext(os.path.basename(path))[0],
+                                  "features": features}, default=str))
+    return len(features)
+
+
+# define function to convert a GeoJSON file to FlatGeobuf with a packed spatial index. GDAL isn't part of every ArcGIS
+# Pro python environment, so this is skipped if it isn't installed.
+def write_flatgeobuf(geojson_path, path, log=print):
+    """Writes a FlatGeobuf copy of a GeoJSON file and returns True, or returns False if GDAL isn't available."""
+    try:
+        from osgeo import gdal
+    except ImportError:
+        log("GDAL is not installed in this python environment - skipping FlatGeobuf export")
+        return False
+    gdal.UseExceptions()
+    gdal.VectorTranslate(path, geojson_path, format="FlatGeobuf", layerCreationOptions=["SPATIAL_INDEX=YES"])
+    return True
+
+
+# define function to build a vector tile package of the staged layers from the tile project map
+def write_vector_tiles(staged_layers, stage_gdb, path, log=print):
+    """Writes a vector tile package of the staged layers and returns True, or False if no tile project is set."""
+    if not tile_project:
+        log("No tile project is set in nha_static_export.py - skipping vector tiles")
+        return False
+    aprx = arcpy.mp.ArcGISProject(tile_project)
+    tile_maps = aprx.listMaps(tile_map)
+    if not tile_maps:
+        raise ValueError("Map {0} was not found in {1}".format(tile_map, tile_project))
+    for layer in tile_maps[0].listLayers():
+        if layer.name in staged_layers:
+            layer.updateConnectionProperties(layer.connectionProperties,
+                                             {"dataset": layer.name, "workspace_factory": "File Geodatabase",
+                                              "connection_info": {"database": stage_gdb}})
+    nha_trace.call("CreateVectorTilePackage", arcpy.CreateVectorTilePackage_management, tile_maps[0], path, "ONLINE",
+                   "", "INDEXED")
+    return True
+
+
+# define function to write the static export of the public layers
+def export_static_public(features, site_accounts, species, out_dir, log=print):
+    """
+    Writes GeoJSON, FlatGeobuf, and vector tiles of the public layers to out_dir and returns the manifest.
+    features - dictionary of output name: feature class of prepared polygons with an nha_join_id field
+    site_accounts - dataframe of the latest site account of each NHA (nha_join_id and site_account_fields)
+    species - dataframe of the public (masked) species records with an nha_join_id field
+    """
+    start = time.perf_counter()
+    stage_dir = os.path.join(out_dir, ".staging")
+    if os.path.isdir(stage_dir):
+        shutil.rmtree(stage_dir)
+    os.makedirs(stage_dir)
+    stage_gdb = arcpy.CreateFileGDB_management(stage_dir, "static_export.gdb")[0]
+
+    species_by_nha = {}
+    for record in _records(species):
+        species_by_nha.setdefault(record["nha_join_id"], []).append(
+            {k: v for k, v in record.items() if k != "nha_join_id"})
+    species_counts = {nha: len(records) for nha, records in species_by_nha.items()}
+
+    # write every file to the staging folder first
+    files = {}
+    staged_layers = {}
+    for name, fc in features.items():
+        with nha_trace.step("static " + name):
+            staged_layers[name] = stage_layer(fc, stage_gdb, name, site_accounts, species_counts)
+            geojson_path = os.path.join(stage_dir, name + ".geojson")
+            count = write_geojson(staged_layers[name], geojson_path, species_by_nha)
+            files[name + ".geojson"] = count
+            if write_flatgeobuf(geojson_path, os.path.join(stage_dir, name + ".fgb"), log):
+                files[name + ".fgb"] = count
+    with nha_trace.step("static vector tiles"):
+        if write_vector_tiles(staged_layers, stage_gdb, os.path.join(stage_dir, "nha_public.vtpk"), log):
+            files["nha_public.vtpk"] = sum(files[name + ".geojson"] for name in features)
+
+    # swap the files into the output folder and write the manifest last
+    manifest = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "files": []}
+    for file_name, count in files.items():
+        path = os.path.join(out_dir, file_name)
+        os.replace(os.path.join(stage_dir, file_name), path)
+        manifest["files"].append({"file": file_name, "features": count, "bytes": os.path.getsize(path)})
+    manifest["seconds"] = round(time.perf_counter() - start, 2)
+    _write_text(os.path.join(out_dir, "manifest.json"), json.dumps(manifest, indent=2))
+    arcpy.Delete_management(stage_gdb)
+    shutil.rmtree(stage_dir, ignore_errors=True)
+    log("Static export of " + ", ".join(features) + " written to " + out_dir)
+    return manifest
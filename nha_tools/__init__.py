@@ -0,0 +1,11 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_tools
+Purpose: Code for the tools in NHA_ArcGIS_Tools_v4.pyt. The .pyt only holds tool definitions and parameters - each
+tool's execute imports its module from this package when the tool runs, so opening the toolbox doesn't import arcgis,
+pandas, or any other tool dependencies.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
@@ -0,0 +1,112 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: common.py
+Purpose: Functions used by the NHA tools in the nha_tools package.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - added fill_species_urls for filling species account urls in one pass over the species list.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import nha_trace
+
+
+def element_type(elcode):
+    """Takes ELCODE as input and returns NHA element type code."""
+    if elcode.startswith('AAAA'):
+        et = 'Salamander'
+    elif elcode.startswith('AAAB'):
+        et = 'Frog'
+    elif elcode.startswith('AB'):
+        et = 'Bird'
+    elif elcode.startswith('AF'):
+        et = 'Fish'
+    elif elcode.startswith('AM'):
+        et = 'Mammal'
+    elif elcode.startswith('AR'):
+        et = 'Reptile'
+    elif elcode.startswith('C') or elcode.startswith('H'):
+        et = 'Community'
+    elif elcode.startswith('ICMAL'):
+        et = 'Invertebrate - Crayfishes'
+    elif elcode.startswith('ILARA'):
+        et = 'Invertebrate - Spiders'
+    elif elcode.startswith('IZSPN'):
+        et = 'Invertebrate - Sponges'
+    elif elcode.startswith('IICOL02'):
+        et = 'Invertebrate - Tiger Beetles'
+    elif elcode.startswith('IICOL'):
+        et = 'Invertebrate - Other Beetles'
+    elif elcode.startswith('IIEPH'):
+        et = 'Invertebrate - Mayflies'
+    elif elcode.startswith('IIHYM'):
+        et = 'Invertebrate - Bees'
+    elif elcode.startswith('IILEP'):
+        et = 'Invertebrate - Butterflies and Skippers'
+    elif elcode.startswith('IILEY') or elcode.startswith('IILEW') or elcode.startswith('IILEV') or elcode.startswith('IILEU'):
+        et = 'Invertebrate - Moths'
+    elif elcode.startswith('IIODO'):
+        et = 'Invertebrate - Dragonflies and Damselflies'
+    elif elcode.startswith('IIORT'):
+        et = 'Invertebrate - Grasshoppers'
+    elif elcode.startswith('IIPLE'):
+        et = 'Invertebrate - Stoneflies'
+    elif elcode.startswith('IITRI'):
+        et = 'Invertebrate - Caddisflies'
+    elif elcode.startswith('IMBIV'):
+        et = 'Invertebrate - Mussels'
+    elif elcode.startswith('IMGAS'):
+        et = 'Invertebrate - Gastropods'
+    elif elcode.startswith('I'):
+        et = 'Invertebrate - Other'
+    elif elcode.startswith('N'):
+        et = 'Nonvascular Plant'
+    elif elcode.startswith('P'):
+        et = 'Vascular Plant'
+    else:
+        arcpy.AddMessage("Could not determine element type")
+        et = None
+    return et
+
+# define function to update related global id field based on some other id field.
+def update_rel_guid(parent_feature, primary_key, child_feature, foreign_key, related_guid, where_clause=None):
+    related_dict = {row[0]: row[1] for row in arcpy.da.SearchCursor(parent_feature, [primary_key, "GlobalID"]) if
+                    row[0] is not None}
+    with arcpy.da.UpdateCursor(child_feature, [foreign_key, related_guid], where_clause) as cursor:
+        for row in cursor:
+            if row[0] in related_dict:
+                row[1] = related_dict[row[0]]
+                cursor.updateRow(row)
+
+# define function to fill species account urls in the NHA species list from the species url reference layer. The urls
+# are read once into a dictionary of ELSUBID: url and only rows whose url changes are written. where_clauses is an
+# optional list of where clauses (such as the output of where_in) used to limit the species rows that are checked. If
+# only_missing is True, only rows without a url are filled - otherwise urls that have changed are replaced too.
+def fill_species_urls(nha_species, species_urls, where_clauses=None, only_missing=True):
+    """Fills species_url in nha_species from the ELSUBID: url lookup in species_urls and returns the rows updated."""
+    with nha_trace.step("species urls"), \
+            arcpy.da.SearchCursor(species_urls, ["element_su", "url"], "element_su IS NOT NULL AND url IS NOT NULL") as cursor:
+        url_dict = {row[0]: row[1] for row in nha_trace.counted(cursor)}
+
+    updated = 0
+    with nha_trace.step("fill species urls"):
+        for where_clause in ([None] if where_clauses is None else where_clauses):
+            if only_missing:
+                where_clause = "species_url IS NULL" if where_clause is None else \
+                    "({0}) AND species_url IS NULL".format(where_clause)
+            with arcpy.da.UpdateCursor(nha_species, ["ELSUBID", "species_url"], where_clause) as cursor:
+                for row in cursor:
+                    url = url_dict.get(row[0])
+                    if url is not None and url != row[1]:
+                        cursor.updateRow([row[0], url])
+                        updated += 1
+        nha_trace.add(rows=updated)
+    return updated
+
+# define function to generate list of values with incremental indexes for given length
+def generate_list(start_value, string, string2, length):
+    return [f"{string}{i}{string2}" for i in range(start_value, start_value + length)]
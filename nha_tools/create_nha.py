@@ -0,0 +1,112 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: create_nha.py
+Purpose: Creates the core NHA from selected CPPs and fills initial attributes for the NHA. Run by the
+"1 Create New NHA" tool in NHA_ArcGIS_Tools_v4.pyt.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import os
+import sys
+import datetime
+from getpass import getuser
+from nha_trace import traced_tool
+import nha_schema
+
+# define function to run the "1 Create New NHA" tool with the tool parameters
+@traced_tool("1 Create New NHA", arcpy.AddMessage)
+def execute(params, messages):
+
+    site_name = params[0].valueAsText
+    site_desc = params[1].valueAsText
+    source_report = params[2].valueAsText
+    cpp_core = params[3].valueAsText
+
+    nha_core = nha_schema.url("nha_core")
+
+    # check to see if there is a selection on CPPs. If there isn't, error out
+    desc = arcpy.Describe(cpp_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No CPP Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # add reporting about whether NHA site name is a duplicate and error out if site name is already present in the gdb
+    arcpy.AddMessage("............")
+    nha_site_names = sorted({row[0] for row in arcpy.da.SearchCursor(nha_core,"SITE_NAME") if row[0] is not None})
+    if not site_name in nha_site_names:
+        arcpy.AddMessage("There are no existing NHAs with the same site name: "+site_name)
+    else:
+        arcpy.AddWarning("The NHA site name you have entered is not unique. Please enter a unique site name and try again.")
+        sys.exit()
+
+
+    arcpy.AddMessage("............")
+    # create list of eo ids for all selected CPPs that are current or approved
+    with arcpy.da.SearchCursor(cpp_core,["EO_ID","Status"]) as cursor:
+        eoids = sorted({row[0] for row in cursor if row[1] != "n"})
+    # create list of eo ids for all selected CPPs that are not approved
+    with arcpy.da.SearchCursor(cpp_core,["EO_ID","Status"]) as cursor:
+        excluded_eoids = sorted({row[0]for row in cursor if row[1] == "n"})
+
+    # add reporting messages about which CPPs are being excluded
+    if excluded_eoids:
+        arcpy.AddMessage("Selected CPPs with the following EO IDs are being excluded because they were marked as not approved: "+ ','.join([str(x) for x in excluded_eoids]))
+    else:
+        pass
+
+    # add reporting messages about which CPPs are being included and exit with message if no selected CPPs are current or approved.
+    if len(eoids) != 0:
+        arcpy.AddMessage("Selected CPPs with the following EO IDs are being used to create this NHA: "+','.join([str(x) for x in eoids]))
+        arcpy.AddMessage("............")
+    else:
+        arcpy.AddWarning("Your CPP selection does not include any current or approved CPPs and we cannot proceed. Goodbye.")
+        sys.exit()
+
+    # create sql query based on number of CPPs included in query.
+    if len(eoids) > 1:
+        sql_query = '"EO_ID" in {}'.format(tuple(eoids))
+    else:
+        sql_query = '"EO_ID" = {}'.format(eoids[0])
+
+    arcpy.AddMessage("Creating and attributing NHA core for site: "+ site_name)
+    arcpy.AddMessage("............")
+    # create cpp_core layer from selected CPPs marked as current or approved and dissolve to create temporary nha geometry
+    cpp_core_lyr = arcpy.MakeFeatureLayer_management(cpp_core, "cpp_core_lyr", sql_query)
+    temp_nha = arcpy.Dissolve_management(cpp_core_lyr, os.path.join("memory","temp_nha"))
+
+    # get geometry token from nha
+    with arcpy.da.SearchCursor(temp_nha,"SHAPE@") as cursor:
+        for row in cursor:
+            geom = row[0]
+
+    # calculate NHA_JOIN_ID which includes network username and the next highest tiebreaker for that username padded to 6 places
+    username = getuser().lower()
+    where = '"nha_join_id" LIKE'+"'%{0}%'".format(username)
+    with arcpy.da.SearchCursor(nha_core, 'nha_join_id', where_clause = where) as cursor:
+        join_ids = sorted({row[0] for row in cursor})
+    if len(join_ids) == 0:
+        nha_join_id = username + '000001'
+    else:
+        t = join_ids[-1]
+        tiebreak = str(int(t[-6:])+1).zfill(6)
+        nha_join_id = username + tiebreak
+
+    # test for unsaved edits - alert user to unsaved edits and end script
+    try:
+        # insert new NHA Core record
+        values = [site_name,"curr",site_desc,"rev",datetime.date.today(),username,datetime.date.today(),source_report,nha_join_id,geom]
+        fields = ["site_name","site_type","desc_","status","status_change_date","drawn_user","drawn_date","source_report","nha_join_id","SHAPE@"]
+        with arcpy.da.InsertCursor(nha_core,fields) as cursor:
+            cursor.insertRow(values)
+    except RuntimeError:
+        arcpy.AddWarning("You have unsaved edits in your NHA layer. Please save or discard edits and try again.")
+        sys.exit()
@@ -0,0 +1,86 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: fill_attributes.py
+Purpose: Fills the political boundaries and protected lands tables for selected NHAs. Run by the "4 Fill Related
+Attribute Tables" tool in NHA_ArcGIS_Tools_v4.pyt.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import sys
+from nha_utils import where_in, delete_by_key, batch_insert
+from nha_overlays import municipality_overlaps, parcel_overlaps
+from nha_tools.common import update_rel_guid
+from nha_trace import traced_tool
+import nha_schema
+
+# define function to run the "4 Fill Related Attribute Tables" tool with the tool parameters
+@traced_tool("4 Fill Related Attribute Tables", arcpy.AddMessage)
+def execute(params, messages):
+
+    nha_core = params[0].valueAsText
+
+    # define paths
+    prot_lands_tbl = nha_schema.url("nha_protected_lands")
+    boundaries_tbl = nha_schema.url("nha_boundaries")
+
+    # check for selection on nha core layer and exit if there is no selection
+    desc = arcpy.Describe(nha_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No NHA Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # create list of NHA Join IDs for selected NHA cores
+    with arcpy.da.SearchCursor(nha_core,["NHA_JOIN_ID"]) as cursor:
+        nha_selected = sorted({row[0] for row in cursor})
+    arcpy.AddMessage("Attributing " + str(len(nha_selected)) + " NHA Cores")
+
+    # get the municipalities and protected lands that overlap all selected NHA cores at once from the local copies in
+    # the overlay store instead of selecting and intersecting the remote services once per NHA
+    muni_overlaps = municipality_overlaps(nha_core, "NHA_JOIN_ID", arcpy.AddMessage)
+    prot_overlaps = parcel_overlaps(nha_core, "NHA_JOIN_ID", arcpy.AddMessage)
+
+    # delete previous records in boundaries and protected lands tables for the selected NHA Join IDs
+    delete_by_key(boundaries_tbl, "nha_join_id", nha_selected)
+    delete_by_key(prot_lands_tbl, "nha_join_id", nha_selected)
+
+    # build boundaries and protected lands rows for each selected nha
+    MuniInsert = []
+    ProtInsert = []
+    for nha in nha_selected:
+        arcpy.AddMessage("Attributing NHA Core: "+nha)
+        arcpy.AddMessage("......")
+        # attribute the counties and municipalities based on those that intersect the nha
+        arcpy.AddMessage(nha + " Boundaries: ")
+        for row in muni_overlaps.get(nha, []):
+            values = tuple([row[0].title(),row[1].title(),nha])
+            arcpy.AddMessage(values)
+            MuniInsert.append(values)
+        arcpy.AddMessage("......")
+
+        # name and percent overlap of protected lands
+        arcpy.AddMessage(nha+ " Protected Lands: ")
+        if nha in prot_overlaps:
+            for row in prot_overlaps[nha]:
+                values = tuple([row[0],row[1],round(row[2],2),nha])
+                arcpy.AddMessage(values)
+                ProtInsert.append(values)
+        else:
+            arcpy.AddMessage("No protected lands overlap the NHA core.")
+        arcpy.AddMessage("#########################################################")
+        arcpy.AddMessage("#########################################################")
+
+    # insert all rows with one cursor per table and fill related globalid fields to establish official relationship
+    batch_insert(boundaries_tbl, ["county","municipality","nha_join_id"], MuniInsert)
+    batch_insert(prot_lands_tbl, ["protected_land","owner","type","nha_join_id"], ProtInsert)
+    for where_clause in where_in("nha_join_id", nha_selected):
+        update_rel_guid(nha_core, "nha_join_id", boundaries_tbl, "nha_join_id", "nha_rel_GUID", where_clause)
+        update_rel_guid(nha_core, "nha_join_id", prot_lands_tbl, "nha_join_id", "nha_rel_GUID", where_clause)
@@ -0,0 +1,139 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: modify_nha.py
+Purpose: Archives the previous boundary, modifies the boundary of a selected NHA with selected CPP cores, and
+updates the current drawn notes. Run by the "2 Modify Existing NHA" tool in NHA_ArcGIS_Tools_v4.pyt.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import os
+import sys
+import datetime
+from getpass import getuser
+from nha_trace import traced_tool
+import nha_schema
+
+# define function to run the "2 Modify Existing NHA" tool with the tool parameters
+@traced_tool("2 Modify Existing NHA", arcpy.AddMessage)
+def execute(params, messages):
+
+    nha_cores = params[0].valueAsText
+    cpp_core = params[1].valueAsText
+    site_desc = params[2].valueAsText
+    source_report = params[3].valueAsText
+
+    # NHA archive layer
+    nha_archive = nha_schema.url("nha_archive")
+
+    # check for selection on nha core layer and exit if there is no selection or if more than 1 NHA is selected
+    desc = arcpy.Describe(nha_cores)
+    if desc.FIDSet == '':
+        arcpy.AddError("No NHAs are selected. Please make a selection and try again.")
+        sys.exit()
+    if len((desc.FIDSet).split(';')) > 1:
+        arcpy.AddError("More than one NHAs are selected. Please select only the NHA you wish to modify and try again.")
+        sys.exit()
+    else:
+        pass
+
+    # check for selection on cpp layer and exit if there is no selection
+    desc = arcpy.Describe(cpp_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No CPP Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # first we are going to archive the NHA
+    archive_fields = ["site_name","site_type","desc_","status","status_change_date","status_change_reason","drawn_user",
+                      "drawn_date","drawn_notes","review_user","review_date","review_notes","sig_rank","sig_rank_comm",
+                      "project","source_report","site_pdf_link","wpc_blueprint","nha_join_id","SHAPE@"]
+    #archive_rows = tuple(generate_list(0,"row[","]",len(archive_fields)))
+    # get current NHA and insert it into the archive NHA layer
+    with arcpy.da.SearchCursor(nha_cores,archive_fields) as cursor:
+        for row in cursor:
+            site_name = row[archive_fields.index("site_name")]
+            nha_join_id = row[archive_fields.index("nha_join_id")]
+            values = [row[0],row[1],row[2],row[3],row[4],row[5],row[6],row[7],row[8],row[9],row[10],row[11],row[12],
+                      row[13],row[14],row[15],row[16],row[17],row[18],row[19]]
+    with arcpy.da.InsertCursor(nha_archive,archive_fields) as cursor:
+        cursor.insertRow(values)
+
+    arcpy.AddMessage("............")
+    # create list of eo ids for all selected CPPs that are current or approved
+    with arcpy.da.SearchCursor(cpp_core,["EO_ID","Status"]) as cursor:
+        eoids = sorted({row[0] for row in cursor if row[1] != "n"})
+    # create list of eo ids for all selected CPPs that are not approved
+    with arcpy.da.SearchCursor(cpp_core,["EO_ID","Status"]) as cursor:
+        excluded_eoids = sorted({row[0]for row in cursor if row[1] == "n"})
+
+    # add reporting messages about which CPPs are being excluded
+    if excluded_eoids:
+        arcpy.AddMessage("Selected CPPs with the following EO IDs are being excluded because they were marked as not approved: "+ ','.join([str(x) for x in excluded_eoids]))
+    else:
+        pass
+
+    # add reporting messages about which CPPs are being included and exit with message if no selected CPPs are current or approved.
+    if len(eoids) != 0:
+        arcpy.AddMessage("Selected CPPs with the following EO IDs are being used to modify the geometry this NHA: "+','.join([str(x) for x in eoids]))
+        arcpy.AddMessage("............")
+    else:
+        arcpy.AddWarning("Your CPP selection does not include any current or approved CPPs and we cannot proceed. Goodbye.")
+        sys.exit()
+
+    # create sql query based on number of CPPs included in query.
+    if len(eoids) > 1:
+        sql_query = '"EO_ID" in {}'.format(tuple(eoids))
+    else:
+        sql_query = '"EO_ID" = {}'.format(eoids[0])
+
+    arcpy.AddMessage("Modifying and attributing the NHA core for site: "+ site_name)
+    arcpy.AddMessage("............")
+    # create cpp_core layer from selected CPPs marked as current or approved and dissolve to create temporary nha geometry
+    cpp_core_lyr = arcpy.MakeFeatureLayer_management(cpp_core, "cpp_core_lyr", sql_query)
+    temp_nha = arcpy.Dissolve_management(cpp_core_lyr, os.path.join("memory","temp_nha"))
+
+    # get geometry token from nha
+    with arcpy.da.SearchCursor(temp_nha,"SHAPE@") as cursor:
+        for row in cursor:
+            geom = row[0]
+
+    # get username to fill drawn_user attribute
+    username = getuser().lower()
+
+    # test for unsaved edits - alert user to unsaved edits and end script
+    try:
+        # open editing session and update NHA Core record
+        fields = ["status","status_change_date","drawn_user","drawn_date","SHAPE@"]
+        if site_desc:
+            fields = fields + ["desc_"]
+        if source_report:
+            fields = fields + ["source_report"]
+        with arcpy.da.UpdateCursor(nha_cores,fields,where_clause="nha_join_id='{0}'".format(nha_join_id)) as cursor:
+            for row in cursor:
+                row[0] = "rev"
+                row[1] = datetime.date.today()
+                row[2] = username
+                row[3] = datetime.date.today()
+                row[4] = geom
+                if site_desc:
+                    row[5] = site_desc
+                    cursor.updateRow(row)
+                if source_report and site_desc:
+                    row[6] = source_report
+                    cursor.updateRow(row)
+                elif source_report and not site_desc:
+                    row[5] = source_report
+                    cursor.updateRow(row)
+                cursor.updateRow(row)
+
+    except RuntimeError:
+        arcpy.AddWarning("You have unsaved edits in your NHA layer. Please save or discard edits and try again.")
+        sys.exit()
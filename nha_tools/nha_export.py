@@ -0,0 +1,308 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_export.py
+Purpose: Runs the "Export NHAs to File Geodatabase" tool in NHA_ArcGIS_Tools_v4.pyt. The qualifying NHA cores and species records
+are read from the NHA services once and staged in a scratch file geodatabase. Packages (one for the whole selection or
+one per county, project, or other partition) are then written from the staged copy in parallel worker processes as a
+file geodatabase, GeoPackage, or GeoParquet, and a manifest with row counts and timings for each package is written
+next to the packages.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - moved into the nha_tools package along with the tool's execute code.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+10/19/2026 - service urls and field mappings come from the schema registry in nha_schema.py, and required fields are
+checked before anything is copied.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import re
+import sys
+import json
+import time
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import arcpy
+from nha_utils import where_in, sensitive_eo_ids, mask_table_eos, sensitive_flag_fields
+from nha_schema import url, validate, field_mappings
+from nha_trace import traced_tool
+
+# output formats offered by the export tool
+output_formats = ["File Geodatabase", "GeoPackage", "GeoParquet"]
+
+# default number of worker processes used to write packages
+export_workers = 4
+
+# fields kept in the exported NHA cores and species table
+core_fields = ["site_name", "desc_", "sig_rank", "site_pdf_link", "nha_join_id"]
+species_fields = ["EO_ID", "SNAME", "SCOMNAME", "LASTOBS_YR", "SURVEY_YR", "GRANK", "SRANK", "SPROT", "USESA",
+                  "PBSSTATUS", "nha_join_id"]
+
+# values written to the species table for sensitive species when masking is chosen
+masked_values = {"EO_ID": None, "SNAME": "SENSITIVE SPECIES", "SCOMNAME": "SENSITIVE SPECIES", "LASTOBS_YR": None,
+                 "SURVEY_YR": None, "GRANK": None, "SRANK": None, "SPROT": None, "USESA": None, "PBSSTATUS": None}
+
+
+# define function to build one where clause for a list of NHA Join IDs
+def nha_where(nha_ids):
+    """Returns a where clause selecting all nha_ids, or a clause that selects nothing if there are none."""
+    clauses = where_in("nha_join_id", nha_ids)
+    return " OR ".join("({0})".format(c) for c in clauses) if clauses else "1=0"
+
+
+# define function to build the where clause for the exported species records of a list of NHA Join IDs. The NHA clause
+# is grouped first - it is an OR of chunks, and AND binds tighter than OR.
+def species_where(nha_ids):
+    """Returns a where clause selecting the species records of nha_ids that aren't excluded."""
+    return "({0}) AND exclude = 'N'".format(nha_where(nha_ids))
+
+
+# define function to turn a partition value into something that can be used in a file name
+def package_name(value):
+    """Returns value with anything other than letters, numbers, and underscores replaced by underscores."""
+    return re.sub(r"[^A-Za-z0-9_]+", "_", str(value)).strip("_") or "blank"
+
+
+# define function to stage the qualifying NHA cores and species records in a scratch file geodatabase. This is the only
+# step that reads the NHA services - every package is written from the staged copy.
+def stage_source(nha_core, nha_ids, species_url, eo_url, include_species, mask_species, log=print):
+    """Copies NHA cores (and the species table, masked if requested) for nha_ids into a scratch gdb and returns it."""
+    stage_gdb = os.path.join(arcpy.env.scratchFolder, "nha_export_stage.gdb")
+    if arcpy.Exists(stage_gdb):
+        arcpy.Delete_management(stage_gdb)
+    arcpy.CreateFileGDB_management(os.path.dirname(stage_gdb), os.path.basename(stage_gdb))
+
+    where_clause = nha_where(nha_ids)
+    core = arcpy.FeatureClassToFeatureClass_conversion(nha_core, stage_gdb, "NHA_Core", where_clause,
+                                                       field_mappings(nha_core, core_fields + ["site_type"]))
+    # historic NHAs get an H significance rank
+    with arcpy.da.UpdateCursor(core, ["site_type", "sig_rank"]) as cursor:
+        for row in cursor:
+            if row[0] == "hist":
+                row[1] = "H"
+                cursor.updateRow(row)
+    arcpy.DeleteField_management(core, "site_type")
+
+    if include_species:
+        species_table = arcpy.TableToTable_conversion(species_url, stage_gdb, "SpeciesTable",
+                                                      species_where(nha_ids),
+                                                      field_mappings(species_url, species_fields))
+        if mask_species:
+            # only the EOs in the exported species table are checked for sensitivity
+            with arcpy.da.SearchCursor(species_table, ["EO_ID"]) as cursor:
+                export_eos = {row[0] for row in cursor if row[0] is not None}
+            masked = mask_table_eos(species_table, sensitive_eo_ids(eo_url, export_eos), masked_values)
+            log("Masked " + str(masked) + " sensitive species records")
+        arcpy.JoinField_management(species_table, "nha_join_id", core, "nha_join_id", ["site_name"])
+    return stage_gdb
+
+
+# define function to split NHAs into packages by the values of a field in the NHA core layer
+def partition_by_field(nha_core, field, nha_ids):
+    """Returns a dictionary of package name: list of NHA Join IDs grouped by the value of field."""
+    nha_ids = set(nha_ids)
+    packages = {}
+    with arcpy.da.SearchCursor(nha_core, ["nha_join_id", field]) as cursor:
+        for row in cursor:
+            if row[0] in nha_ids:
+                packages.setdefault(package_name(row[1]), set()).add(row[0])
+    return {name: sorted(ids) for name, ids in packages.items()}
+
+
+# define function to split NHAs into packages by the polygons of another layer (e.g. counties or project areas). NHAs
+# that cross polygon boundaries go into every package they intersect.
+def partition_by_layer(stage_gdb, partition_layer, name_field):
+    """Returns a dictionary of package name: list of NHA Join IDs for the staged NHAs intersecting each polygon."""
+    with arcpy.EnvManager(overwriteOutput=True):
+        joined = arcpy.SpatialJoin_analysis(os.path.join(stage_gdb, "NHA_Core"), partition_layer,
+                                            os.path.join("memory", "nha_partition_join"), "JOIN_ONE_TO_MANY",
+                                            "KEEP_COMMON", match_option="INTERSECT")
+    # a name field that is also an NHA field comes out of the spatial join with a _1 suffix
+    joined_fields = [f.name.lower() for f in arcpy.ListFields(joined)]
+    if name_field.lower() in [f.lower() for f in core_fields]:
+        name_field = name_field + "_1"
+    if name_field.lower() not in joined_fields:
+        raise ValueError("Partition name field {0} was not found in the spatial join output".format(name_field))
+    packages = {}
+    with arcpy.da.SearchCursor(joined, ["nha_join_id", name_field]) as cursor:
+        for row in cursor:
+            packages.setdefault(package_name(row[1]), set()).add(row[0])
+    return {name: sorted(ids) for name, ids in packages.items()}
+
+
+# define function to write a feature class or table from the staged gdb to GeoParquet. Geometry is written as WKB in
+# WGS84 longitude/latitude, which is the GeoParquet default coordinate reference system.
+def write_parquet(source, path, where_clause):
+    """Writes rows of source matching where_clause to a (Geo)Parquet file and returns the number of rows written."""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = [f.name for f in arcpy.ListFields(source) if f.type not in ("OID", "Geometry", "GlobalID", "Blob", "Raster")
+              and f.name.lower() not in ("shape_length", "shape_area")]
+    is_spatial = arcpy.Describe(source).dataType == "FeatureClass"
+    cursor_fields = fields + ["SHAPE@WKB"] if is_spatial else fields
+    cursor_sr = arcpy.SpatialReference(4326) if is_spatial else None
+    with arcpy.da.SearchCursor(source, cursor_fields, where_clause, spatial_reference=cursor_sr) as cursor:
+        df = pd.DataFrame([row for row in cursor], columns=fields + ["geometry"] if is_spatial else fields)
+
+    if not is_spatial:
+        df.to_parquet(path, index=False)
+        return len(df)
+    df["geometry"] = [bytes(g) if g is not None else None for g in df["geometry"]]
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    geo = {"version": "1.0.0", "primary_column": "geometry",
+           "columns": {"geometry": {"encoding": "WKB", "geometry_types": []}}}
+    table = table.replace_schema_metadata(dict(table.schema.metadata or {}, geo=json.dumps(geo)))
+    pq.write_table(table, path)
+    return len(df)
+
+
+# define function to write one package from the staged gdb. This runs in a worker process.
+def write_package(stage_gdb, out_folder, name, nha_ids, output_format, include_species):
+    """Writes the NHAs in nha_ids (and their species) to one package and returns its manifest entry."""
+    start = time.perf_counter()
+    where_clause = nha_where(nha_ids)
+    stage_core = os.path.join(stage_gdb, "NHA_Core")
+    stage_species = os.path.join(stage_gdb, "SpeciesTable")
+    species_count = None
+
+    if output_format == "GeoParquet":
+        path = os.path.join(out_folder, name)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        core_count = write_parquet(stage_core, os.path.join(path, "NHA_Core.parquet"), where_clause)
+        if include_species:
+            species_count = write_parquet(stage_species, os.path.join(path, "SpeciesTable.parquet"), where_clause)
+    else:
+        if output_format == "GeoPackage":
+            path = os.path.join(out_folder, name + ".gpkg")
+            arcpy.CreateSQLiteDatabase_management(path, "GEOPACKAGE")
+        else:
+            path = os.path.join(out_folder, name + ".gdb")
+            arcpy.CreateFileGDB_management(out_folder, name + ".gdb")
+        core = arcpy.FeatureClassToFeatureClass_conversion(stage_core, path, "NHA_Core", where_clause)
+        core_count = int(arcpy.GetCount_management(core)[0])
+        if include_species:
+            species = arcpy.TableToTable_conversion(stage_species, path, "SpeciesTable", where_clause)
+            species_count = int(arcpy.GetCount_management(species)[0])
+            # GeoPackages don't support relationship classes
+            if output_format == "File Geodatabase":
+                arcpy.CreateRelationshipClass_management(os.path.join(path, "NHA_Core"), os.path.join(path, "SpeciesTable"),
+                                                         os.path.join(path, "NHA_Core_TO_Species"), "SIMPLE",
+                                                         "Core_TO_Species", "Species_TO_Core", "NONE", "ONE_TO_MANY",
+                                                         "NONE", "NHA_JOIN_ID", "NHA_JOIN_ID")
+
+    return {"package": name, "path": path, "format": output_format, "nha_count": core_count,
+            "species_count": species_count, "seconds": round(time.perf_counter() - start, 2)}
+
+
+# define function to write all packages, in parallel worker processes if there is more than one
+def write_packages(stage_gdb, packages, out_folder, output_format, include_species, workers=export_workers, log=print):
+    """Writes each package in packages ({name: nha_ids}) and returns the list of manifest entries sorted by name."""
+    jobs = [(stage_gdb, out_folder, name, ids, output_format, include_species) for name, ids in sorted(packages.items())]
+    results = []
+    if workers > 1 and len(jobs) > 1:
+        # tools run inside ArcGISPro.exe, so worker processes need to be started with the environment's python.exe
+        if os.path.basename(sys.executable).lower() == "arcgispro.exe":
+            multiprocessing.set_executable(os.path.join(sys.exec_prefix, "python.exe"))
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            futures = [executor.submit(write_package, *job) for job in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                log("Wrote {0} ({1} NHAs) in {2} seconds".format(result["path"], result["nha_count"], result["seconds"]))
+                results.append(result)
+    else:
+        for job in jobs:
+            result = write_package(*job)
+            log("Wrote {0} ({1} NHAs) in {2} seconds".format(result["path"], result["nha_count"], result["seconds"]))
+            results.append(result)
+    return sorted(results, key=lambda r: r["package"])
+
+
+# define function to write the manifest for an export
+def write_manifest(path, output_format, stage_seconds, results):
+    """Writes a JSON manifest with the format, staging time, and per package row counts and timings to path."""
+    manifest = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "format": output_format,
+                "stage_seconds": round(stage_seconds, 2), "packages": results}
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+# define function to run the "Export NHAs to File Geodatabase" tool with the tool parameters
+@traced_tool("Export NHAs to File Geodatabase", arcpy.AddMessage)
+def execute(params, messages):
+    nha_core = params[0].valueAsText
+    output_gdb = params[1].valueAsText
+    nha_query = params[2].valueAsText
+    sensitive_species = params[3].valueAsText
+    output_format = params[4].valueAsText
+    partition_field = params[5].valueAsText
+    partition_layer = params[6].valueAsText
+    partition_name_field = params[7].valueAsText
+    workers = params[8].value if params[8].value else 1
+
+    eo_url = url("eo_ptreps")
+    species_url = url("nha_species")
+
+    #check for selection. error out if no selection is made.
+    desc = arcpy.Describe(nha_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No NHA Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # check if species table should be copied
+    include_species = sensitive_species != "Exclude species table from export"
+    mask_species = sensitive_species == "Mask sensitive species in species table"
+
+    # check that the NHA cores, species table, and EO reps have every field the export uses before reading anything
+    requirements = {nha_core: core_fields + ["site_type"] + ([partition_field] if partition_field else [])}
+    if include_species:
+        requirements["nha_species"] = species_fields + ["exclude"]
+    if mask_species:
+        requirements["eo_ptreps"] = ["EO_ID"] + sensitive_flag_fields
+    validate(requirements)
+
+    #create list of qualifying NHA_JOIN_IDs to be exported in selection based on selection of current or completed not published
+    with arcpy.da.SearchCursor(nha_core,["nha_join_id","site_type"]) as cursor:
+        if nha_query == "Only Current NHAs":
+            nha_ids = sorted({row[0] for row in cursor if row[0] is not None and row[1] == 'curr'})
+        elif nha_query == "Current and Historic NHAs":
+            nha_ids = sorted({row[0] for row in cursor if row[0] is not None and (row[1] == 'curr' or row[1] == 'hist')})
+        else:
+            nha_ids = sorted({row[0] for row in cursor if row[0] is not None and (row[1] == 'curr' or row[1] == 'hist' or row[1] == 'susn')})
+
+    if not include_species:
+        arcpy.AddMessage("You have chosen not to include the species table in your export")
+    elif not mask_species:
+        arcpy.AddMessage("You have chosen not to mask sensitive species")
+
+    #read qualifying NHA cores and species records once into a scratch gdb - all packages are written from this copy
+    arcpy.AddMessage("Copying Selected NHA Cores and Species Table")
+    stage_start = time.perf_counter()
+    stage_gdb = stage_source(nha_core, nha_ids, species_url, eo_url, include_species, mask_species, arcpy.AddMessage)
+    stage_seconds = time.perf_counter() - stage_start
+
+    #split the NHAs into packages - one package named after the output if this isn't a batch export
+    out_folder = os.path.dirname(output_gdb)
+    base_name = os.path.basename(output_gdb)
+    if base_name.lower().endswith(".gdb"):
+        base_name = base_name[:-4]
+    if partition_field:
+        packages = partition_by_field(nha_core, partition_field, nha_ids)
+    elif partition_layer:
+        packages = partition_by_layer(stage_gdb, partition_layer, partition_name_field)
+    else:
+        packages = {"": nha_ids}
+    packages = {"_".join(n for n in [base_name, name] if n): ids for name, ids in packages.items()}
+    arcpy.AddMessage("Writing " + str(len(packages)) + " " + output_format + " package(s)")
+
+    results = write_packages(stage_gdb, packages, out_folder, output_format, include_species, workers, arcpy.AddMessage)
+    manifest = write_manifest(os.path.join(out_folder, base_name + "_manifest.json"), output_format, stage_seconds, results)
+    arcpy.AddMessage("Export manifest written to " + manifest)
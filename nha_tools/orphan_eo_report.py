@@ -0,0 +1,129 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: orphan_eo_report.py
+Purpose: Checks for exploded EO centroids that are NOT within an NHA boundary. Run by the "Orphan EO Report" tool
+in NHA_ArcGIS_Tools_v4.pyt.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+10/19/2026 - added a multi-geography mode. When an area name field is given, orphan EOs are assigned to every polygon
+in the geographic area layer (such as all counties) with one spatial join. The combined orphan list and counts of orphans
+by area, taxa group, and grank are written in one run.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import os
+import pandas as pd
+from nha_tools.common import element_type
+import nha_trace
+from nha_trace import traced_tool
+
+# EO fields written to the combined orphan EO table in multi-geography mode
+orphan_fields = ["EO_ID","ELCODE","SNAME","SCOMNAME","GRANK","SRANK","EORANK","LASTOBS_YR"]
+
+
+# name the area field is given in the spatial join output, so it can't clash with any of the EO fields
+area_join_field = "orphan_area_name"
+
+
+# define function to build the field mappings of the orphan area spatial join - the orphan EO fields and the area field
+# renamed to area_join_field
+def orphan_area_mappings(orphan_lyr, geo_area, area_field):
+    """Returns arcpy FieldMappings with orphan_fields from orphan_lyr and area_field from geo_area as area_join_field."""
+    fieldmappings = arcpy.FieldMappings()
+    for field in orphan_fields:
+        fieldmap = arcpy.FieldMap()
+        fieldmap.addInputField(orphan_lyr, field)
+        fieldmappings.addFieldMap(fieldmap)
+    area_map = arcpy.FieldMap()
+    area_map.addInputField(geo_area, area_field)
+    out_field = area_map.outputField
+    out_field.name = area_join_field
+    out_field.aliasName = area_field
+    area_map.outputField = out_field
+    fieldmappings.addFieldMap(area_map)
+    return fieldmappings
+
+
+# define function to assign orphan EO centroids to the polygons of a geographic area layer with one spatial join.
+# Centroids that fall on a shared boundary are listed once for each polygon they touch.
+def orphans_by_area(orphan_lyr, geo_area, area_field):
+    """Returns a dataframe of orphan EO fields, the area name, and taxa group for every orphan EO in an area."""
+    with arcpy.EnvManager(overwriteOutput=True):
+        joined = nha_trace.call("SpatialJoin", arcpy.SpatialJoin_analysis, orphan_lyr, geo_area,
+                                os.path.join("memory","orphan_area_join"), "JOIN_ONE_TO_MANY", "KEEP_COMMON",
+                                orphan_area_mappings(orphan_lyr, geo_area, area_field), "INTERSECT")
+    with arcpy.da.SearchCursor(joined, orphan_fields + [area_join_field]) as cursor:
+        orphans = pd.DataFrame([row for row in nha_trace.counted(cursor)], columns=orphan_fields + ["area"])
+    orphans["taxa"] = [element_type(elcode) if elcode else None for elcode in orphans["ELCODE"]]
+    return orphans.sort_values(["area","EO_ID"]).reset_index(drop=True)
+
+
+# define function to count orphan EOs in each area by taxa group and grank
+def orphan_counts(orphans):
+    """Returns a dataframe of area, taxa, GRANK, and the number of orphan EOs, with an area total row per area."""
+    counts = orphans.groupby(["area","taxa","GRANK"], dropna=False).size().rename("orphan_eos").reset_index()
+    totals = orphans.groupby("area", dropna=False).size().rename("orphan_eos").reset_index()
+    totals["taxa"] = "(all)"
+    totals["GRANK"] = "(all)"
+    return pd.concat([counts, totals], ignore_index=True).sort_values(["area","taxa","GRANK"]).reset_index(drop=True)
+
+
+# define function to run the "Orphan EO Report" tool with the tool parameters
+@traced_tool("Orphan EO Report", arcpy.AddMessage)
+def execute(params, messages):
+    geo_area = params[0].valueAsText
+    nha_core = params[1].valueAsText
+    eo_layer = params[2].valueAsText
+    area_field = params[3].valueAsText if len(params) > 3 else None
+
+    # we are going to make the eo polygons into single part centroids to tag to NHAs
+    eo_singles = arcpy.MultipartToSinglepart_management(eo_layer, os.path.join("memory","eo_singles"))
+    eo_centroids = arcpy.FeatureToPoint_management(eo_singles, os.path.join("memory","eo_centroids"),"INSIDE")
+    eo_lyr = arcpy.MakeFeatureLayer_management(eo_centroids,"eo_lyr")
+
+    geo_lyr = arcpy.MakeFeatureLayer_management(geo_area,"geo_lyr")
+    nha_lyr = arcpy.MakeFeatureLayer_management(nha_core,"nha_lyr")
+
+    if area_field:
+        # multi-geography mode - select every qualifying centroid outside of an NHA and assign them all to their areas
+        # with one spatial join instead of running the report once per area
+        arcpy.SelectLayerByLocation_management(eo_lyr,"INTERSECT",nha_lyr,"","NEW_SELECTION","INVERT")
+        where_clause = "{0} = '{1}'".format("NHAEligible", "Y")
+        arcpy.SelectLayerByAttribute_management(eo_lyr,"SUBSET_SELECTION",where_clause)
+
+        orphans = orphans_by_area(eo_lyr, geo_area, area_field)
+        counts = orphan_counts(orphans)
+        output_file = "NHA_orphan_eos_by_area.csv"
+        counts_file = "NHA_orphan_eo_counts.csv"
+        orphans.rename(columns={"area": area_field}).to_csv(output_file, index=False)
+        counts.rename(columns={"area": area_field}).to_csv(counts_file, index=False)
+        arcpy.AddMessage("Found " + str(orphans["EO_ID"].nunique()) + " orphan EOs in " + str(orphans["area"].nunique())
+                         + " areas. Orphan EOs written to " + os.path.abspath(output_file) + " and counts by area "
+                         "written to " + os.path.abspath(counts_file))
+        os.startfile(counts_file)
+        return
+
+    arcpy.SelectLayerByLocation_management(eo_lyr,"INTERSECT",geo_lyr)
+
+    arcpy.SelectLayerByLocation_management(eo_lyr,"INTERSECT",nha_lyr,"","REMOVE_FROM_SELECTION")
+
+    where_clause = "{0} = '{1}'".format("NHAEligible", "Y")
+    arcpy.SelectLayerByAttribute_management(eo_lyr,"SUBSET_SELECTION",where_clause)
+
+    with arcpy.da.SearchCursor(eo_lyr,"EO_ID") as cursor:
+        qualifying_eos = sorted({row[0] for row in cursor})
+
+    where_clause = "EO_ID IN ({})".format(", ".join(str(eo) for eo in qualifying_eos))
+    arcpy.AddMessage(where_clause)
+    arcpy.SelectLayerByAttribute_management(eo_layer,"NEW_SELECTION",where_clause)
+
+    # today = date.today()
+    # formatted_date = today.strftime("%Y%m%d")
+    output_file = "NHA_orphan_eos.csv"
+    arcpy.ExportTable_conversion(eo_lyr,output_file)
+    os.startfile(output_file)
@@ -0,0 +1,290 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: public_update.py
+Purpose: This deletes all features from the NHA public dataset and copies and formats NHA data from our internal NHA
+database to the public feature service on our WEBGIS Portal. Run by the "Update Public Feature Service" tool in
+NHA_ArcGIS_Tools_v4.pyt - NHA_Public_Update.py is the nightly script version that updates ArcGIS Online.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: 03/24/2025
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+10/19/2026 - NHA polygons are simplified and quantized with nha_geometry.py before they are appended to the public
+layer.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+from arcgis.features import FeatureSet
+import os
+import pandas as pd
+import numpy as np
+from nha_utils import get_latest_records, mask_sensitive
+from nha_session import get_gis, feature_layer, report_requests
+from nha_geometry import prepare_public_geometry
+from nha_trace import traced_tool
+import nha_schema
+
+
+# define function to run the "Update Public Feature Service" tool with the tool parameters
+@traced_tool("Update Public Feature Service", arcpy.AddMessage)
+def execute(params, messages):
+    # environment variables
+    pd.options.mode.copy_on_write = True
+    arcpy.env.overwriteOutput = True
+
+    # define NHA feature service rest endpoints
+    nha_url = nha_schema.url("nha_core")
+    site_account_url = nha_schema.url("nha_site_accounts")
+    species_url = nha_schema.url("nha_species")
+    tr_bullets_url = nha_schema.url("nha_tr_bullets")
+    nha_references_url = nha_schema.url("nha_references")
+
+    # eo rest end point to bring in current EO data
+    eo_ptreps = nha_schema.url("eo_ptreps")
+
+    # define NHA PUBLIC feature service rest endpoints - these are on our WEBGIS Portal
+    PUBLIC_nha_url = r"https://webgis.waterlandlife.org/server/rest/services/Hosted/Natural_Heritage_Area_Public_Data/FeatureServer/0"
+    PUBLIC_site_accounts_url = r"https://webgis.waterlandlife.org/server/rest/services/Hosted/Natural_Heritage_Area_Public_Data/FeatureServer/1"
+    PUBLIC_species_url = r"https://webgis.waterlandlife.org/server/rest/services/Hosted/Natural_Heritage_Area_Public_Data/FeatureServer/2"
+    PUBLIC_tr_bullets_url = r"https://webgis.waterlandlife.org/server/rest/services/Hosted/Natural_Heritage_Area_Public_Data/FeatureServer/3"
+    PUBLIC_nha_references_url = r"https://webgis.waterlandlife.org/server/rest/services/Hosted/Natural_Heritage_Area_Public_Data/FeatureServer/4"
+
+    ###################
+    ## FIRST WE ARE GOING TO CONNECT TO THE WPC GIS PORTAL AND BRING IN ALL THE DATA AT ONCE SO WE DON'T  HAVE TO KEEP SWITCHING PORTALS
+    # connect to wpc gis Portal account - credentials are loaded from OS environment variables in nha_session.py
+    gis = get_gis("wpc_gis")
+
+    # make a layer of nha cores that are ready for review or approved - EXCLUDE draft and not approved. These will be loaded
+    # into the public layer in a bit
+    nha_layer = arcpy.MakeFeatureLayer_management(nha_url, "nha_layer", where_clause="status = 'rev' OR status = 'app'")
+
+    # copy the NHAs and simplify their boundaries for the public web map - this only reruns when boundaries have changed
+    nha_copy = arcpy.CopyFeatures_management(nha_layer, os.path.join("memory", "nha_copy"))
+    prepare_public_geometry(nha_copy, "public_nhas_tool", log=arcpy.AddMessage)
+
+    ##########################
+    ## LOAD SITE ACCOUNTS
+    ##########################
+    # load in the most current site account records for all NHAs
+    site_accounts = get_latest_records(site_account_url, "nha_join_id", "written_date", ['site_desc', 'tr_summary'])
+    site_accounts = site_accounts.fillna(np.nan)
+    site_accounts = site_accounts.replace({np.nan: None})
+
+    site_accounts_df = site_accounts[['site_desc', 'tr_summary', 'nha_join_id']]
+
+    # convert dataframe to feature set
+    site_accounts_fs = FeatureSet.from_dataframe(site_accounts_df)
+
+    # create dictionary with site description and tr summary that will be used to in the PUBLIC NHA layer after it is loaded with the updated NHA data
+    # site_account_dict = site_accounts.set_index('nha_join_id')[["site_desc", "tr_summary"]].apply(list,axis=1).to_dict()
+    # site_account_dict = {k: v for k, v in site_account_dict.items() if pd.notna(k) and k != ""}
+
+    ##########################
+    ## LOAD AND FORMAT SPECIES RECORDS
+    ##########################
+    # Create Pandas dataframe from species table for records are not excluded
+    fields = ['EO_ID', 'taxa', 'species_url', 'nha_join_id', 'exclude']
+    species_sdf = pd.DataFrame((row for row in arcpy.da.SearchCursor(species_url, fields) if row[4] != "Y"), columns=fields)
+    # format NA values so they play nicely with ArcGIS
+    species_sdf = species_sdf.fillna(np.nan)
+    species_sdf = species_sdf.replace({np.nan: None})
+
+    # create pandas dataframe from eo_ptreps layer
+    fields = ['EO_ID', 'SNAME', 'SCOMNAME', 'GRANK', 'SRANK', 'USESA', 'SPROT', 'PBSSTATUS', 'EORANK',
+              'SENSITV_SP', 'SENSITV_EO', 'LASTOBS_YR']
+    et_sdf = pd.DataFrame((row for row in arcpy.da.SearchCursor(eo_ptreps, fields)), columns=fields)
+
+    # join species table with eo_ptreps data by EO_ID
+    species_sdf = pd.merge(species_sdf, et_sdf, on='EO_ID', how='left')
+
+    # sort values by lastobs_yr and drop duplicate species by nha group
+    species_sdf = species_sdf.sort_values(['nha_join_id', 'LASTOBS_YR'], ascending=[True, False])
+    species_sdf = species_sdf.drop_duplicates(subset=['nha_join_id', 'SNAME'], keep='first')
+
+    # add species_name column that includes combined species name and HTML tags to include bolding and italics
+    # species_sdf['species_name'] = '<b>' + species_sdf['SCOMNAME'] + '</b>' + ' (<i>' + species_sdf['SNAME'] + '</i>)'
+
+    # This is a dictionary of taxa photos. If photo path changes, then the paths need to change here.
+    taxa_dict = {
+        "Salamander": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/d4395781f79f4809ac5771ed46afcebe/data",
+        "Frog": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/d4395781f79f4809ac5771ed46afcebe/data",
+        "Invertebrate - Spiders": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/76355679a9de4b75b0e258d0dac50ed2/data",
+        "Bird": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/186836d959cf4395950fed5d06fa555a/data",
+        "Invertebrate - Butterflies and Skippers": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/d28d85867aa44e6a90e00bd709633d86/data",
+        "Invertebrate - Caddisflies": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/f94523b016054bf58672657c3e25a2d7/data",
+        "Community": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/2e46204a9d664cec8752f7ffaa6705c0/data",
+        "Invertebrate - Crayfishes": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/46f9fb536e414fc588d9b3161fe4bdac/data",
+        "Fish": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/a71cab580062496bb51bbc8fdfcc170f/data",
+        "Mammal": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/2b02184a22454072b69e6b2e29b3429a/data",
+        "Invertebrate - Moths": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/dbf1e79db4ed44c8aa3b8f3260484395/data",
+        "Invertebrate - Mussels": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/15483e775cf54fba916069f6da9c8660/data",
+        "Invertebrate - Dragonflies and Damselflies": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/79fb1762c6b54de39f6f0ea688f0f1f0/data",
+        "Invertebrate - Other Beetles": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/82dc6ca9f6b9441aa7f7de9401dbfb82/data",
+        "Vascular Plant": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/f1712d5fc50647189c11deef3256832e/data",
+        "Invertebrate - Gastropods": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/ccbaf34a23924e608b244db2ae370f35/data",
+        "Invertebrate - Sponges": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/3fa77fe0511942efbff26c5a2715bed2/data",
+        "Invertebrate - Tiger Beetles": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/0e821d1634c44c9e9f7eb844f5452152/data",
+        "Reptile": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/6e03a571988a4fd286dbddd97d5e4640/data",
+        "Invertebrate - Stoneflies": "https://webgis.waterlandlife.org/portal/sharing/rest/content/items/82dc6ca9f6b9441aa7f7de9401dbfb82/data"}
+
+    # join taxa_photo url with species dataframe based on taxa
+    species_sdf['taxa_photo'] = species_sdf['taxa'].map(taxa_dict)
+
+    # Deal with sensitive species by masking attributes if sensitive species or sensitive eo are marked Yes
+    masked_values = {'SNAME': 'Sensitive Species', 'SCOMNAME': 'Sensitive Species', 'GRANK': '--', 'SRANK': '--',
+                     'SPROT': '--', 'PBSSTATUS': '--', 'taxa': '--',
+                     'taxa_photo': 'https://webgis.waterlandlife.org/portal/sharing/rest/content/items/aaf80c376eb44dc6bf7cae1a1bb51333/data'}
+    species_sdf = mask_sensitive(species_sdf, masked_values)
+
+    # Get final species dataframe that will be loaded into PUBLIC feature service
+    species_sdf = species_sdf[
+        ['SNAME', 'SCOMNAME', 'GRANK', 'SRANK', 'SPROT', 'PBSSTATUS', 'LASTOBS_YR', 'EORANK', 'taxa', 'taxa_photo',
+         'species_url', 'nha_join_id']]
+
+    # deal with field name mismatches and data type issues
+    species_sdf.rename(columns={'SNAME': 'sname', 'SCOMNAME': 'scomname', 'GRANK': 'grank', 'SRANK': 'srank', 'SPROT': 'sprot', 'PBSSTATUS': 'pbsstatus',
+                                'LASTOBS_YR': 'lastobs_yr', 'EORANK': 'eorank'}, inplace=True)
+    species_sdf['lastobs_yr'] = species_sdf['lastobs_yr'].astype('Int64')
+
+    # convert dataframe to feature set
+    species_fs = FeatureSet.from_dataframe(species_sdf)
+
+    ##########################
+    ## LOAD TR BULLETS RECORDS
+    ##########################
+
+    # create pandas dataframe from tr_bullets table
+    fields = ['threat_text', 'nha_join_id', 'threat_desc']
+    tr_bullets_sdf = pd.DataFrame((row for row in arcpy.da.SearchCursor(tr_bullets_url, fields)),
+                                  columns=fields)
+    # format NA values so they play nicely with ArcGIS
+    tr_bullets_sdf = tr_bullets_sdf.fillna(np.nan)
+    tr_bullets_sdf = tr_bullets_sdf.replace({np.nan: None})
+
+    # convert dataframe to feature set
+    tr_bullets_fs = FeatureSet.from_dataframe(tr_bullets_sdf)
+
+    ##########################
+    ## LOAD REFERENCE RECORDS
+    ##########################
+
+    # create pandas dataframe from references table
+    fields = ['source_id', 'full_cite']
+    references_sdf = pd.DataFrame((row for row in arcpy.da.SearchCursor(nha_references_url, fields)),
+                                  columns=fields)
+    # format NA values so they play nicely with ArcGIS
+    references_sdf = references_sdf.fillna(np.nan)
+    references_sdf = references_sdf.replace({np.nan: None})
+
+    references_sdf['full_cite'] = references_sdf['full_cite'].str.replace(r'<div class="csl-entry">', '', regex=True)
+    references_sdf['full_cite'] = references_sdf['full_cite'].str.replace(r'</div>', '', regex=True)
+
+    # convert dataframe to feature set
+    references_fs = FeatureSet.from_dataframe(references_sdf)
+
+    ######################
+    ## NOW WE ARE GOING TO CONNECT TO THE PUBLIC WEBGIS PORTAL AND START DELETING AND LOADING DATA
+    ######################
+
+    # connect to WEBGIS Portal account - credentials are loaded from OS environment variables in nha_session.py
+    webgis = get_gis("wpc_webgis")
+
+    ###### this section deletes NHA polygons and appends current polygons to the Public NHA dataset
+    # delete all features from NHA Public layer
+    public_nha_flayer = feature_layer(PUBLIC_nha_url)
+    public_nha_flayer.delete_features(where="objectid > 0")
+
+    # append nha cores to public feature service layer
+    arcpy.Append_management(nha_copy, PUBLIC_nha_url, "NO_TEST")
+
+    ############ THIS SECTION UPDATES THE NHA LAYER FOR DOMAIN THINGS
+    with arcpy.da.UpdateCursor(PUBLIC_nha_url, "sig_rank") as cursor:
+        for row in cursor:
+            if row[0] is None:
+                pass
+            elif row[0] == "G":
+                row[0] = "Global"
+                cursor.updateRow(row)
+            elif row[0] == "R":
+                row[0] = "Regional"
+                cursor.updateRow(row)
+            elif row[0] == "S":
+                row[0] = "State"
+                cursor.updateRow(row)
+            else:
+                row[0] = "Local"
+                cursor.updateRow(row)
+
+    with arcpy.da.UpdateCursor(PUBLIC_nha_url, ["site_type"]) as cursor:
+        for row in cursor:
+            if row[0] is None:
+                pass
+            elif row[0] == "curr":
+                row[0] = "NHA - Current"
+                cursor.updateRow(row)
+            elif row[0] == "hist":
+                row[0] = "NHA - Historic"
+                cursor.updateRow(row)
+            elif row[0] == "susn":
+                row[0] = "SUSN - Species of Unusual Spatial Need"
+                cursor.updateRow(row)
+            else:
+                row[0] = None
+                cursor.updateRow(row)
+
+    ############
+    ## DELETE AND LOAD IN SITE ACCOUNT RECORDS
+    ############
+
+    # create public species feature layer
+    public_site_accounts_flayer = feature_layer(PUBLIC_site_accounts_url)
+    # delete species records from public feature layer
+    public_site_accounts_flayer.delete_features(where="objectid > 0")
+    # load species records from species feature set
+    public_site_accounts_flayer.edit_features(adds=site_accounts_fs)
+
+    # update the site description and tr summary in the public nha core layer with most recent entries in site account
+    with arcpy.da.UpdateCursor(PUBLIC_site_accounts_url, ["site_desc", "tr_summary"]) as cursor:
+        for row in cursor:
+            if row[0] is None:
+                row[
+                    0] = "Site description is not yet databased for this site. Please see the Site Account PDF if available."
+                cursor.updateRow(row)
+            if row[1] is None:
+                row[
+                    1] = "Threats and recommendations summary is not yet databased for this site. Please see the Site Account PDF if available."
+                cursor.updateRow(row)
+
+    ############
+    ## DELETE AND LOAD IN SPECIES RECORDS
+    ############
+    # create public species feature layer
+    public_species_flayer = feature_layer(PUBLIC_species_url)
+    # delete species records from public feature layer
+    public_species_flayer.delete_features(where="objectid > 0")
+    # load species records from species feature set
+    public_species_flayer.edit_features(adds=species_fs)
+
+    #######
+    ## DELETE AND LOAD IN TR BULLETS
+    #######
+    # create public tr bullets layer
+    tr_bullets_flayer = feature_layer(PUBLIC_tr_bullets_url)
+    # delete all records from the public tr bullets table
+    tr_bullets_flayer.delete_features(where="objectid > 0")
+    # load tr bullet records from tr bullets feature set
+    tr_bullets_flayer.edit_features(adds=tr_bullets_fs)
+
+    #######
+    ## DELETE AND LOAD IN NHA REFERENCES
+    #######
+    # create public references feature layer
+    references_flayer = feature_layer(PUBLIC_nha_references_url)
+    # delete all records from public references table
+    references_flayer.delete_features(where="objectid > 0")
+    # load references records from references feature set
+    references_flayer.edit_features(adds=references_fs)
+
+    report_requests(arcpy.AddMessage)
@@ -0,0 +1,169 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: site_account_uploader.py
+Purpose: Takes selected NHAs, looks for site reports, and adds them or updates them on the Portal if there
+is a newer version available. Run by the "Site Account Uploader" tool in NHA_ArcGIS_Tools_v4.pyt - execute uploads to
+ArcGIS Online and execute_webgis uploads to our WEBGIS Portal.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import os
+import sys
+import datetime
+import arcgis
+from arcgis.gis._impl._content_manager import SharingLevel
+from nha_session import get_gis
+from nha_trace import traced_tool
+
+date = datetime.datetime.now().strftime("%Y-%m-%d")
+
+# define function to upload site reports for the selected NHAs to our WEBGIS Portal
+@traced_tool("Site Account Uploader", arcpy.AddMessage)
+def execute_webgis(params, messages):
+    nha_core = params[0].valueAsText
+
+    # check for selection on nha core layer and exit if there is no selection
+    desc = arcpy.Describe(nha_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No NHA Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # connect to Portal account - credentials are loaded from OS environment variables in nha_session.py and the login
+    # is reused by later tool runs in this Pro session
+    gis = get_gis("wpc_webgis")
+
+    # define path where site reports are held - THESE NEED TO CHANGE IF THE PATHS CHANGE!!!!
+    site_report_dir = r"H:\Scripts\NHA_Tools\SiteReports\_data\output"
+    site_folder = gis.content.folders.get(folder="NHA Site Reports")
+
+    # get list of nha_join_ids for selected nhas
+    with arcpy.da.UpdateCursor(nha_core,["nha_join_id","site_name","site_pdf_link"]) as cursor:
+        for row in cursor:
+            nha_join_id = row[0] # get nha_join_id for record
+            site_name = row[1] # get site_name for record
+
+            # get list of files in local site_report_directory to see if there are any ready to upload
+            files = [f for f in os.listdir(site_report_dir) if os.path.isfile(os.path.join(site_report_dir, f)) if f.split("_")[-1][0:-4] == nha_join_id]
+            # if there aren't any, pass and move on to the next one
+            if len(files) == 0:
+                arcpy.AddMessage("No PDF site account is present for: "+nha_join_id+". We have nothing to update, so we're moving on to the next one.")
+                pass
+            else:
+                file = files[-1] # use this to get the most recent site report
+
+                # see if this site account is already uploaded
+                site_match = gis.content.search(query="title:" + files[-1][0:-4])
+                # if there is already a site account with the same filename, skip it. otherwise, move on
+                if len(site_match) > 0:
+                    arcpy.AddMessage(
+                        "There is already a file of exactly the same name for : " + nha_join_id + ". We have nothing to update, so we're moving on to the next one.")
+                    pass
+                else:
+                    # if there are site accounts that match the nha_join_id, delete them! because we are uploading a more current version
+                    site_del = gis.content.search(query="title:" + nha_join_id)
+                    # DELETE SITE ACCOUNTS
+                    for item in site_del:
+                        item.delete()
+                    # now we will upload new site account to NHA Site Reports portal folder
+                    # first set item properties to record metadata - fill more of this in later
+                    nha_item_properties = arcgis.gis.ItemProperties(
+                        item_type="PDF",
+                        title=file[0:-4],
+                        description="NHA Site Account PDF for "+site_name+" uploaded on "+date+"."
+                    )
+
+                    # get file path and add file to NHA Site Report folder on the portal
+                    upload_file = os.path.join(site_report_dir, file)
+                    site_item = site_folder.add(item_properties = nha_item_properties, file = upload_file).result()
+                    # update sharing to PUBLIC using the sharing manager
+                    sharing_mgr = site_item.sharing
+                    sharing_mgr.sharing_level = SharingLevel.EVERYONE
+
+                    # get item id to use to build pdf url
+                    item_id = site_item.id
+                    site_account_url = r"https://webgis.waterlandlife.org/portal/sharing/rest/content/items/"+item_id+r"/data"
+
+                    # update pdf site account url in feature service
+                    row[2] = site_account_url
+                    cursor.updateRow(row)
+
+# define function to upload site reports for the selected NHAs to ArcGIS Online. This is the version the tool runs.
+@traced_tool("Site Account Uploader", arcpy.AddMessage)
+def execute(params, messages):
+    nha_core = params[0].valueAsText
+
+    # check for selection on nha core layer and exit if there is no selection
+    desc = arcpy.Describe(nha_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No NHA Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # connect to ArcGIS Online account - credentials are loaded from OS environment variables in nha_session.py and the
+    # login is reused by later tool runs in this Pro session
+    gis = get_gis("agol")
+
+    # define path where site reports are held - THESE NEED TO CHANGE IF THE PATHS CHANGE!!!!
+    site_report_dir = r"H:\Scripts\NHA_Tools\SiteReports\_data\output"
+    site_folder = gis.content.folders.get(folder="NHA Site Reports")
+
+    # get list of nha_join_ids for selected nhas
+    with arcpy.da.UpdateCursor(nha_core,["nha_join_id","site_name","site_pdf_link"]) as cursor:
+        for row in cursor:
+            nha_join_id = row[0] # get nha_join_id for record
+            site_name = row[1] # get site_name for record
+
+            # get list of files in local site_report_directory to see if there are any ready to upload
+            files = [f for f in os.listdir(site_report_dir) if os.path.isfile(os.path.join(site_report_dir, f)) if f.split("_")[-1][0:-4] == nha_join_id]
+            # if there aren't any, pass and move on to the next one
+            if len(files) == 0:
+                arcpy.AddMessage("No PDF site account is present for: "+nha_join_id+". We have nothing to update, so we're moving on to the next one.")
+                pass
+            else:
+                file = files[-1] # use this to get the most recent site report
+
+                # see if this site account is already uploaded
+                site_match = gis.content.search(query="title:" + files[-1][0:-4])
+                # if there is already a site account with the same filename, skip it. otherwise, move on
+                if len(site_match) > 0:
+                    arcpy.AddMessage(
+                        "There is already a file of exactly the same name for : " + nha_join_id + ". We have nothing to update, so we're moving on to the next one.")
+                    pass
+                else:
+                    # if there are site accounts that match the nha_join_id, delete them! because we are uploading a more current version
+                    site_del = gis.content.search(query="title:" + nha_join_id)
+                    # DELETE SITE ACCOUNTS
+                    for item in site_del:
+                        item.delete()
+                    # now we will upload new site account to NHA Site Reports portal folder
+                    # first set item properties to record metadata - fill more of this in later
+                    nha_item_properties = arcgis.gis.ItemProperties(
+                        item_type="PDF",
+                        title=file[0:-4],
+                        description="NHA Site Account PDF for "+site_name+" uploaded on "+date+"."
+                    )
+
+                    # get file path and add file to NHA Site Report folder on the portal
+                    upload_file = os.path.join(site_report_dir, file)
+                    site_item = site_folder.add(item_properties = nha_item_properties, file = upload_file).result()
+                    # update sharing to PUBLIC using the sharing manager
+                    sharing_mgr = site_item.sharing
+                    sharing_mgr.sharing_level = SharingLevel.EVERYONE
+
+                    # get item id to use to build pdf url
+                    item_id = site_item.id
+                    site_account_url = r"https://wpcgis.maps.arcgis.com/sharing/rest/content/items/"+item_id+r"/data"
+
+                    # update pdf site account url in feature service
+                    row[2] = site_account_url
+                    cursor.updateRow(row)
@@ -0,0 +1,36 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: site_name_lister.py
+Purpose: Lists the names of selected NHAs to feed into the R site report generator script. Run by the "Site Name
+Lister" tool in NHA_ArcGIS_Tools_v4.pyt.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import sys
+from nha_trace import traced_tool
+
+# define function to run the "Site Name Lister" tool with the tool parameters
+@traced_tool("Site Name Lister", arcpy.AddMessage)
+def execute(params, messages):
+    nha_core = params[0].valueAsText
+
+    # check for selection on nha core layer and exit if there is no selection
+    desc = arcpy.Describe(nha_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No NHA Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # get list of selected NHA site names to feed into R site report generator script
+    with arcpy.da.SearchCursor(nha_core,"site_name") as cursor:
+        site_names = sorted({row[0] for row in cursor})
+
+    arcpy.AddMessage(tuple(site_names))
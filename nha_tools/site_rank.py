@@ -0,0 +1,104 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: site_rank.py
+Purpose: Calculates the site significance rank for selected NHAs from their species. Run by the "5 Calculate Site
+Rank" tool in NHA_ArcGIS_Tools_v4.pyt.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+10/19/2026 - species are scored with the compiled rank table in nha_ranks.py instead of merging the rank reference tables.
+10/19/2026 - ranking is split out into rank_nhas so it can be run for any list of NHAs, and only the species of
+those NHAs are read.
+10/19/2026 - species are read with the typed loader in nha_utils.py with rank codes as categoricals.
+10/19/2026 - layer urls come from the schema registry in nha_schema.py and the species fields are validated up front.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import sys
+import numpy as np
+import pandas as pd
+from nha_utils import where_in, update_by_key, load_frame
+from nha_ranks import load_rank_table, score_species
+from nha_trace import traced_tool
+import nha_schema
+
+# NHA species table and the fields read to rank NHAs
+nha_species = nha_schema.url("nha_species")
+species_fields = ["EO_ID","SNAME","SCOMNAME","ELSUBID","GRANK","SRANK","EORANK","exclude","nha_join_id"]
+
+# site score thresholds - sites scoring over global_score are Global and over regional_score are Regional. Sites with any
+# species in the override lists are Global or Regional no matter what their score is.
+global_score = 457
+regional_score = 152
+global_override = ["G1","G2"]
+regional_override = ["G3"]
+
+
+# define function to calculate the site rank of every NHA in a scored species list (from nha_ranks.score_species).
+# Only species that qualify for inclusion (exclude = "N") count towards the rank. The score cutoffs default to
+# global_score and regional_score - the prioritization scenarios pass in others.
+def site_ranks(species_df, global_cutoff=None, regional_cutoff=None):
+    """Returns a dictionary of nha_join_id: site rank ("G", "R", "S", or "L") for NHAs in species_df."""
+    global_cutoff = global_score if global_cutoff is None else global_cutoff
+    regional_cutoff = regional_score if regional_cutoff is None else regional_cutoff
+    # if site contains any G1 or G2 species, they should automatically be given a Global site value, and if it
+    # contains G3 species, they should automatically be given a Regional site value
+    species_df = species_df[species_df['exclude']=="N"].assign(
+        is_global=lambda df: df['grank_rounded'].isin(global_override),
+        is_regional=lambda df: df['grank_rounded'].isin(regional_override))
+    nha_df = species_df.groupby('nha_join_id').agg(site_score=('weighted_score', 'sum'),
+                                                   global_override=('is_global', 'any'),
+                                                   regional_override=('is_regional', 'any'))
+    site_score = nha_df['site_score']
+    ranks = np.select([nha_df['global_override'], nha_df['regional_override'], site_score > global_cutoff,
+                       site_score > regional_cutoff, site_score > 0], ["G", "R", "G", "R", "S"], default="L")
+    return dict(zip(nha_df.index, ranks.tolist()))
+
+
+# define function to calculate and save the site rank of a list of NHAs. Only the species of those NHAs are read, and
+# NHAs without any qualifying species are ranked "L".
+def rank_nhas(nha_core, nha_join_ids, log=print):
+    """Calculates the site rank of each NHA in nha_join_ids, writes it to sig_rank, and returns {nha_join_id: rank}."""
+    nha_schema.validate({"nha_species": species_fields})
+    frames = [load_frame(nha_species, species_fields, where_clause, categories=["GRANK", "SRANK", "EORANK", "exclude"])
+              for where_clause in where_in("nha_join_id", nha_join_ids)]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        ranks = {}
+    else:
+        # get combined grank/srank scores and eo weights for the species list from the compiled rank table in
+        # nha_ranks.py, which is only recompiled when the rank reference tables are edited
+        species_df = score_species(pd.concat(frames, ignore_index=True), load_rank_table(log))
+        ranks = site_ranks(species_df)
+    ranks = {nha: ranks.get(nha, "L") for nha in nha_join_ids}
+    for nha in sorted(ranks):
+        log("Calculating site rank for: "+nha)
+
+    # update site rank in NHA core layer
+    update_by_key(nha_core, "nha_join_id", ["sig_rank"], {nha: [rank] for nha, rank in ranks.items()})
+    return ranks
+
+
+# define function to run the "5 Calculate Site Rank" tool with the tool parameters
+@traced_tool("5 Calculate Site Rank", arcpy.AddMessage)
+def execute(params, messages):
+    nha_core = params[0].valueAsText
+
+    # check for selection on nha core layer and exit if there is no selection
+    desc = arcpy.Describe(nha_core)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No NHA Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # create list of NHA Join IDs for selected NHA cores
+    with arcpy.da.SearchCursor(nha_core,["NHA_JOIN_ID"]) as cursor:
+        nha_selected = sorted({row[0] for row in cursor})
+
+    # rank the selected NHAs from their species
+    rank_nhas(nha_core, nha_selected, arcpy.AddMessage)
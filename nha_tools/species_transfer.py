@@ -0,0 +1,194 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: species_transfer.py
+Purpose: Populates the NHA species list from the EOs within selected NHAs. Run by the "3 Populate Species List"
+tool in NHA_ArcGIS_Tools_v4.pyt.
+Author: Molly Moore for Pennsylvania Natural Heritage Program
+Created: v3 created on 05/12/2019
+Updates:
+10/19/2026 - moved out of NHA_ArcGIS_Tools_v4.pyt into the nha_tools package.
+10/19/2026 - tool runs are traced with nha_trace and the step summary is shown in the tool messages.
+10/19/2026 - species urls are filled once for all selected NHAs with fill_species_urls instead of after every NHA.
+10/19/2026 - species already in the selected NHAs are read once, and EOs that no longer intersect their NHA are marked
+excluded in batches after all NHAs are processed instead of with one update per EO.
+10/19/2026 - layer urls come from the schema registry in nha_schema.py and the species fields are validated up front.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import arcpy
+import os
+import sys
+from nha_tools.common import element_type, fill_species_urls
+from nha_utils import where_in, batch_update
+import nha_trace
+from nha_trace import traced_tool
+import nha_schema
+
+# exclude reason given to species records whose EO no longer intersects the NHA
+missing_eo_reason = "EO centroid no longer exists or no longer intersects NHA boundary."
+
+# EO fields copied into the species list
+eo_fields = ["EO_ID","ELCODE","SNAME","SCOMNAME","ELSUBID","LASTOBS_YR","SURVEY_YR","EO_TRACK","GRANK","SRANK","SPROT",
+             "USESA","PBSSTATUS","SENSITV_SP","SENSITV_EO","EORANK"]
+
+
+# define function to read the species records already related to a list of NHAs with one filtered read per chunk of
+# NHAs instead of scanning the whole species table for every NHA
+def species_in_nhas(nha_species, nha_join_ids):
+    """Returns a dictionary of nha_join_id: {EO_ID: [object ids of the species records for that EO]}."""
+    existing = {nha: {} for nha in nha_join_ids}
+    for where_clause in where_in("nha_join_id", nha_join_ids):
+        with arcpy.da.SearchCursor(nha_species, ["OID@", "nha_join_id", "EO_ID"], where_clause) as cursor:
+            for oid, nha_join_id, eoid in nha_trace.counted(cursor):
+                existing.setdefault(nha_join_id, {}).setdefault(eoid, []).append(oid)
+    return existing
+
+
+# define function to find species records whose EO no longer intersects their NHA. intersecting is a dictionary of
+# nha_join_id: set of EO_IDs that intersect the NHA now - NHAs that aren't in it are skipped.
+def stale_species(existing, intersecting):
+    """Returns a list of object ids of species records for EOs that no longer intersect their NHA."""
+    return [oid for nha, eos in existing.items() if nha in intersecting
+            for eoid, oids in eos.items() if eoid not in intersecting[nha] for oid in oids]
+
+
+# define function to run the "3 Populate Species List" tool with the tool parameters
+@traced_tool("3 Populate Species List", arcpy.AddMessage)
+def execute(params, messages):
+    nha_cores = params[0].valueAsText
+    eo_layer = params[1].valueAsText
+    nha_species = nha_schema.url("nha_species")
+    species_urls = nha_schema.url("species_urls")
+
+    # check the species fields this tool reads and writes before doing any work
+    nha_schema.validate({"nha_species": eo_fields + ["exclude", "exclude_reason", "nha_join_id", "nha_rel_GUID", "taxa",
+                                                     "species_url"],
+                         "species_urls": ["element_su", "url"]})
+
+    # check for selection on nha core layer and exit if there is no selection
+    desc = arcpy.Describe(nha_cores)
+    if not desc.FIDSet == '':
+        pass
+    else:
+        arcpy.AddWarning("No NHA Cores are selected. Please make a selection and try again.")
+        sys.exit()
+
+    # create list of NHA Join IDs for selected NHA cores
+    with arcpy.da.SearchCursor(nha_cores,["nha_join_id"]) as cursor:
+        nha_selected = sorted({row[0] for row in cursor})
+
+    # we are going to make the eo polygons into single part centroids to tag to NHAs
+    eo_singles = nha_trace.call("MultipartToSinglepart", arcpy.MultipartToSinglepart_management, eo_layer,
+                                os.path.join("memory","eo_singles"))
+    eo_centroids = nha_trace.call("FeatureToPoint", arcpy.FeatureToPoint_management, eo_singles,
+                                  os.path.join("memory","eo_centroids"),"INSIDE")
+    eo_lyr = arcpy.MakeFeatureLayer_management(eo_centroids,"eo_lyr")
+
+    # establish where clause to get list of qualifying EOs - this is the same as CPP query
+    eo_where_clause = "(((((ELCODE LIKE 'P%' Or ELCODE LIKE 'N%' Or ELCODE LIKE 'C%' Or ELCODE LIKE 'H%' Or ELCODE LIKE 'G%') And LASTOBS_YR >= 1974) Or ((ELCODE LIKE 'P%' Or ELCODE LIKE 'N%') And (USESA = 'LE' Or USESA = 'LT') And LASTOBS_YR >= 1950)) Or (((ELCODE LIKE 'AF%' Or ELCODE LIKE 'AA%' Or ELCODE LIKE 'AR%') And LASTOBS_YR >= 1950) Or ELCODE = 'ARADE03011') Or ((ELCODE LIKE 'AB%' And LASTOBS_YR >= 1990) Or (ELCODE = 'ABNKC12060' And LASTOBS_YR >= 1980)) Or (((ELCODE LIKE 'AM%' Or ELCODE LIKE 'OBAT%') And ELCODE <> 'AMACC01150' And LASTOBS_YR >= 1970) Or (ELCODE = 'AMACC01100' And LASTOBS_YR >= 1950) Or (ELCODE = 'AMACC01150' And LASTOBS_YR >= 1985)) Or ((ELCODE LIKE 'IC%' Or ELCODE LIKE 'IIEPH%' Or ELCODE LIKE 'IITRI%' Or ELCODE LIKE 'IMBIV%' Or ELCODE LIKE 'IMGAS%' Or ELCODE LIKE 'IP%' Or ELCODE LIKE 'IZ%') And LASTOBS_YR >= 1950) Or (ELCODE LIKE 'I%' And ELCODE NOT LIKE 'IC%' And ELCODE NOT LIKE 'IIEPH%' And ELCODE NOT LIKE 'IITRI%' And ELCODE NOT LIKE 'IMBIV%' And ELCODE NOT LIKE 'IMGAS%' And ELCODE NOT LIKE 'IP%' And ELCODE NOT LIKE 'IZ%' And LASTOBS_YR >= 1980)) And LASTOBS <> 'NO DATE' And EORANK <> 'X' And EORANK <> 'X?' And EST_RA <> 'Low' And EST_RA <> 'Very Low' And EO_TRACK = 'Y')"
+    # get list of EO IDs that qualify for CPP and qualify for inclusion in NHA
+    with nha_trace.step("qualifying EOs"), arcpy.da.SearchCursor(eo_layer,"EO_ID", eo_where_clause) as cursor:
+        qualifying_eos = {row[0] for row in nha_trace.counted(cursor)}
+
+    # get EOs that are already related to the selected NHAs to skip over later if needed
+    with nha_trace.step("species already in NHAs"):
+        existing_species = species_in_nhas(nha_species, nha_selected)
+    intersecting_by_nha = {}
+
+    # start loop of all selected nhas - each will be handled individually
+    for nha in nha_selected:
+        arcpy.AddMessage("Adding species for the following NHA: "+nha)
+        # get global id and nha_join_id of parent NHA to fill related species records
+        with arcpy.da.SearchCursor(nha_cores,["nha_join_id","GlobalID"], "nha_join_id = '{}'".format(nha)) as cursor:
+            for row in cursor:
+                nha_join_id = row[0]
+                global_id = row[1]
+
+        eos_in_NHA = existing_species.get(nha_join_id, {})
+
+        # make feature layer from NHAs to allow for selection
+        nha_lyr = arcpy.MakeFeatureLayer_management(nha_cores,"nha_lyr",where_clause="nha_join_id = '{}'".format(nha))
+
+        # select all EO centroids that intersect the selected NHA
+        nha_trace.call("SelectLayerByLocation", arcpy.SelectLayerByLocation_management, eo_lyr, "INTERSECT", nha_lyr,
+                       "", "NEW_SELECTION")
+
+        with arcpy.da.SearchCursor(eo_lyr,"EO_ID") as cursor:
+            intersecting_by_nha[nha_join_id] = {row[0] for row in cursor}
+
+        # use search cursor to get fields of selected EOs to get ready to insert them into species list
+        with arcpy.da.SearchCursor(eo_lyr,eo_fields) as cursor:
+            for row in cursor:
+                eoid = row[0]
+                elcode = row[1]
+                sname = row[2]
+                scomname = row[3]
+                elsubid = row[4]
+                lastobs = row[5]
+                survey_yr = row[6]
+                eo_track = row[7]
+                grank = row[8]
+                srank = row[9]
+                sprot = row[10]
+                usesa = row[11]
+                pbsstatus = row[12]
+                sensitv_sp = row[13]
+                sensitv_eo = row[14]
+                eorank = row[15]
+                taxa_group = element_type(row[1])
+
+                if eoid in qualifying_eos:
+                    exclude = "N"
+                    exclude_reason = ""
+                else:
+                    exclude = "Y"
+                    exclude_reason = "EO does not qualify for inclusion in NHA because of tracking status, age, accuracy, or rank."
+
+                insert_fields = eo_fields + ["exclude", "exclude_reason", "nha_join_id", "nha_rel_GUID", "taxa"]
+
+                # map every field to the current value pulled from the source EO layer
+                source_values = {
+                    "EO_ID": eoid, "ELCODE": elcode, "SNAME": sname, "SCOMNAME": scomname,
+                    "ELSUBID": elsubid, "LASTOBS_YR": lastobs, "SURVEY_YR": survey_yr,
+                    "EO_TRACK": eo_track, "GRANK": grank, "SRANK": srank, "SPROT": sprot,
+                    "USESA": usesa, "PBSSTATUS": pbsstatus, "SENSITV_SP": sensitv_sp,
+                    "SENSITV_EO": sensitv_eo, "EORANK": eorank, "exclude": exclude,
+                    "exclude_reason": exclude_reason, "nha_join_id": nha_join_id,
+                    "nha_rel_GUID": global_id, "taxa": taxa_group
+                }
+
+                # if eo id is not yet in the related table for the NHA, add it
+                if eoid not in eos_in_NHA:
+                    insert_row = [source_values[f] for f in insert_fields]
+                    with nha_trace.step("insert species"), arcpy.da.InsertCursor(nha_species, insert_fields) as insert_cursor:
+                        insert_cursor.insertRow(tuple(insert_row))
+                        nha_trace.add(rows=1)
+                # if eo id is already related, refresh any attributes that have changed
+                else:
+                    # update everything except the keys, relationship guid, and exclude fields
+                    update_fields = [f for f in insert_fields if f not in
+                                     ("EO_ID", "nha_join_id", "nha_rel_GUID", "exclude", "exclude_reason")]
+                    new_vals = [source_values[f] for f in update_fields]
+                    with nha_trace.step("update species"), \
+                            arcpy.da.UpdateCursor(nha_species, update_fields,
+                                                  where_clause="EO_ID = {0} AND nha_join_id = '{1}'".format(eoid,
+                                                                                                            nha_join_id)) as update_cursor:
+                        for update_row in update_cursor:
+                            if update_row != new_vals:
+                                update_cursor.updateRow(new_vals)
+                                nha_trace.add(rows=1)
+                # duplicate species records (same EO_ID and nha_join_id) are removed by NHA_Species_Compaction.py
+
+    # check for EOs listed in the NHAs that no longer exist or no longer intersect the boundary and mark them to be
+    # excluded - records that are already marked are left alone
+    stale_oids = stale_species(existing_species, intersecting_by_nha)
+    with nha_trace.step("exclude missing EOs"):
+        excluded = batch_update(nha_species, ["exclude", "exclude_reason"],
+                                {oid: ["Y", missing_eo_reason] for oid in stale_oids})
+    if excluded:
+        arcpy.AddMessage("Marked " + str(excluded) + " species records excluded because their EO no longer intersects "
+                         "the NHA.")
+
+    # fill null urls with species account urls from reference layer - this runs once for all of the selected NHAs
+    fill_species_urls(nha_species, species_urls, where_in("nha_join_id", nha_selected))
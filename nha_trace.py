@@ -0,0 +1,216 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_trace.py
+Purpose: Per-step timing and I/O instrumentation for the NHA toolbox tools and nightly scripts. A run is made of named
+steps - wall time, calls, rows, requests, and bytes are added up per step - and the shared helpers in nha_utils.py and
+nha_session.py add their row and request counts to whatever step is running. Toolbox tools show a summary through
+arcpy.AddMessage and scripts also write the trace to JSON and CSV files. Flat scripts mark where each of their sections
+starts with section() instead of indenting the section under a step.
+Tracing is on unless the nha_trace environment variable is set to 0 or off. When it is off, or when no run has been
+started, step() hands back a shared do-nothing context manager and add() returns right away.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import csv
+import json
+import time
+import datetime
+import functools
+import contextlib
+
+enabled = os.environ.get("nha_trace", "on").lower() not in ("0", "off", "false", "no")
+
+# folder that script traces are written to
+trace_dir = os.environ.get("nha_trace_dir") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+
+# measures kept for every step, in the order they are reported
+measures = ["calls", "seconds", "rows", "requests", "bytes"]
+
+# current run and the stack of running steps. Rows and requests recorded outside of any step go to the run's
+# "(no step)" entry so they still show up in the totals.
+_run = None
+_stack = []
+_section = None
+_null_step = contextlib.nullcontext()
+_no_step = "(no step)"
+
+
+# define class for a running step - the step's name is the names of the steps it is nested in joined with " > " so the
+# same helper called from two steps is reported separately
+class _Step(object):
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = _stack[-1] + " > " + name if _stack else name
+
+    def __enter__(self):
+        _stack.append(self.name)
+        _entry(self.name)["calls"] += 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        _entry(self.name)["seconds"] += time.perf_counter() - self.start
+        _stack.pop()
+        return False
+
+
+# define function to get the totals of a step in the current run, adding the step if it is new
+def _entry(name):
+    steps = _run["steps"]
+    if name not in steps:
+        steps[name] = dict.fromkeys(measures, 0)
+    return steps[name]
+
+
+# define function to start a new run. Any run that wasn't finished is thrown away.
+def start(name):
+    """Starts a trace run called name (a tool label or script name)."""
+    global _run, _section
+    del _stack[:]
+    _section = None
+    _run = {"name": name, "started": datetime.datetime.now().isoformat(timespec="seconds"),
+            "start": time.perf_counter(), "steps": {}} if enabled else None
+
+
+# define function to time a named step. Use as "with nha_trace.step('FeatureToPoint'):"
+def step(name):
+    """Returns a context manager that adds the wall time of the block to the named step."""
+    if _run is None:
+        return _null_step
+    return _Step(name)
+
+
+# define function to start a top level section of a flat script. The section runs until the next section starts or the
+# run finishes, so the sections of a script don't need to be indented under a with block.
+def section(name):
+    """Ends the running section (if any) and starts timing a new one called name."""
+    global _section
+    end_section()
+    if _run is not None:
+        _section = _Step(name)
+        _section.__enter__()
+
+
+# define function to end the running section
+def end_section():
+    """Stops timing the running section started with section()."""
+    global _section
+    if _section is not None:
+        _section.__exit__(None, None, None)
+        _section = None
+
+
+# define function to add rows, requests, or bytes to the step that is running
+def add(rows=0, requests=0, bytes=0):
+    """Adds counts to the innermost running step (or to the run if no step is running)."""
+    if _run is None:
+        return
+    entry = _entry(_stack[-1] if _stack else _no_step)
+    entry["rows"] += rows
+    entry["requests"] += requests
+    entry["bytes"] += bytes
+
+
+# define function to run a geoprocessing tool (or any function) as a named step
+def call(name, tool, *args, **kwargs):
+    """Runs tool(*args, **kwargs) inside step(name) and returns its result."""
+    with step(name):
+        return tool(*args, **kwargs)
+
+
+# define function to count the rows read from a cursor or other iterable in the step that is running when it is read.
+# Use as "for row in nha_trace.counted(cursor):"
+def counted(rows):
+    """Yields the rows of an iterable and adds how many there were to the running step."""
+    if _run is None:
+        return rows
+    return _counted(rows)
+
+
+def _counted(rows):
+    n = 0
+    try:
+        for n, row in enumerate(rows, 1):
+            yield row
+    finally:
+        add(rows=n)
+
+
+# define function to get the trace of the current run as a list of step records sorted by wall time
+def records():
+    """Returns a list of dictionaries with the step name and its measures, slowest step first."""
+    if _run is None:
+        return []
+    steps = sorted(_run["steps"].items(), key=lambda kv: kv[1]["seconds"], reverse=True)
+    return [dict(step=name, **totals) for name, totals in steps]
+
+
+# define function to send a summary of the current run to log (print or arcpy.AddMessage)
+def summary(log=print):
+    """Logs the total time of the run and one line per step with its calls, seconds, rows, requests, and bytes."""
+    if _run is None:
+        return
+    log("Trace of {0}: {1:.2f} seconds".format(_run["name"], time.perf_counter() - _run["start"]))
+    log("step: calls, seconds, rows, requests, bytes")
+    for record in records():
+        log("{step}: {calls}, {seconds:.2f}, {rows}, {requests}, {bytes}".format(**record))
+
+
+# define function to write the current run to a JSON file and a CSV file in trace_dir
+def write(folder=None):
+    """Writes <name>_<timestamp>.json and .csv trace files and returns their paths."""
+    if _run is None:
+        return []
+    folder = folder or trace_dir
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    base = os.path.join(folder, "{0}_{1}".format(_run["name"], _run["started"].replace(":", "").replace("-", "")))
+    steps = records()
+    with open(base + ".json", "w") as f:
+        json.dump({"name": _run["name"], "started": _run["started"],
+                   "seconds": time.perf_counter() - _run["start"], "steps": steps}, f, indent=2)
+    with open(base + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, ["step"] + measures)
+        writer.writeheader()
+        writer.writerows(steps)
+    return [base + ".json", base + ".csv"]
+
+
+# define function to end the current run - the summary is logged, trace files are written if write_files is True, and
+# tracing stops until the next run is started
+def finish(log=print, write_files=True):
+    """Logs the summary of the current run, optionally writes its trace files, and ends the run."""
+    global _run
+    if _run is None:
+        return
+    end_section()
+    try:
+        summary(log)
+        if write_files:
+            for path in write():
+                log("Trace written to " + path)
+    finally:
+        _run = None
+        del _stack[:]
+
+
+# define decorator for the execute function of a toolbox tool - the tool runs as a trace run and the summary is shown
+# through log (arcpy.AddMessage) when it finishes, even if it fails
+def traced_tool(label, log=print):
+    """Returns a decorator that runs the decorated function as the trace run label."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start(label)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finish(log, write_files=False)
+        return wrapper
+    return decorator
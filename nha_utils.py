@@ -0,0 +1,432 @@
+"""
+---------------------------------------------------------------------------------------------------------------------
+Name: nha_utils.py
+Purpose: Shared helper functions used by the NHA nightly scripts and the NHA toolbox. These handle the repetitive
+pieces of moving records between pandas and the NHA feature services - building chunked where clauses, keying
+existing rows so incoming records can be checked against them without list scans, and writing inserts and updates
+through one cursor per table.
+Author: Pennsylvania Natural Heritage Program
+Created: 10/19/2026
+Updates:
+10/19/2026 - cursor helpers add their row counts to the running nha_trace step.
+10/19/2026 - added load_frame, a typed loader that reads only the listed fields into categorical and nullable columns.
+10/19/2026 - load_frame gets field types from the cached schema in nha_schema.py.
+10/19/2026 - classify_records keeps only the last incoming record for each natural key.
+------------------------------------------------------------------------------------------------------------------------
+"""
+
+# import packages
+import os
+import json
+import datetime
+import arcpy
+import pandas as pd
+import numpy as np
+import nha_trace
+
+# maximum number of values that go into a single IN clause - feature services start rejecting long where clauses
+# somewhere past this point, so we split larger lists into multiple queries
+where_chunk_size = 500
+
+
+# define function to split a list of values into lists of a given size
+def chunked(values, size=where_chunk_size):
+    """Yields successive lists of at most size values from values."""
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+# define function to format a single value for use in a SQL where clause
+def sql_value(value):
+    """Returns value quoted for a where clause - strings are quoted and escaped, numbers are left as is."""
+    if isinstance(value, str):
+        return "'{0}'".format(value.replace("'", "''"))
+    return str(value)
+
+
+# define function to build where clauses for a list of values. Returns a list of where clauses with one clause for every
+# chunk of values - an empty list is returned if there are no values, so loops over the result just don't run.
+def where_in(field, values, chunk_size=where_chunk_size):
+    """Returns a list of '<field> IN (...)' where clauses covering all unique, non-null values."""
+    values = sorted({v for v in values if v is not None and not (isinstance(v, float) and np.isnan(v))})
+    return ["{0} IN ({1})".format(field, ",".join(sql_value(v) for v in chunk)) for chunk in chunked(values, chunk_size)]
+
+
+# define function to normalize a value so that the same value coming from a pandas dataframe and from an arcpy cursor
+# hash and compare the same way
+def normalize_value(value):
+    """Converts pandas null and timestamp types to the python types returned by arcpy cursors."""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime().replace(tzinfo=None)
+    if isinstance(value, datetime.datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+# define function to build a hashable key from a row of values
+def natural_key(values):
+    """Returns a tuple of normalized values that can be used as a set member or dictionary key."""
+    return tuple(normalize_value(v) for v in values)
+
+
+# define function to index existing rows in a table or feature service by a natural key. Returns a dictionary of
+# natural key: (objectid, full key) and a set of full keys, so incoming records can be checked for exact duplicates
+# and for changed values without scanning lists.
+def build_key_index(table, key_fields, value_fields, where_clauses=None):
+    """
+    Reads key_fields and value_fields from table and returns (key_index, full_index). where_clauses is an optional list
+    of where clauses (such as the output of where_in) used to only read rows that could match incoming records.
+    key_index maps the natural key built from key_fields to (objectid, full key of key_fields + value_fields).
+    full_index is the set of full keys.
+    """
+    key_index = {}
+    full_index = set()
+    n_keys = len(key_fields)
+    for where_clause in ([None] if where_clauses is None else where_clauses):
+        with arcpy.da.SearchCursor(table, ["OID@"] + key_fields + value_fields, where_clause) as cursor:
+            for row in nha_trace.counted(cursor):
+                full_key = natural_key(row[1:])
+                key_index[full_key[:n_keys]] = (row[0], full_key)
+                full_index.add(full_key)
+    return key_index, full_index
+
+
+# define function to classify incoming records against an existing key index. Each record is classified as "new" if
+# its natural key is not in the target table, "duplicate" if an identical record is already there, or "update" if the
+# natural key exists but one of the other values has changed.
+def classify_records(df, key_fields, value_fields, key_index, full_index):
+    """
+    Returns a copy of df with added 'load_action' ('new', 'duplicate', 'update') and 'target_oid' columns. key_fields
+    and value_fields are the dataframe columns that line up with the fields used to build the key index. Records that
+    repeat the natural key of a later record are dropped.
+    """
+    # incoming records with the same natural key would both be loaded as new (or both update the same record), so only
+    # the last record for each natural key is kept
+    incoming_keys = pd.Series([natural_key(r) for r in df[key_fields].itertuples(index=False, name=None)],
+                              index=df.index, dtype=object)
+    df = df[~incoming_keys.duplicated(keep='last')].copy()
+    if df.empty:
+        df['load_action'] = pd.Series(dtype=object)
+        df['target_oid'] = pd.Series(dtype=object)
+        return df
+
+    # build natural keys and full keys for all records at once
+    full_keys = pd.Series([natural_key(r) for r in df[key_fields + value_fields].itertuples(index=False, name=None)],
+                          index=df.index, dtype=object)
+    n_keys = len(key_fields)
+
+    # look up matching object ids by natural key and check for exact matches
+    target_oid = pd.Series([key_index[k[:n_keys]][0] if k[:n_keys] in key_index else None for k in full_keys],
+                           index=df.index, dtype=object)
+    is_duplicate = pd.Series([k in full_index for k in full_keys], index=df.index, dtype=bool)
+
+    df['load_action'] = np.select([is_duplicate, target_oid.notna()], ['duplicate', 'update'], 'new')
+    df['target_oid'] = target_oid
+    return df
+
+
+# define function to turn dataframe columns into a dictionary of key: list of values. If a key is repeated, the last
+# record wins, which matches what set_index().to_dict() did.
+def records_by_key(df, key_field, fields):
+    """Returns {key: [values of fields]} for all rows of df with a non-null key."""
+    df = df[df[key_field].notna()]
+    return dict(zip(df[key_field], (list(r) for r in df[fields].itertuples(index=False, name=None))))
+
+
+# define function to insert a list of rows into a table using a single insert cursor
+def batch_insert(table, fields, rows):
+    """Inserts all rows into table through one InsertCursor and returns the number of rows inserted."""
+    rows = list(rows)
+    if not rows:
+        return 0
+    with arcpy.da.InsertCursor(table, fields) as cursor:
+        for row in rows:
+            cursor.insertRow(tuple(row))
+    nha_trace.add(rows=len(rows))
+    return len(rows)
+
+
+# define function to update rows in a table by object id. updates is a dictionary of objectid: list of new values in
+# the same order as fields. Rows are only written if a value actually changed.
+def batch_update(table, fields, updates, oid_field=None):
+    """Applies updates ({objectid: values}) to table using one UpdateCursor per chunk of object ids."""
+    if not updates:
+        return 0
+    if oid_field is None:
+        oid_field = arcpy.Describe(table).OIDFieldName
+    updated = 0
+    for where_clause in where_in(oid_field, updates.keys()):
+        with arcpy.da.UpdateCursor(table, ["OID@"] + fields, where_clause) as cursor:
+            for row in cursor:
+                new_values = updates.get(row[0])
+                if new_values is None:
+                    continue
+                new_row = [row[0]] + list(new_values)
+                if natural_key(row) != natural_key(new_row):
+                    cursor.updateRow(new_row)
+                    updated += 1
+    nha_trace.add(rows=updated)
+    return updated
+
+
+# define function to update rows in a table by a key field such as nha_join_id. updates is a dictionary of key: list of
+# new values in the same order as fields. Returns the list of keys for rows that were updated.
+def update_by_key(table, key_field, fields, updates):
+    """Applies updates ({key: values}) to table using one UpdateCursor per chunk of keys."""
+    updated_keys = []
+    for where_clause in where_in(key_field, updates.keys()):
+        with arcpy.da.UpdateCursor(table, [key_field] + fields, where_clause) as cursor:
+            for row in cursor:
+                new_values = updates.get(row[0])
+                if new_values is None:
+                    continue
+                cursor.updateRow([row[0]] + list(new_values))
+                updated_keys.append(row[0])
+    nha_trace.add(rows=len(updated_keys))
+    return updated_keys
+
+
+# define function to delete all rows in a table whose key field (such as nha_join_id) is in a list of values - one
+# UpdateCursor per chunk of keys instead of a scan of the whole table for each key
+def delete_by_key(table, key_field, key_values):
+    """Deletes rows of table whose key_field is in key_values and returns the number of rows deleted."""
+    deleted = 0
+    for where_clause in where_in(key_field, key_values):
+        with arcpy.da.UpdateCursor(table, [key_field], where_clause) as cursor:
+            for row in cursor:
+                cursor.deleteRow()
+                deleted += 1
+    nha_trace.add(rows=deleted)
+    return deleted
+
+
+# define function to calculate a field to a single value in a hosted feature layer for all records whose key field is
+# in a list of values - one calculate call per chunk rather than one per record
+def batch_calculate(feature_layer, key_field, key_values, field, value):
+    """Runs FeatureLayer.calculate for all key_values in chunks and returns the list of server responses."""
+    return [feature_layer.calculate(where=where_clause, calc_expression={"field": field, "value": value})
+            for where_clause in where_in(key_field, key_values)]
+
+
+# define function to load persisted watermarks. Watermarks are stored as a dictionary of layer url: {"field": name of
+# the field that is tracked, "type": "date" or "oid", "value": highest value seen in the last successful run}. If the
+# file does not exist yet, an empty dictionary is returned and everything is pulled.
+def load_watermarks(path):
+    """Returns the dictionary of watermarks saved at path, or an empty dictionary if there isn't one."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+# define function to save watermarks. The file is written to a temporary path and then swapped in, so a failure part
+# way through writing doesn't leave a corrupt watermark file behind.
+def save_watermarks(path, watermarks):
+    """Writes the dictionary of watermarks to path."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(temp_path, path)
+
+
+# define function to get the field that is used to track new and edited records in a hosted feature layer or table.
+# We use the editor tracking edit date field if the layer has one and fall back to the object id, which will only pick
+# up new records.
+def watermark_field(layer):
+    """Returns (field name, "date" or "oid") for the field used to find records edited since the last run."""
+    edit_fields = layer.properties.get("editFieldsInfo") or {}
+    if edit_fields.get("editDateField"):
+        return edit_fields["editDateField"], "date"
+    return layer.properties.get("objectIdField", "objectid"), "oid"
+
+
+# define function to query a hosted feature layer or table for records added or edited since a watermark. Returns a
+# Pandas DF of the records and the watermark to save once the records have been written to their target tables.
+def query_since(layer, watermark=None, where="1=1", out_fields="*"):
+    """
+    Queries layer for records with a tracked field value at or past watermark["value"] (all records if watermark is
+    None) and returns (df, new_watermark). The dataframe always has the layer's columns, even if no records came back.
+    """
+    field, field_type = watermark_field(layer)
+    valid_watermark = bool(watermark) and watermark.get("field") == field and watermark.get("value") is not None
+    if valid_watermark:
+        if field_type == "date":
+            # use >= so edits made in the same millisecond as the last watermark are not skipped - reloading them is
+            # harmless because records that were already loaded are classified as duplicates
+            since = datetime.datetime.fromtimestamp(watermark["value"] / 1000, datetime.timezone.utc)
+            where = "({0}) AND {1} >= TIMESTAMP '{2}'".format(where, field, since.strftime("%Y-%m-%d %H:%M:%S"))
+        else:
+            where = "({0}) AND {1} > {2}".format(where, field, watermark["value"])
+
+    df = layer.query(where=where, out_fields=out_fields).sdf
+    if df.empty and len(df.columns) == 0:
+        df = pd.DataFrame(columns=[f["name"] for f in layer.properties.fields])
+
+    # new watermark is the highest tracked value in the records we pulled, so server clock differences don't matter
+    new_watermark = {"field": field, "type": field_type, "value": watermark["value"] if valid_watermark else None}
+    if not df.empty and field in df.columns and df[field].notna().any():
+        if field_type == "date":
+            new_watermark["value"] = int(pd.Timestamp(df[field].max()).timestamp() * 1000)
+        else:
+            new_watermark["value"] = int(df[field].max())
+    return df, new_watermark
+
+
+# define function to keep only the most recent record for each id in a dataframe. Records with a null id are dropped.
+def latest_by_id(df, id_field, date_field):
+    """Returns the rows of df with the latest date_field for each id_field value."""
+    if df.empty:
+        return df
+    df = df[df[id_field].notna()]
+    # sort by ID and date field so the most recent record for each ID comes last - null dates sort first, so a record
+    # with a date always wins over one without
+    df = df.sort_values([id_field, date_field], ascending=[True, True], na_position='first', kind='mergesort')
+    return df.drop_duplicates(subset=[id_field], keep='last').reset_index(drop=True)
+
+
+# define function to take feature layer and keep only most recent record for each ID. Returns a Pandas DF. We first
+# ask the server for the latest date for each ID with a statistics query, and then only pull the winning rows with the
+# fields we need. If the statistics query doesn't work on the service, all rows are pulled and the latest are picked
+# locally.
+def get_latest_records(feature_layer_url, id_field, date_field, out_fields="*"):
+    """
+    Fetches the most recent record for each ID from a feature layer and returns a Pandas DataFrame. out_fields is a
+    list of field names (or "*") - the id and date fields are always included.
+    """
+    from nha_session import feature_layer
+
+    # get a FeatureLayer object on the shared portal connection
+    fl = feature_layer(feature_layer_url)
+    if out_fields != "*":
+        out_fields = ",".join(dict.fromkeys(list(out_fields) + [id_field, date_field]))
+
+    try:
+        # ask the server for the max date for each ID
+        stats_df = fl.query(where="{0} IS NOT NULL".format(id_field), group_by_fields_for_statistics=id_field,
+                            out_statistics=[{"statisticType": "max", "onStatisticField": date_field,
+                                             "outStatisticFieldName": "latest_date"}],
+                            return_geometry=False).sdf
+        stats_df.columns = [c if c.lower() != "latest_date" else "latest_date" for c in stats_df.columns]
+        if pd.api.types.is_numeric_dtype(stats_df["latest_date"]):
+            stats_df["latest_date"] = pd.to_datetime(stats_df["latest_date"], unit="ms")
+        else:
+            stats_df["latest_date"] = pd.to_datetime(stats_df["latest_date"])
+
+        # build a clause for each ID that only matches records on or after the second of its latest date - this is the
+        # winning record plus any ties within the same second, which are sorted out locally below. IDs without any
+        # dates match all of their records.
+        clauses = ["{0} = {1}".format(id_field, sql_value(i)) if pd.isnull(d) else
+                   "({0} = {1} AND {2} >= TIMESTAMP '{3}')".format(id_field, sql_value(i), date_field,
+                                                                   d.floor("s").strftime("%Y-%m-%d %H:%M:%S"))
+                   for i, d in zip(stats_df[id_field], stats_df["latest_date"])]
+        frames = [fl.query(where=" OR ".join(chunk), out_fields=out_fields, return_geometry=False).sdf
+                  for chunk in chunked(clauses, 100)]
+
+        # pull any IDs that didn't come back from the date clauses (for example, if the service stores dates in a
+        # different time zone) with all of their records
+        found_ids = set().union(*[set(f[id_field]) for f in frames if not f.empty])
+        frames += [fl.query(where=where_clause, out_fields=out_fields, return_geometry=False).sdf for where_clause in
+                   where_in(id_field, set(stats_df[id_field]) - found_ids)]
+        frames = [f for f in frames if not f.empty]
+        df = pd.concat(frames, axis=0, ignore_index=True) if frames else pd.DataFrame(columns=stats_df.columns)
+    except Exception as ex:
+        print("Statistics query failed for " + feature_layer_url + ", getting latest records locally: " + str(ex))
+        df = fl.query(out_fields=out_fields, return_geometry=False).sdf
+
+    return latest_by_id(df, id_field, date_field)
+
+
+# null values used when a table is read with TableToNumPyArray - integer nulls are read as null_int and turned back into
+# nulls in nullable integer columns
+null_int = -2147483648
+
+
+# define function to read a table into a typed dataframe with only the fields we need. Tables are read through Arrow
+# where arcpy supports it (ArcGIS Pro 3.2 and later) and TableToNumPyArray otherwise, so no python object is built for
+# every value. categories are code fields (ranks, ELCODEs, yes/no flags) stored as categoricals, and years are stored
+# as nullable integers. Nulls are kept as nulls - there is no need to replace them afterwards.
+def load_frame(table, fields, where_clause=None, categories=(), years=()):
+    """Returns a dataframe of fields from table with categories as categoricals and years as nullable Int32."""
+    if hasattr(arcpy.da, "TableToArrowTable"):
+        df = arcpy.da.TableToArrowTable(table, fields, where_clause).to_pandas()
+    else:
+        from nha_schema import field_types as layer_field_types
+        field_types = layer_field_types(table)
+        null_values = {}
+        for field in fields:
+            field_type = field_types.get(field.lower())
+            if field_type in ("String", "Guid", "GUID", "GlobalID"):
+                null_values[field] = ""
+            elif field_type in ("Integer", "SmallInteger", "OID"):
+                null_values[field] = null_int
+            elif field_type in ("Double", "Single"):
+                null_values[field] = np.nan
+            elif field_type == "Date":
+                null_values[field] = np.datetime64("NaT")
+        df = pd.DataFrame(arcpy.da.TableToNumPyArray(table, fields, where_clause, null_value=null_values))
+        for field in fields:
+            if null_values.get(field) == "":
+                df[field] = df[field].where(df[field] != "", None)
+            elif null_values.get(field) == null_int:
+                df[field] = df[field].astype("Int64").where(df[field] != null_int, pd.NA)
+    nha_trace.add(rows=len(df))
+    for field in years:
+        df[field] = df[field].astype("Int32")
+    for field in categories:
+        df[field] = df[field].astype("category")
+    return df
+
+
+# fields on EO reps that flag a sensitive species or a sensitive EO. Records are masked if either field is "Y". This is
+# the one masking rule used by the NHA export and the public feature service updates.
+sensitive_flag_fields = ["SENSITV_SP", "SENSITV_EO"]
+
+
+# define function to get the sensitive EO_IDs out of a list of EO_IDs. Only the listed EOs and the sensitivity fields
+# are queried, so masking an export of a few sites doesn't read the whole state's EOs.
+def sensitive_eo_ids(eo_table, eo_ids):
+    """Returns the set of EO_IDs in eo_ids that are flagged as a sensitive species or sensitive EO in eo_table."""
+    sensitive = set()
+    for where_clause in where_in("EO_ID", eo_ids):
+        with arcpy.da.SearchCursor(eo_table, ["EO_ID"] + sensitive_flag_fields, where_clause) as cursor:
+            sensitive.update(row[0] for row in cursor if "Y" in row[1:])
+    return sensitive
+
+
+# define function to get a boolean mask of sensitive records in a dataframe that has the sensitivity fields
+def sensitive_mask(df):
+    """Returns a boolean Series that is True for rows where any of the sensitivity fields is "Y"."""
+    return df[sensitive_flag_fields].eq("Y").any(axis=1)
+
+
+# define function to mask columns of sensitive records in a dataframe. masked_values is a dictionary of column: value
+# that the column is set to for sensitive records.
+def mask_sensitive(df, masked_values, mask=None):
+    """Sets each column in masked_values to its masked value where mask (default sensitive_mask(df)) is True."""
+    if mask is None:
+        mask = sensitive_mask(df)
+    for column, value in masked_values.items():
+        df[column] = df[column].where(~mask, value)
+    return df
+
+
+# define function to mask sensitive records in a table in place. masked_values is a dictionary of field: value that the
+# field is set to for rows whose EO_ID is in eo_ids.
+def mask_table_eos(table, eo_ids, masked_values):
+    """Writes masked_values to every row of table with an EO_ID in eo_ids and returns the number of rows masked."""
+    fields = list(masked_values.keys())
+    values = list(masked_values.values())
+    masked = 0
+    for where_clause in where_in("EO_ID", eo_ids):
+        with arcpy.da.UpdateCursor(table, fields, where_clause) as cursor:
+            for row in cursor:
+                cursor.updateRow(values)
+                masked += 1
+    return masked
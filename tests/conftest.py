@@ -0,0 +1,5 @@
+# the NHA scripts and modules live in the repo root rather than an installed package, so the tests import them from there
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,28 @@
+"""
+Tests of the where clauses built by the NHA export tool. Run them with the ArcGIS Pro python environment:
+    python -m pytest tests
+"""
+
+import pytest
+
+pytest.importorskip("arcpy")
+
+from nha_utils import where_chunk_size
+from nha_tools.nha_export import nha_where, species_where
+
+
+def test_species_where_groups_every_nha_chunk_before_exclude():
+    nha_ids = ["NHA{0:04d}".format(i) for i in range(where_chunk_size + 1)]
+    nha_clause = nha_where(nha_ids)
+    # more than one chunk, so the NHA clause is an OR of chunks
+    assert nha_clause.count(" OR ") == 1
+    clause = species_where(nha_ids)
+    assert clause == "({0}) AND exclude = 'N'".format(nha_clause)
+    # the exclude filter is outside the parentheses around all of the chunks
+    grouped, exclude = clause.rsplit(" AND ", 1)
+    assert grouped.startswith("((") and grouped.endswith("))")
+    assert exclude == "exclude = 'N'"
+
+
+def test_species_where_without_nhas_selects_nothing():
+    assert species_where([]) == "(1=0) AND exclude = 'N'"
@@ -0,0 +1,38 @@
+"""
+Tests of the nha_utils helpers that don't touch a service. Run them with the ArcGIS Pro python environment:
+    python -m pytest tests
+"""
+
+import pytest
+
+pytest.importorskip("arcpy")
+
+import pandas as pd
+from nha_utils import natural_key, classify_records
+
+
+def test_classify_records_keeps_last_record_for_a_natural_key():
+    # two incoming records for the same site with different values should not both be loaded as new
+    df = pd.DataFrame({"nha_join_id": ["a", "a", "b"], "site_desc": ["first", "second", "other"]})
+    classified = classify_records(df, ["nha_join_id"], ["site_desc"], {}, set())
+    assert classified["nha_join_id"].tolist() == ["a", "b"]
+    assert classified["site_desc"].tolist() == ["second", "other"]
+    assert classified["load_action"].tolist() == ["new", "new"]
+
+
+def test_classify_records_repeated_key_updates_existing_record_once():
+    key_index = {natural_key(["a"]): (7, natural_key(["a", "old"]))}
+    full_index = {natural_key(["a", "old"])}
+    df = pd.DataFrame({"nha_join_id": ["a", "a"], "site_desc": ["first", "second"]})
+    classified = classify_records(df, ["nha_join_id"], ["site_desc"], key_index, full_index)
+    assert classified["load_action"].tolist() == ["update"]
+    assert classified["target_oid"].tolist() == [7]
+    assert classified["site_desc"].tolist() == ["second"]
+
+
+def test_classify_records_marks_existing_identical_record_duplicate():
+    key_index = {natural_key(["a"]): (7, natural_key(["a", "same"]))}
+    full_index = {natural_key(["a", "same"])}
+    df = pd.DataFrame({"nha_join_id": ["a", "b"], "site_desc": ["same", "new"]})
+    classified = classify_records(df, ["nha_join_id"], ["site_desc"], key_index, full_index)
+    assert classified["load_action"].tolist() == ["duplicate", "new"]